@@ -0,0 +1,62 @@
+# alert_digest.py
+# Per-tick alert coalescing. A tick opens a Digest; the alert paths add() each
+# threshold crossing (after their per-mint cooldown checks) instead of sending it, and
+# the tick sends one card per chat at the end, movers ranked by |Δ|. pack() splits the
+# lines over several cards when one would exceed Telegram's 4096-char message limit.
+# Delivery is chosen per chat: "digest" or "individual" (one message per mint).
+import threading
+
+MAX_CHARS = 4096
+MODES = ("digest", "individual")
+
+
+def tg_len(s: str) -> int:
+    """Length as Telegram counts it (UTF-16 code units; most emoji are two)."""
+    return len(s.encode("utf-16-le")) // 2
+
+
+class Digest:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_chat: dict = {}  # chat_id -> {mint: item}
+
+    def add(self, chat_id, mint: str, delta_pct: float, **fields):
+        """Collect one crossing; a later crossing of the same mint replaces the earlier one."""
+        with self._lock:
+            self._by_chat.setdefault(chat_id, {})[mint] = dict(
+                fields, mint=mint, delta_pct=float(delta_pct)
+            )
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(v) for v in self._by_chat.values())
+
+    def chats(self) -> dict:
+        """chat_id -> items, biggest absolute move first."""
+        with self._lock:
+            return {
+                chat: sorted(items.values(), key=lambda it: -abs(it["delta_pct"]))
+                for chat, items in self._by_chat.items()
+                if items
+            }
+
+
+def pack(header: str, lines: list[str], limit: int = MAX_CHARS, part=" ({i}/{n})") -> list[str]:
+    """
+    Fit lines under `header` into as few cards as possible, each at most `limit` chars.
+    Split cards get `part` (formatted with i, n) appended to the header.
+    """
+    room = limit - tg_len(header) - len(part) - 8  # newline + part counter digits
+    groups: list[list[str]] = [[]]
+    size = 0
+    for ln in lines:
+        n = tg_len(ln) + 1
+        if groups[-1] and size + n > room:
+            groups.append([])
+            size = 0
+        groups[-1].append(ln)
+        size += n
+    if len(groups) == 1:
+        return [header + "\n" + "\n".join(groups[0])]
+    n = len(groups)
+    return [header + part.format(i=i, n=n) + "\n" + "\n".join(g) for i, g in enumerate(groups, 1)]
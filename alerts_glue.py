@@ -1,6 +1,7 @@
-import json
 import threading
 
+from state_store import STATE
+
 _CFG_PATH = "alerts_config.json"
 _lock = threading.RLock()
 _last_sent_ts = 0.0
@@ -18,16 +19,15 @@ def _as_float(x, default=0.0):
 
 
 def _load_cfg() -> dict:
-    try:
-        with open(_CFG_PATH) as f:
-            return json.load(f)
-    except Exception:
-        return {
-            "chat_id": None,
-            "min_move_pct": 1.0,
-            "rate_per_min": 5,
-            "muted_until": 0,
-        }
+    cfg = STATE.load(_CFG_PATH)
+    if cfg is not None:
+        return cfg
+    return {
+        "chat_id": None,
+        "min_move_pct": 1.0,
+        "rate_per_min": 5,
+        "muted_until": 0,
+    }
 
 
 def _should_rate_limit(now: float, rate_per_min: int) -> bool:
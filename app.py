@@ -39,7 +39,6 @@ import logging
 import math
 import os
 import re
-import sqlite3
 import threading
 import time
 from datetime import UTC, datetime, timedelta
@@ -82,79 +81,114 @@ def _delete(url, **kw):
 
 
 # 2) Local watchdog timeout protection for stat fetches
+# Shared bounded pool (deadline_executor.py): the caller returns `default` as soon as
+# the deadline passes; the worker's result is abandoned instead of joined.
+from deadline_executor import EXECUTOR as _DEADLINE_EXECUTOR
+
+
 def with_timeout(fn, /, *args, timeout=4, default=None, **kwargs):
     """Execute function with thread-based watchdog timeout protection"""
-    with cf.ThreadPoolExecutor(max_workers=1) as ex:
-        fut = ex.submit(fn, *args, **kwargs)
-        try:
-            return fut.result(timeout=timeout)
-        except Exception:
-            return default
+    return _DEADLINE_EXECUTOR.run(fn, *args, timeout=timeout, default=default, **kwargs)
 
 
 # 3) TTL Cache decorator for primitive value caching
-def ttl_cache(ttl=60):
+# Bounded LRU memo (price_cache.memoize): separate TTL for None results, refresh ahead
+# of expiry, one load per cold key; per-cache counters via /cache_stats.
+from price_cache import memo_stats, memoize
+
+_TTL_CACHE_MAX = int(os.getenv("TTL_CACHE_MAX", "2048"))
+
+
+def ttl_cache(ttl=60, neg_ttl=None, maxsize=None, refresh_ahead=0.2):
     """Time-based cache decorator with configurable TTL"""
+    return memoize(
+        ttl, neg_ttl=neg_ttl, maxsize=maxsize or _TTL_CACHE_MAX, refresh_ahead=refresh_ahead
+    )
+
+
+# 4) Single-flight coalescing: concurrent callers for the same key share one fetch
+class _SingleFlight:
+    """Per-key in-flight registry; followers wait on the leader's result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> {"done": Event, "result": ..., "exc": ...}
+        self._stats = {}  # provider -> {"calls": n, "coalesced": n}
+
+    def do(self, key, fn, *args, **kwargs):
+        provider = key[0] if isinstance(key, tuple) else str(key)
+        with self._lock:
+            st = self._stats.setdefault(provider, {"calls": 0, "coalesced": 0})
+            st["calls"] += 1
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = {"done": threading.Event(), "result": None, "exc": None}
+                self._inflight[key] = call
+            else:
+                st["coalesced"] += 1
+        if not leader:
+            call["done"].wait()
+            if call["exc"] is not None:
+                raise call["exc"]
+            return call["result"]
+        try:
+            call["result"] = fn(*args, **kwargs)
+            return call["result"]
+        except BaseException as e:
+            call["exc"] = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call["done"].set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            by = {p: dict(v) for p, v in self._stats.items()}
+            inflight = len(self._inflight)
+        return {
+            "calls": sum(v["calls"] for v in by.values()),
+            "coalesced": sum(v["coalesced"] for v in by.values()),
+            "inflight": inflight,
+            "by_provider": by,
+        }
+
+
+_SINGLE_FLIGHT = _SingleFlight()
+
+
+def single_flight(provider: str):
+    """Decorator: coalesce concurrent calls keyed by (provider, mint[, extra args])."""
 
     def deco(fn):
-        cache = {}
-
-        def wrapper(*a, **k):
-            key = (a, tuple(sorted(k.items())))
-            now = time.time()
-            val = cache.get(key)
-            if val and now - val[0] < ttl:
-                return val[1]
-            res = fn(*a, **k)
-            cache[key] = (now, res)
-            return res
+        def wrapper(mint, *a, **k):
+            key = (provider, mint) + ((a, tuple(sorted(k.items()))) if (a or k) else ())
+            return _SINGLE_FLIGHT.do(key, fn, mint, *a, **k)
 
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
         return wrapper
 
     return deco
 
 
+def single_flight_stats() -> dict:
+    return _SINGLE_FLIGHT.stats()
+
+
 # === CROSS-PROCESS TELEGRAM DEDUPE SYSTEM ===
+# Time-bucketed hash ring in shared memory (tg_dedup.py): every worker sees every send,
+# a check is one probe under a short flock, and old buckets are recycled as the ring
+# wraps instead of by periodic DELETE sweeps.
+from tg_dedup import RING as _TG_DEDUP_RING
+
 TG_DEDUP_WINDOW_SEC = int(os.getenv("TG_DEDUP_WINDOW_SEC", "3"))
-_TG_DEDUP_DB = os.getenv("TG_DEDUP_DB", "/tmp/tg_dedup.sqlite")
-_tg_db_local = threading.local()
-
-
-def _tg_dedup_conn():
-    conn = getattr(_tg_db_local, "conn", None)
-    if conn is None:
-        conn = sqlite3.connect(_TG_DEDUP_DB, timeout=5, check_same_thread=False)
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS msgs(
-                chat_id INTEGER NOT NULL,
-                hash TEXT NOT NULL,
-                ts INTEGER NOT NULL,
-                PRIMARY KEY(chat_id, hash)
-            )
-        """
-        )
-        _tg_db_local.conn = conn
-    return conn
 
 
 def _tg_dedup_hit_and_mark(chat_id: int, text: str, window: int = TG_DEDUP_WINDOW_SEC) -> bool:
     """Return True if this message is a duplicate within `window` seconds; otherwise mark it and return False."""
-    now = int(time.time())
-    h = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
-    conn = _tg_dedup_conn()
-    with conn:  # atomic
-        row = conn.execute(
-            "SELECT ts FROM msgs WHERE chat_id=? AND hash=?", (int(chat_id), h)
-        ).fetchone()
-        if row and (now - int(row[0])) < window:
-            return True
-        conn.execute("REPLACE INTO msgs(chat_id, hash, ts) VALUES (?,?,?)", (int(chat_id), h, now))
-        # best-effort sweep of very old rows
-        if now % 17 == 0:
-            conn.execute("DELETE FROM msgs WHERE ts < ?", (now - 3600,))  # 1h TTL
-    return False
+    return _TG_DEDUP_RING.hit_and_mark(chat_id, text, window)
 
 
 def _tg_norm(text: str) -> str:
@@ -163,7 +197,12 @@ def _tg_norm(text: str) -> str:
 
 
 # --- add: minimal dry-run trade logger (per-chat) ---
-_TRADES_STATE_PATH = os.environ.get("TRADES_STATE_PATH", "dry_trades_log.json")
+from trade_log import TradeLog
+
+_TRADES_STATE_PATH = os.environ.get("TRADES_STATE_PATH", "dry_trades_log.json")  # legacy array
+_TRADES_LOG_PATH = os.environ.get("TRADES_LOG_PATH", "dry_trades_log.jsonl")
+# append-only JSONL + per-chat offset index; the legacy array is imported once
+_TRADE_LOG = TradeLog(_TRADES_LOG_PATH, legacy_path=_TRADES_STATE_PATH)
 
 # --- add: CSV export helper ---
 import csv
@@ -171,7 +210,8 @@ import csv
 _TRADES_EXPORT_DIR = os.environ.get("TRADES_EXPORT_DIR", ".")
 
 
-def _trade_log_export_csv(chat_id: int, rows: list):
+def _trade_log_export_csv(chat_id: int, rows):
+    """Write rows (any iterable, e.g. _TRADE_LOG.iter_chat) to CSV without buffering them."""
     fn = os.path.join(_TRADES_EXPORT_DIR, f"trades_{chat_id}.csv")
     try:
         with open(fn, "w", newline="", encoding="utf-8") as f:
@@ -262,10 +302,7 @@ if "_watchlist_len" not in globals():
 
     def _watchlist_len(chat_id):
         try:
-            if not os.path.exists(_WATCHLIST_STATE_PATH):
-                return 0
-            with open(_WATCHLIST_STATE_PATH, encoding="utf-8") as f:
-                st = json.load(f) or {}
+            st = _load_json_safe(_WATCHLIST_STATE_PATH) or {}
             m = st.get("watchlist_by_chat") or {}
             wl = m.get(str(chat_id)) or m.get(chat_id) or []
             return len(wl)
@@ -381,25 +418,14 @@ def _alerts_interval_set(secs: float) -> float:
 
 def _trade_log_append(entry: dict):
     try:
-        data = []
-        if os.path.exists(_TRADES_STATE_PATH):
-            with open(_TRADES_STATE_PATH, encoding="utf-8") as f:
-                data = json.load(f) or []
-        data.append(entry)
-        with open(_TRADES_STATE_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f)
+        _TRADE_LOG.append(entry)
     except Exception:
         pass  # non-fatal for dry-run
 
 
 def _trade_log_latest(chat_id: int, limit: int = 5):
     try:
-        if not os.path.exists(_TRADES_STATE_PATH):
-            return []
-        with open(_TRADES_STATE_PATH, encoding="utf-8") as f:
-            data = json.load(f) or []
-        rows = [e for e in data if e.get("chat_id") == chat_id]
-        return rows[-max(1, min(limit, 20)) :]  # clamp 1..20
+        return _TRADE_LOG.latest(chat_id, max(1, min(limit, 20)))  # clamp 1..20
     except Exception:
         return []
 
@@ -417,7 +443,7 @@ def render_name_status(mint: str) -> str:
             return {}
 
     overrides = _load("token_name_overrides.json")
-    cache = _load("token_names.json")
+    cache = {mint: _NAMES.get(mint)}
 
     def _fmt_pair(obj):
         if not isinstance(obj, dict):
@@ -506,6 +532,10 @@ def _render_commands_list(is_admin: bool = False) -> str:
         "/alerts_auto_status",
         "/alerts_auto_interval <secs> (admin)",
         "/alerts_eta",
+        "/perf_stats (admin)",
+        "/cache_stats (admin)",
+        "/quarantine (admin)",
+        "/quarantine_clear <MINT|all> (admin)",
     ]
     # --- add: hide (admin) rows for non-admins ---
     help_text = "*Commands:*\n" + "\n".join(f"• `{c}`" for c in cmds)
@@ -551,6 +581,10 @@ def _render_help(is_admin: bool) -> str:
         "`/alerts_auto_off` (admin)",
         "`/alerts_auto_status` (admin)",
         "`/alerts_auto_interval <secs>` (admin)",
+        "`/perf_stats` (admin)",
+        "`/cache_stats` (admin)",
+        "`/quarantine` (admin)",
+        "`/quarantine_clear <MINT|all>` (admin)",
     ]
 
     # ensure scanners admin rows are present (idempotent)
@@ -598,6 +632,10 @@ _ADMIN_HELP_PATTERNS = {
     "/scanners_on",
     "/scanners_off",
     "/scanners_reload",
+    "/perf_stats",
+    "/cache_stats",
+    "/quarantine",
+    "/quarantine_clear",
 }  # extend if you add more admin-only commands
 
 
@@ -647,16 +685,17 @@ def _cmd_watch(chat_id, args):
 
     _save_json_safe("scanner_state.json", state)
 
+    names = resolve_names(added + already)
     lines = ["*Watchlist*"]
     if added:
         lines.append("Added:")
         for m in added:
-            t, ln = _display_name_for(m)
+            t, ln = _display_pair(names.get(m), m)
             lines.append(_format_watch_row(m, t, ln))
     if already:
         lines.append("Already present:")
         for m in already:
-            t, ln = _display_name_for(m)
+            t, ln = _display_pair(names.get(m), m)
             lines.append(_format_watch_row(m, t, ln))
     if invalid:
         lines.append("Ignored (invalid):")
@@ -695,11 +734,11 @@ def _cmd_watchlist(chat_id, args):
 
     # Parallel data processing to prevent blocking on slow tokens
     parallel_results = build_watchlist_parallel(mode or "prices", bucket)
+    names = resolve_names(bucket)
 
     rows = []
     for mint, stat_value in parallel_results:
-        # Use existing helper that returns (symbol, name)
-        sym, name = _display_name_for(mint)
+        sym, name = _display_pair(names.get(mint), mint)
         short = _short_mint(mint)
 
         line = f"{sym} — {name}  {stat_value}  `{short}`"
@@ -843,7 +882,36 @@ JUP_CATALOG_TTL = 24 * 60 * 60  # 24h
 OVERRIDES_FILE = "token_overrides.json"
 
 
+# --- add: state store (alerts/watch/scanner JSON documents live in state.db) ---
+from state_store import STATE as _STATE
+
+# tick loops flush once per tick; this covers writes from command handlers
+_STATE.start_flusher()
+# --- end add ---
+
+# --- add: quarantine for mints no provider knows (exponential re-probe, /quarantine) ---
+from quarantine import Quarantine
+
+_QUARANTINE = Quarantine(_STATE)
+# --- end add ---
+
+# --- add: token name cache (token_names.json parsed once, dirty entries flushed on a timer) ---
+from name_cache import NAMES as _NAMES
+
+_NAMES.start_flusher()
+# --- end add ---
+
+# --- add: name resolution: mmapped Jupiter catalog index + first-wins race on misses ---
+from jup_catalog import JupCatalog
+from name_resolver import NAME_RACE as _NAME_RACE
+from name_resolver import race_names
+
+# --- end add ---
+
+
 def _load_json_safe(path):
+    if _STATE.manages(path):
+        return _STATE.load(path, {})
     try:
         return json.load(open(path))
     except FileNotFoundError:
@@ -853,6 +921,9 @@ def _load_json_safe(path):
 
 
 def _save_json_safe(path, data):
+    if _STATE.manages(path):
+        _STATE.save(path, data)
+        return
     try:
         with open(path, "w") as f:
             json.dump(data, f)
@@ -883,6 +954,24 @@ def _http_get_json(url, headers=None, params=None, timeout=8):
     return None
 
 
+class _NameSourceError(Exception):
+    """A name source failed (rate limit, server error): not a definitive miss."""
+
+
+def _name_get_json(url, headers=None, params=None, timeout=8):
+    """
+    _http_get_json for name sources. 429s and other non-200 answers raise, so
+    race_names() counts them in `errors` and the quarantine never sees them as a miss;
+    only a 404 (the source does not know the token) comes back as None.
+    """
+    r = _get(url, headers=headers or {}, params=params or {}, timeout=timeout)
+    if r.status_code == 200:
+        return r.json()
+    if r.status_code == 404:
+        return None
+    raise _NameSourceError(f"{url}: HTTP {r.status_code}")
+
+
 def _dexscreener_token_pairs(mint: str) -> dict:
     # Light, unauthenticated; returns {"pairs":[ ... ]}
     try:
@@ -1563,57 +1652,63 @@ def _get_holders_val(mint: str):
 
 
 # === TOKEN VALIDATION AND CACHED PRIMITIVE GETTERS ===
+_TTL_CACHE_NEG_S = float(os.getenv("TTL_CACHE_NEG_TTL", "15"))  # retry misses sooner
+
+
 def _is_known_token(mint: str) -> bool:
     """Quick check if token/mint can be resolved - prevents unnecessary network calls"""
     if not mint or len(mint) < 8:
         return False
     # Check if it's a valid base58-like string (Solana mint format)
-    if not re.match(r"^[A-HJ-NP-Z1-9]{32,44}$", mint):
-        # Try ticker resolution
-        try:
-            resolved = resolve_token_any(mint)
-            return resolved is not None and resolved != mint
-        except Exception:
-            return False
+    if not re.match(r"^[1-9A-HJ-NP-Za-km-z]{32,44}$", mint):
+        # Ticker: local reverse index only, never a network lookup
+        return _SYMBOLS.resolve(mint) is not None
     return True
 
 
-@ttl_cache(60)
+@ttl_cache(60, neg_ttl=_TTL_CACHE_NEG_S)
 def _cached_price_usd(mint: str):
     """Cached price getter with 60s TTL"""
     return _to_float_any(_get_price_usd_for(mint))
 
 
-@ttl_cache(60)
+@ttl_cache(60, neg_ttl=_TTL_CACHE_NEG_S)
 def _cached_supply_val(mint: str):
     """Cached supply getter with 60s TTL"""
     return _get_supply_val_raw(mint)
 
 
-@ttl_cache(60)
+@ttl_cache(60, neg_ttl=_TTL_CACHE_NEG_S)
 def _cached_holders_val(mint: str):
     """Cached holders getter with 60s TTL"""
     return _get_holders_val_raw(mint)
 
 
-@ttl_cache(60)
+@ttl_cache(60, neg_ttl=_TTL_CACHE_NEG_S)
 def _cached_fdv_val(mint: str):
     """Cached FDV getter with 60s TTL"""
     return _get_fdv_val_raw(mint)
 
 
-@ttl_cache(60)
+@ttl_cache(60, neg_ttl=_TTL_CACHE_NEG_S)
 def _cached_volume_val(mint: str):
     """Cached volume getter with 60s TTL"""
     return _get_vol24_val_raw(mint)
 
 
 # === PARALLEL WATCHLIST BUILDER ===
+# Quarantine kind each mode depends on; a name quarantine must not hide prices or supply
+_STAT_QUARANTINE_KIND = {"prices": "price", "caps": "price"}
+
+
 def stat_for(mode: str, mint: str) -> str:
     """Get formatted stat for a single token with timeout protection and short-circuiting"""
-    # Short-circuit unknown tokens - don't hit network if can't resolve
+    # Short-circuit unknown and quarantined tokens - don't hit network if can't resolve
     if not _is_known_token(mint):
         return "?"
+    kind = _STAT_QUARANTINE_KIND.get(mode)
+    if kind and _QUARANTINE.active(mint, kind):
+        return "?"
 
     # Increased timeouts to reduce false positives on slow links
     if mode == "supply":
@@ -1646,11 +1741,37 @@ def stat_for(mode: str, mint: str) -> str:
     return "?"
 
 
+# Async engine (watchlist_engine.py): shared httpx client, per-host semaphores, one
+# deadline per request, results streamed per mint. WATCHLIST_ENGINE=threads keeps the
+# old 8-thread stat_for() path.
+from watchlist_engine import ENGINE as _WL_ENGINE
+
+_WATCHLIST_ENGINE = os.getenv("WATCHLIST_ENGINE", "async").lower()
+_WL_STAT_FMT = {
+    "prices": lambda v: _fmt_usd(v),
+    "fdv": lambda v: _fmt_usd(v),
+    "caps": lambda v: _fmt_usd(v),
+    "volumes": lambda v: _fmt_usd(v),
+    "supply": _fmt_qty_2dp,
+    "holders": _fmt_int_commas,
+}
+
+
 def build_watchlist_parallel(mode: str, tokens: list[str]) -> list[tuple[str, str]]:
     """Build watchlist in parallel to prevent blocking on slow tokens"""
     if not tokens:
         return []
 
+    if _WATCHLIST_ENGINE == "async":
+        fmt = _WL_STAT_FMT.get(mode)
+        results = {}
+        if fmt:
+            # Short-circuit unknown tokens - don't hit network if can't resolve
+            known = [m for m in tokens if _is_known_token(m)]
+            for mint, val in _WL_ENGINE.stream(mode, known):
+                results[mint] = fmt(val) if val is not None else "?"
+        return [(mint, results.get(mint, "?")) for mint in tokens]
+
     with cf.ThreadPoolExecutor(max_workers=min(8, len(tokens))) as ex:
         futs = {ex.submit(stat_for, mode, mint): mint for mint in tokens}
         results = {}
@@ -1791,6 +1912,7 @@ def _pick_holders_field(ov: dict):
     return next((ov.get(k) for k in keys if ov.get(k) is not None), None)
 
 
+@single_flight("overview")
 def _get_token_overview(mint: str) -> dict | None:
     """Use the same source as /liquidity & /marketcap."""
     try:
@@ -1852,7 +1974,7 @@ def _name_from_birdeye(mint: str) -> tuple[str | None, str | None]:
     # Try the v3 market-data endpoint which includes symbol/name when available
     url = "https://public-api.birdeye.so/defi/v3/token/market-data"
     d = (
-        _http_get_json(url, headers=_birdeye_headers(), params={"address": mint, "chain": "solana"})
+        _name_get_json(url, headers=_birdeye_headers(), params={"address": mint, "chain": "solana"})
         or {}
     )
     dd = d.get("data") or {}
@@ -1863,12 +1985,12 @@ def _name_from_birdeye(mint: str) -> tuple[str | None, str | None]:
 
 def _name_from_jupiter(mint: str) -> tuple[str | None, str | None]:
     # Jupiter token info has symbol/name
-    d = _http_get_json(f"https://tokens.jup.ag/token/{mint}") or {}
+    d = _name_get_json(f"https://tokens.jup.ag/token/{mint}") or {}
     return _normalize_symbol(d.get("symbol")), d.get("name")
 
 
 def _name_from_dexscreener(mint: str) -> tuple[str | None, str | None]:
-    d = _http_get_json(f"https://api.dexscreener.com/latest/dex/tokens/{mint}") or {}
+    d = _name_get_json(f"https://api.dexscreener.com/latest/dex/tokens/{mint}") or {}
     pairs = d.get("pairs") or []
     if not pairs:
         return None, None
@@ -1877,35 +1999,33 @@ def _name_from_dexscreener(mint: str) -> tuple[str | None, str | None]:
 
 
 def _name_from_solscan(mint: str) -> tuple[str | None, str | None]:
-    d = _http_get_json("https://api.solscan.io/token/meta", params={"tokenAddress": mint}) or {}
+    d = _name_get_json("https://api.solscan.io/token/meta", params={"tokenAddress": mint}) or {}
     return _normalize_symbol(d.get("symbol")), d.get("name")
 
 
 # ===== Jupiter catalog (bulk) =====
+def _jup_catalog_fetch():
+    for t in _http_get_json("https://tokens.jup.ag/tokens") or []:
+        mint = t.get("address") or t.get("mint") or t.get("id")
+        if mint:
+            yield mint, _normalize_symbol(t.get("symbol")), t.get("name")
+
+
+# mmapped mint -> (symbol, name) index; refreshed in the background after JUP_CATALOG_TTL
+_JUP_CATALOG = JupCatalog(
+    fetch=_jup_catalog_fetch, ttl=JUP_CATALOG_TTL, legacy_json=JUP_CATALOG_FILE
+)
+
+
 def _ensure_jup_catalog(force: bool = False):
-    cat = _load_json_safe(JUP_CATALOG_FILE)
-    ts = int(cat.get("ts", 0))
-    stale = (time.time() - ts) > JUP_CATALOG_TTL
-    if force or stale or not cat.get("by_mint"):
-        arr = _http_get_json("https://tokens.jup.ag/tokens") or []
-        by_mint = {}
-        for t in arr:
-            mint = t.get("address") or t.get("mint") or t.get("id")
-            if not mint:
-                continue
-            sym = _normalize_symbol(t.get("symbol"))
-            name = t.get("name")
-            if sym or name:
-                by_mint[mint] = {"symbol": sym, "name": name}
-        cat = {"ts": int(time.time()), "by_mint": by_mint}
-        _save_json_safe(JUP_CATALOG_FILE, cat)
-    return cat
+    if force:
+        _JUP_CATALOG.refresh()
+    return _JUP_CATALOG
 
 
 def _name_from_jup_catalog(mint: str) -> tuple[str | None, str | None]:
-    cat = _ensure_jup_catalog()
-    d = (cat.get("by_mint") or {}).get(mint) or {}
-    return _normalize_symbol(d.get("symbol")), d.get("name")
+    sym, name = _JUP_CATALOG.lookup(mint) or (None, None)
+    return _normalize_symbol(sym), name
 
 
 # ===== Name overrides system =====
@@ -1928,6 +2048,59 @@ def _name_overrides_clear(mint: str):
         _save_json_safe(OVERRIDES_FILE, o)
 
 
+# --- add: reverse symbol -> mint index (overrides, builtins, name cache, Jupiter catalog) ---
+from symbol_index import SymbolIndex
+
+
+def _file_version(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_ino
+    except OSError:
+        return None
+
+
+def _symbol_rows_overrides():
+    for mint, d in _load_json_safe(OVERRIDES_FILE).items():
+        if isinstance(d, dict):
+            yield mint, d.get("primary")
+            yield mint, d.get("secondary")  # long names were matched too
+
+
+def _symbol_rows_builtin():
+    for table in (TICKER_MINTS, BIRDEYE_MINT_ALIASES, _FALLBACK_TICKER_TO_MINT):
+        for sym, mint in table.items():
+            yield mint, sym
+
+
+def _symbol_rows_names():
+    for mint, ent in _NAMES.snapshot().items():
+        yield mint, _coerce_cache_entry(ent).get("primary")
+
+
+def _symbol_rows_jupiter():
+    for mint, sym, _name in _JUP_CATALOG.items():
+        yield mint, sym
+
+
+def _symbol_watch_weight(mint: str) -> float:
+    """Chats watching a mint: ranks mints that share a ticker."""
+    by_chat = _STATE.get("scanner_state.json", "watchlist_by_chat", {}) or {}
+    return sum(1 for wl in by_chat.values() if mint in (wl or ()))
+
+
+_SYMBOLS = SymbolIndex()
+_SYMBOLS.add_source("overrides", _symbol_rows_overrides, lambda: _file_version(OVERRIDES_FILE))
+_SYMBOLS.add_source("builtin", _symbol_rows_builtin)
+_SYMBOLS.add_source("names", _symbol_rows_names, _NAMES.version)
+# the catalog only answers unambiguous tickers: many tokens copy popular symbols
+_SYMBOLS.add_source(
+    "jupiter", _symbol_rows_jupiter, _JUP_CATALOG.version, background=True, unique=True
+)
+_SYMBOLS.set_weight(_symbol_watch_weight)
+# --- end add ---
+
+
 # Public aliases for external use
 def name_override_get(mint: str):
     d = _load_json_safe(OVERRIDES_FILE).get(mint) or {}
@@ -1943,22 +2116,48 @@ def name_override_clear(mint: str):
 
 
 # === PRICE CACHE ===
-_PRICE_CACHE = {}  # key -> (value, expiry_ts)
+# One two-tier cache (in-process LRU + shared SQLite) for all price/metadata lookups;
+# every key is namespaced, e.g. ("px", src, mint) or ("overview", mint).
+from price_cache import CACHE as _PCACHE
 
+_PRICE_TTL_S = float(os.getenv("PRICE_CACHE_TTL", "15"))
+_PRICE_STALE_S = float(os.getenv("PRICE_CACHE_STALE", "15"))  # stale-while-revalidate
+_PRICE_NEG_TTL_S = float(os.getenv("PRICE_CACHE_NEG_TTL", "20"))  # failed lookups
 
-def _cache_get(key: str, now: float, default=None):
-    v = _PRICE_CACHE.get(key)
-    if not v:
-        return default
-    val, exp = v
-    if now >= exp:
-        _PRICE_CACHE.pop(key, None)
-        return default
-    return val
+# Rolling per-provider/per-endpoint health + circuit breakers; orders birdeye/dex
+# fallbacks by recent health and skips endpoints whose circuit is open.
+from provider_health import HEDGE as _HEDGE_STATS
+from provider_health import ROUTER as _HEALTH
+from provider_health import hedged_call
 
+# Hedged mode: the next provider starts in parallel once the current one has been
+# quiet for ~p50 x PRICE_HEDGE_P50_MULT; first valid answer before the deadline wins.
+_PRICE_HEDGE = os.getenv("PRICE_HEDGE", "0") == "1"
+_PRICE_HEDGE_INTERACTIVE = os.getenv("PRICE_HEDGE_INTERACTIVE", "1") == "1"  # /price, /fetch
+_PRICE_HEDGE_DEADLINE_S = float(os.getenv("PRICE_HEDGE_DEADLINE", "6"))
 
-def _cache_set(key: str, val, now: float, ttl: float):
-    _PRICE_CACHE[key] = (val, now + ttl)
+
+def _retry_after_s(r):
+    try:
+        return float(r.headers.get("Retry-After") or 0) or None
+    except Exception:
+        return None
+
+
+def _health_chain(preferred: str) -> list[str]:
+    """Network providers in health order (preferred first while healthy), sim last."""
+    net = _HEALTH.order_chain(["birdeye", "dex"], preferred if preferred != "sim" else None)
+    return ["sim"] + net if preferred == "sim" else net + ["sim"]
+
+
+def _hedged_net_price(net: list[str], leg):
+    """
+    Race the network providers in `net` (health order) through hedged_call().
+    leg(tag) -> (value|None, err). Returns (tag, value, last_err).
+    """
+    calls = [(t, lambda t=t: leg(t)) for t in net]
+    tag, val, errs = hedged_call(calls, _HEALTH.hedge_delay_s(net[0]), _PRICE_HEDGE_DEADLINE_S)
+    return tag, val, (errs[-1] if errs else None)
 
 
 # === GLOBAL HELPER FUNCTIONS ===
@@ -2038,21 +2237,17 @@ def _parse_amount(s: str):
 
 
 def _birdeye_price(mint: str, ttl: float = 30.0):
-    import time
+    def _load():
+        try:
+            r = birdeye_req("/defi/price", {"chain": "solana", "address": mint}) or {}
+            v = (r.get("data") or {}).get("value")
+            return float(v) if v is not None else None
+        except Exception:
+            return None
 
-    now = time.time()
-    ck = f"price:{mint}"
-    cached = _cache_get(ck, now)
-    if cached is not None:
-        return cached
-    try:
-        r = birdeye_req("/defi/price", {"chain": "solana", "address": mint}) or {}
-        v = (r.get("data") or {}).get("value")
-        out = float(v) if v is not None else None
-    except Exception:
-        out = None
-    _cache_set(ck, out, now, ttl)
-    return out
+    return _PCACHE.get_or_load(
+        ("birdeye_px", mint), _load, ttl, stale_ttl=_PRICE_STALE_S, neg_ttl=_PRICE_NEG_TTL_S
+    )
 
 
 # Known tickers (extend later)
@@ -2066,8 +2261,7 @@ def _is_mint_like(s: str) -> bool:
 
 
 def _mint_for_symbol(sym: str) -> str | None:
-    sym = (sym or "").strip().upper()
-    return TICKER_MINTS.get(sym)
+    return _SYMBOLS.resolve(sym)
 
 
 def _resolve_to_mint(arg: str) -> str | None:
@@ -2110,6 +2304,15 @@ def _fmt_usd(v) -> str:
 
 
 def _birdeye_token_overview(mint: str) -> dict:
+    def _load():
+        ov = _birdeye_token_overview_raw(mint)
+        return ov if any(v is not None for v in ov.values()) else None
+
+    ov = _PCACHE.get_or_load(("overview", mint), _load, 60, stale_ttl=240, neg_ttl=_PRICE_NEG_TTL_S)
+    return dict(ov) if ov else {"liquidity": None, "v24": None, "mc": None}
+
+
+def _birdeye_token_overview_raw(mint: str) -> dict:
     try:
         r = birdeye_req("/defi/token_overview", {"chain": "solana", "address": mint}) or {}
         d = r.get("data") or {}
@@ -2162,36 +2365,11 @@ def _resolve_token_or_mint(arg: str):
     except (NameError, AttributeError):
         pass
 
-    # Try ticker lookup using existing name overrides and cache
-    try:
-        # Check name overrides first (reverse lookup)
-        overrides = _name_overrides_load()
-        for mint, (primary, secondary) in overrides.items():
-            if primary and primary.upper() == arg.upper():
-                return mint, primary, secondary
-            if secondary and secondary.upper() == arg.upper():
-                return mint, primary, secondary
-
-        # Check token name cache (reverse lookup)
-        try:
-            import json
-
-            with open("token_names.json") as f:
-                cache = json.load(f)
-            for mint, name_data in cache.items():
-                if "\n" in name_data:
-                    parts = name_data.split("\n", 1)
-                    ticker, long_name = parts[0].strip(), parts[1].strip()
-                else:
-                    ticker, long_name = name_data.strip(), ""
-
-                if ticker.upper() == arg.upper():
-                    return mint, ticker, long_name
-        except Exception:
-            pass
-
-    except Exception:
-        pass
+    # Ticker: reverse index over overrides, builtins, name cache and the Jupiter catalog
+    mint = _SYMBOLS.resolve(arg)
+    if mint:
+        ticker, long_name = _display_name_for(mint)
+        return mint, ticker, long_name
 
     return None, None, None
 
@@ -2275,47 +2453,54 @@ def _http_get_json_original(url, headers=None, params=None, timeout=8):
 
 
 def _name_cache_load():
-    try:
-        return json.load(open(NAME_CACHE_PATH))
-    except Exception:
-        return {}
+    return _NAMES.snapshot()
 
 
 def _name_cache_save(d):
-    try:
-        json.dump(d, open(NAME_CACHE_PATH, "w"))
-    except Exception:
-        pass
+    _NAMES.update(d)
 
 
 def _name_from_solscan(mint: str):
-    # Pro key first (optional), then public
+    # Pro key first (optional), then public; raises only if no endpoint answered cleanly
+    err = None
     key = os.getenv("SOLSCAN_API_KEY", "").strip()
     if key:
         url = "https://pro-api.solscan.io/v1.0/market/token/meta"
-        out = _http_get_json(url, headers={"token": key}, params={"address": mint})
+        try:
+            out = _name_get_json(url, headers={"token": key}, params={"address": mint})
+        except _NameSourceError as e:
+            out, err = None, e
         if out and isinstance(out, dict):
             sym = (out.get("symbol") or "").strip()
             name = (out.get("name") or "").strip()
             if sym or name:
                 return {"symbol": sym, "name": name, "src": "solscan-pro"}
     # Public
-    out = _http_get_json("https://api.solscan.io/token/meta", params={"address": mint})
-    if not out or not isinstance(out, dict):
-        out = _http_get_json(
-            "https://public-api.solscan.io/token/meta", params={"tokenAddress": mint}
-        )
-    if out and isinstance(out, dict):
-        # public returns { "symbol": "...", "tokenName": "..." }
-        sym = (out.get("symbol") or "").strip()
-        name = (out.get("tokenName") or out.get("name") or "").strip()
-        if sym or name:
-            return {"symbol": sym, "name": name, "src": "solscan"}
+    answered = False
+    for url, params in (
+        ("https://api.solscan.io/token/meta", {"address": mint}),
+        ("https://public-api.solscan.io/token/meta", {"tokenAddress": mint}),
+    ):
+        try:
+            out = _name_get_json(url, params=params)
+        except _NameSourceError as e:
+            err = e
+            continue
+        answered = True
+        if out and isinstance(out, dict):
+            # public returns { "symbol": "...", "tokenName": "..." }
+            sym = (out.get("symbol") or "").strip()
+            name = (out.get("tokenName") or out.get("name") or "").strip()
+            if sym or name:
+                return {"symbol": sym, "name": name, "src": "solscan"}
+            break
+    if err is not None and not answered:
+        raise err
     return None
 
 
 def _name_from_dexscreener(mint: str):
-    out = _http_get_json(f"https://api.dexscreener.com/latest/dex/tokens/{mint}")
+    out = _name_get_json(f"https://api.dexscreener.com/latest/dex/tokens/{mint}")
     if not out or "pairs" not in out or not out["pairs"]:
         return None
     # Prefer a SOL pair with the mint as baseToken
@@ -2343,7 +2528,12 @@ def _name_from_jupiter(mint: str):
     except Exception:
         fresh = False
     if not fresh:
-        data = _http_get_json("https://tokens.jup.ag/strict")
+        try:
+            data = _name_get_json("https://tokens.jup.ag/strict")
+        except _NameSourceError:
+            if not os.path.exists(JUP_CACHE_PATH):
+                raise  # no list to answer from: an error, not a miss
+            data = None  # keep answering from the stale list
         if isinstance(data, list) and data:
             try:
                 json.dump(data, open(JUP_CACHE_PATH, "w"))
@@ -2374,23 +2564,14 @@ def _history_load():
         return {}
 
 
-def _history_save(d):
-    import json
-
-    json.dump(d, open(PRICE_HISTORY_FILE, "w"))
-
-
 def record_price_point(mint: str, price: float, src: str):
     import time
 
     if not (mint and price and price > 0):
         return
-    d = _history_load()
-    lst = d.get(mint) or []
-    lst.append({"ts": int(time.time()), "price": float(price), "src": src})
-    # keep last ~2 days at 30s cadence ≈ 6k points
-    d[mint] = lst[-6000:]
-    _history_save(d)
+    # binary per-mint store (price_store.py); price_history.json is only read to seed it
+    _PRICE_STORE.append(mint, int(time.time()), float(price))
+    _PRICE_ROLLUP.observe(mint)
 
 
 def pct(a, b):
@@ -2404,19 +2585,16 @@ def window_change(mint: str, secs: int):
     """return (pct_change, ref_price) where ref_price is the price at/just before now-secs"""
     import time
 
-    hist = _history_load().get(mint) or []
-    if not hist:
+    last = _PRICE_STORE.latest(mint)
+    if not last:
         return (None, None)
     cutoff = int(time.time()) - secs
-    # find the last point <= cutoff
-    ref = None
-    for p in reversed(hist):
-        if p["ts"] <= cutoff:
-            ref = p["price"]
-            break
-    if ref is None:
+    # the last point <= cutoff, by bisection
+    hit = _PRICE_STORE.at_or_before(mint, cutoff)
+    if hit is None:
         return (None, None)
-    cur = hist[-1]["price"]
+    ref = hit[1]
+    cur = last[1]
     return (pct(cur, ref), ref)
 
 
@@ -2442,25 +2620,21 @@ def name_line(mint):
 
 
 def _alerts_cfg_load():
-    import json
-
-    try:
-        return json.load(open("alerts_config.json"))
-    except:
-        return {
-            "enabled": True,
-            "chat_id": None,
-            "min_move_pct": 0.01,
-            "rate_per_min": 60,
-            "muted_until": 0,
-            "muted": False,
-        }
+    cfg = _STATE.load("alerts_config.json")
+    if cfg is not None:
+        return cfg
+    return {
+        "enabled": True,
+        "chat_id": None,
+        "min_move_pct": 0.01,
+        "rate_per_min": 60,
+        "muted_until": 0,
+        "muted": False,
+    }
 
 
 def _alerts_cfg_save(d):
-    import json
-
-    json.dump(d, open("alerts_config.json", "w"))
+    _STATE.save("alerts_config.json", d)
 
 
 def get_price_auto(mint: str):
@@ -2562,6 +2736,8 @@ def fetch_timeframes(mint: str):
 
 
 def _load_json(p):
+    if _STATE.manages(p):
+        return _STATE.load(p, {})
     try:
         import json
         import os
@@ -2577,6 +2753,9 @@ def _save_json(p, obj):
     import json
     import os
 
+    if _STATE.manages(p):
+        _STATE.save(p, obj)
+        return
     tmp = p + ".tmp"
     json.dump(obj, open(tmp, "w"))
     os.replace(tmp, p)
@@ -2598,17 +2777,11 @@ os.makedirs(PRICE_HISTORY_DIR, exist_ok=True)
 
 
 def _load_token_cache():
-    try:
-        return json.load(open(TOKEN_NAME_CACHE))
-    except Exception:
-        return {}
+    return _NAMES.snapshot()
 
 
 def _save_token_cache(d):
-    try:
-        json.dump(d, open(TOKEN_NAME_CACHE, "w"))
-    except Exception:
-        pass
+    _NAMES.update(d)
 
 
 def _short(mint: str) -> str:
@@ -2640,20 +2813,7 @@ def _looks_like_mint(s: str) -> bool:
 # if you have overrides set via _name_overrides_set(), the dict is usually _NAME_OVERRIDES
 # keys: mint -> (ticker, long_name)
 def _mint_from_ticker_via_overrides(ticker: str):
-    tt = (ticker or "").strip().upper()
-    d = globals().get("_NAME_OVERRIDES") or globals().get("NAME_OVERRIDES")
-    if isinstance(d, dict):
-        for mint, pair in d.items():
-            if not pair:
-                continue
-            tk = (
-                pair[0]
-                if isinstance(pair, list | tuple)
-                else (pair.get("ticker") if isinstance(pair, dict) else None)
-            )
-            if tk and str(tk).upper() == tt:
-                return mint
-    return None
+    return _SYMBOLS.resolve(ticker, sources=("overrides",))
 
 
 _BUILTIN_TICKERS = {
@@ -2684,50 +2844,61 @@ def _resolve_input_to_mint_and_name(user_arg: str):
 # --------------- end shared: user arg -> (mint, name) -----------------
 
 
-# --- lightweight price history (append-only jsonl per mint) ---
+# --- lightweight price history (binary per mint, see price_store.py) ---
+from price_rollup import RollupEngine
+from price_store import MAX_BYTES as _PRICE_STORE_MAX_BYTES
+from price_store import PriceStore
+
+
 def _history_path(mint: str) -> str:
+    """Legacy per-mint .jsonl (read once to seed the binary store)."""
     return os.path.join(PRICE_HISTORY_DIR, f"{mint}.jsonl")
 
 
+def _legacy_history_points(mint: str):
+    """(ts, price) from the old price_history/<mint>.jsonl and price_history.json."""
+    pts = []
+    try:
+        with open(_history_path(mint), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                    pts.append((int(rec["ts"]), float(rec["price"])))
+                except Exception:
+                    continue
+    except FileNotFoundError:
+        pass
+    for rec in _history_load().get(mint) or []:
+        try:
+            pts.append((int(rec["ts"]), float(rec["price"])))
+        except Exception:
+            continue
+    return pts
+
+
+_PRICE_STORE = PriceStore(PRICE_HISTORY_DIR, legacy_loader=_legacy_history_points)
+# 1m/5m/1h OHLC bars folded from the store; /info windows + "Since tracking" read these
+_PRICE_ROLLUP = RollupEngine(_PRICE_STORE)
+# day segments older than PRICE_HISTORY_RAW_DAYS are downsampled; PRICE_HISTORY_MAX_MB caps disk
+_PRICE_STORE.start_compactor()
+
+
 def _record_price(mint: str, price: float, src: str):
     try:
-        with open(_history_path(mint), "a", encoding="utf-8") as f:
-            f.write(json.dumps({"ts": int(time.time()), "price": float(price), "src": src}) + "\n")
+        _PRICE_STORE.append(mint, int(time.time()), float(price))
+        _PRICE_ROLLUP.observe(mint)
     except Exception:
         logging.exception("history append failed")
 
 
 def _load_price_at_or_before(mint: str, t_target: int) -> float | None:
-    """
-    Scan the mint's .jsonl backwards and return the latest price with ts <= t_target.
-    For small files in our bot this is fine; can be optimized later.
-    """
-    path = _history_path(mint)
-    if not os.path.exists(path):
-        return None
+    """Latest price with ts <= t_target (bisection over the mint's binary history)."""
     try:
-        # read last ~200 lines to keep it light
-        with open(path, "rb") as f:
-            f.seek(0, os.SEEK_END)
-            size = f.tell()
-            chunk = 64 * 1024
-            buf = b""
-            pos = size
-            while pos > 0 and len(buf.splitlines()) < 200:
-                pos = max(0, pos - chunk)
-                f.seek(pos)
-                buf = f.read(size - pos) + buf
-        lines = buf.splitlines()
-        for line in reversed(lines):
-            try:
-                rec = json.loads(line.decode("utf-8"))
-                if int(rec.get("ts", 0)) <= t_target:
-                    return float(rec.get("price"))
-            except Exception:
-                continue
+        hit = _PRICE_STORE.at_or_before(mint, t_target)
     except Exception:
         logging.exception("history read failed")
-    return None
+        return None
+    return hit[1] if hit else None
 
 
 # Build three-line identity for alerts: ticker, name, (short)
@@ -2775,15 +2946,19 @@ def _dot(pct):
 
 def _info_card(mint: str, price_now: float, src: str) -> str:
     """
-    Build enhanced multi-window info card with API-based real-time changes.
+    Build enhanced multi-window info card; changes come from local OHLC rollups,
+    with the API (get_token_changes) only for windows we lack history for.
     Professional format with visual indicators and proper token naming.
     """
     # Get token names using existing resolution system
     primary_name, secondary_name = _token_labels(mint)
     short_mint = _short(mint)
 
-    # Get API-based percentage changes
-    ch = get_token_changes(mint)
+    # Local rollups first; API only fills windows without enough local history
+    ch = _PRICE_ROLLUP.changes(mint, price_now or None)
+    if any(v is None for v in ch.values()):
+        api = get_token_changes(mint)
+        ch = {k: (v if v is not None else api.get(k)) for k, v in ch.items()}
 
     # Build professional info card
     lines = [
@@ -2802,21 +2977,16 @@ def _info_card(mint: str, price_now: float, src: str) -> str:
     ]
 
     # Add tracking history if available (optional enhancement)
-    path = _history_path(mint)
-    if os.path.exists(path):
-        try:
-            with open(path, encoding="utf-8") as f:
-                first = f.readline().strip()
-                if first:
-                    r = json.loads(first)
-                    first_seen_price = float(r.get("price"))
-                    first_seen_ts = int(r.get("ts", 0))
-                    lines.append("")
-                    lines.append(
-                        f"Since tracking: ${first_seen_price:.6f} @ {time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime(first_seen_ts))}"
-                    )
-        except Exception:
-            pass
+    try:
+        first = _PRICE_ROLLUP.since_tracking(mint)
+        if first:
+            first_seen_ts, first_seen_price = first
+            lines.append("")
+            lines.append(
+                f"Since tracking: ${first_seen_price:.6f} @ {time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime(first_seen_ts))}"
+            )
+    except Exception:
+        pass
 
     return "\n".join(lines)
 
@@ -2853,21 +3023,11 @@ def _clean_name(s: str) -> str | None:
 
 
 def _load_token_cache() -> dict:
-    try:
-        import json
-
-        return json.load(open(TOKEN_NAME_CACHE))
-    except Exception:
-        return {}
+    return _NAMES.snapshot()
 
 
 def _save_token_cache(cache: dict) -> None:
-    import json
-
-    try:
-        json.dump(cache, open(TOKEN_NAME_CACHE, "w"))
-    except Exception:
-        pass
+    _NAMES.update(cache)
 
 
 # Back-compat: old cache sometimes stored just {"name": "..."}
@@ -2881,6 +3041,7 @@ def _coerce_cache_entry(ent) -> dict:
     return out
 
 
+@single_flight("labels")
 def _token_labels(mint: str) -> tuple[str | None, str | None]:
     """
     Resolve (primary, secondary) = (ticker, full name).
@@ -2890,16 +3051,14 @@ def _token_labels(mint: str) -> tuple[str | None, str | None]:
     import time
 
     now = int(time.time())
-    cache = _load_token_cache()
-    ent = _coerce_cache_entry(cache.get(mint) or {})
+    ent = _coerce_cache_entry(_NAMES.get(mint) or {})
     if ent and now - int(ent.get("ts") or 0) < 7 * 24 * 3600:
         return ent.get("primary"), ent.get("secondary")
 
     # Special-case SOL
     if mint == SOL_PSEUDO_MINT:
         ent = {"primary": "SOL", "secondary": "Solana", "ts": now}
-        cache[mint] = ent
-        _save_token_cache(cache)
+        _NAMES.set(mint, ent)
         return ent["primary"], ent["secondary"]
 
     primary = None
@@ -2946,8 +3105,7 @@ def _token_labels(mint: str) -> tuple[str | None, str | None]:
         secondary = _short(mint)
 
     ent = {"primary": primary, "secondary": secondary, "ts": now}
-    cache[mint] = ent
-    _save_token_cache(cache)
+    _NAMES.set(mint, ent)
     return primary, secondary
 
 
@@ -2961,9 +3119,8 @@ def resolve_token_name(mint: str, refresh: bool = False) -> str:
     # 1) Hard-coded SOL pseudo-mint stays as-is
     if mint == "So11111111111111111111111111111111111111112":
         primary, secondary = "SOL", "Solana"
-        cache = _load_json_safe(NAME_CACHE_FILE)
-        cache[mint] = {"primary": primary, "secondary": secondary, "ts": int(time.time())}
-        _save_json_safe(NAME_CACHE_FILE, cache)
+        if _NAMES.get(mint) is None:
+            _NAMES.set(mint, {"primary": primary, "secondary": secondary, "ts": int(time.time())})
         return f"{primary}\n{secondary}"
 
     # 2) Local overrides take top priority unless refresh=True
@@ -2973,51 +3130,170 @@ def resolve_token_name(mint: str, refresh: bool = False) -> str:
             return f"{p0}\n{s0}" if (p0 and s0 and s0.upper() != p0) else (p0 or s0)
 
     # 3) Cached value next
-    cache = _load_json_safe(NAME_CACHE_FILE)
-    if not refresh and isinstance(cache.get(mint), dict):
-        p, s = cache[mint].get("primary"), cache[mint].get("secondary")
+    ent = None if refresh else _NAMES.get(mint)
+    if isinstance(ent, dict):
+        p, s = ent.get("primary"), ent.get("secondary")
         if p or s:
             return f"{p}\n{s}" if (p and s and s.upper() != p) else (p or s)
 
-    # 4) Probe live sources + Jupiter catalog
-    cands = []
-    for fn in (
-        _name_from_jupiter,
-        _name_from_birdeye,
-        _name_from_dexscreener,
-        _name_from_solscan,
-        _name_from_jup_catalog,
-    ):
-        try:
-            cands.append(fn(mint))
-        except Exception:
-            continue
+    # 4) Known-unresolvable mints skip the fan-out until their re-probe time
+    if _QUARANTINE.active(mint, "name"):
+        return _short_mint(mint)
 
-    # 5) Pick best
-    valid_cands = [c for c in cands if c is not None and isinstance(c, tuple)]
-    primary = next((p for p, s in valid_cands if p), None)
-    secondary = next((s for p, s in valid_cands if s), None)
+    # 5) Race live sources + Jupiter catalog (first answer per field wins, time-boxed)
+    primary, secondary, timed_out, errors = race_names(
+        [
+            ("jupiter", lambda: _name_from_jupiter(mint)),
+            ("birdeye", lambda: _name_from_birdeye(mint)),
+            ("dexscreener", lambda: _name_from_dexscreener(mint)),
+            ("solscan", lambda: _name_from_solscan(mint)),
+            ("jup_catalog", lambda: _name_from_jup_catalog(mint)),
+        ],
+        clean=_normalize_symbol,
+    )
+    if primary or secondary:
+        _QUARANTINE.ok(mint, "name")
+    elif not timed_out and not errors:  # every source answered, none knows it
+        _QUARANTINE.fail(mint, "name", "no source knows it")
 
     # 6) If still no symbol, derive one from secondary (heuristic)
     if not primary and secondary:
         primary = _heuristic_primary_from_secondary(secondary)
 
-    # 7) Absolute last resort: short mint
+    # 7) Absolute last resort: short mint, not cached (the quarantine schedules re-probes)
     if not primary and not secondary:
-        short = _short_mint(mint)
-        primary = short
-        secondary = short
+        return _short_mint(mint)
     if not secondary:
         secondary = primary
 
     # 8) Cache & return
-    cache[mint] = {"primary": primary, "secondary": secondary, "ts": int(time.time())}
-    _save_json_safe(NAME_CACHE_FILE, cache)
+    _NAMES.set(mint, {"primary": primary, "secondary": secondary, "ts": int(time.time())})
     return f"{primary}\n{secondary}" if (secondary and secondary.upper() != primary) else primary
 
 
-def _alert_label(mint: str) -> str:
-    p, s = _token_labels(mint)
+# --- add: bulk name resolution for renderers (watchlists, tick output) ---
+_DEX_BATCH = 30  # DexScreener /tokens accepts up to 30 comma-separated addresses
+_BIRDEYE_META_BATCH = 50  # Birdeye meta-data/multiple: up to 50 addresses, needs an API key
+
+
+def _names_from_dexscreener_batch(mints: list[str]) -> tuple[dict, set]:
+    """
+    One DexScreener /tokens request per 30 mints. Returns ({mint: (symbol, name)} for
+    mints found, mints whose chunk got a clean answer), so misses in a failed chunk
+    are not mistaken for definitive ones.
+    """
+    out, answered = {}, set()
+    for i in range(0, len(mints), _DEX_BATCH):
+        chunk = mints[i : i + _DEX_BATCH]
+        try:
+            d = _http_get_json(f"https://api.dexscreener.com/latest/dex/tokens/{','.join(chunk)}")
+        except Exception:
+            continue
+        if not isinstance(d, dict):
+            continue
+        answered.update(chunk)
+        for pair in d.get("pairs") or []:
+            bt = pair.get("baseToken") or {}
+            addr = bt.get("address")
+            if addr in chunk and addr not in out:
+                sym, name = _normalize_symbol(bt.get("symbol")), (bt.get("name") or "").strip()
+                if sym or name:
+                    out[addr] = (sym, name or None)
+    return out, answered
+
+
+def _names_from_birdeye_batch(mints: list[str]) -> tuple[dict, set]:
+    """Birdeye multi-token metadata (keyed), 50 mints per request; same shape as above."""
+    out, answered = {}, set()
+    headers = _birdeye_headers()
+    url = "https://public-api.birdeye.so/defi/v3/token/meta-data/multiple"
+    for i in range(0, len(mints), _BIRDEYE_META_BATCH):
+        chunk = mints[i : i + _BIRDEYE_META_BATCH]
+        try:
+            d = _http_get_json(url, headers=headers, params={"list_address": ",".join(chunk)})
+        except Exception:
+            continue
+        if not isinstance(d, dict):
+            continue
+        answered.update(chunk)
+        for addr, meta in (d.get("data") or {}).items():
+            if addr in chunk and isinstance(meta, dict):
+                sym, name = _normalize_symbol(meta.get("symbol")), (meta.get("name") or "").strip()
+                if sym or name:
+                    out[addr] = (sym, name or None)
+    return out, answered
+
+
+def resolve_names(mints) -> dict[str, tuple[str | None, str | None]]:
+    """
+    (primary, secondary) for many mints at once: overrides, the name cache and the
+    Jupiter catalog first (all local), then one batched DexScreener lookup for the rest,
+    then Birdeye's multi-token metadata for what DexScreener missed (when keyed).
+    Resolved names are cached. Mints every batch answered for without knowing them
+    count as a name miss in the quarantine; they map to (None, None).
+    """
+    mints = list(dict.fromkeys(m for m in mints if m))
+    out: dict[str, tuple[str | None, str | None]] = {}
+    overrides = _load_json_safe(OVERRIDES_FILE)
+    now = int(time.time())
+    missing = []
+    for mint in mints:
+        ov = overrides.get(mint) or {}
+        if ov.get("primary") or ov.get("secondary"):
+            out[mint] = (ov.get("primary"), ov.get("secondary"))
+            continue
+        ent = _coerce_cache_entry(_NAMES.get(mint) or {})
+        if ent.get("primary") or ent.get("secondary"):
+            out[mint] = (ent.get("primary"), ent.get("secondary"))
+            continue
+        sym, name = _name_from_jup_catalog(mint)
+        if sym or name:
+            out[mint] = (sym, name or sym)
+            _NAMES.set(mint, {"primary": sym, "secondary": name or sym, "ts": now})
+            continue
+        if not _QUARANTINE.active(mint, "name"):
+            missing.append(mint)
+    if not missing:
+        for mint in mints:
+            out.setdefault(mint, (None, None))
+        return out
+    found, clean = _names_from_dexscreener_batch(missing)
+    left = [m for m in missing if m not in found]
+    if left and _birdeye_headers().get("X-API-KEY"):
+        more, answered = _names_from_birdeye_batch(left)
+        found.update(more)
+        clean &= answered  # a miss only counts when every batch that was asked answered
+    for mint, (sym, name) in found.items():
+        if not sym and name:
+            sym = _heuristic_primary_from_secondary(name)
+        out[mint] = (sym, name or sym)
+        _NAMES.set(mint, {"primary": sym, "secondary": name or sym, "ts": now})
+        _QUARANTINE.ok(mint, "name")
+    for mint in missing:
+        if mint not in found and mint in clean:
+            _QUARANTINE.fail(mint, "name", "no source knows it")
+    for mint in mints:
+        out.setdefault(mint, (None, None))
+    return out
+
+
+def _display_pair(pair, mint: str = "") -> tuple[str, str]:
+    """
+    _display_name_for()-style (ticker, long_name) from a resolve_names() entry; a mint
+    nothing knows shows as its short form, like resolve_token_name().
+    """
+    p, s = pair or (None, None)
+    p, s = (p or "").strip(), (s or "").strip()
+    if not p and not s:
+        return (_short_mint(mint) if mint else "?"), "?"
+    return p or "?", s or "?"
+
+
+# --- end add ---
+
+
+def _alert_label(mint: str, labels: tuple | None = None) -> str:
+    p, s = labels if labels is not None else _token_labels(mint)
     base = p or s or _short(mint)
     if p and s and p.lower() != s.lower():
         base = f"{p} — {s}"
@@ -3025,8 +3301,9 @@ def _alert_label(mint: str) -> str:
 
 
 # Standard token label for alerts: "<Name> (<So11..1112>)"
-def _token_label(mint: str) -> str:
-    return _alert_label(mint)
+def _token_label(mint: str, labels: tuple | None = None) -> str:
+    """labels: a precomputed (primary, secondary) pair, e.g. from resolve_names()."""
+    return _alert_label(mint, labels)
 
 
 # Enhanced alert hook using the new resolver
@@ -3061,25 +3338,32 @@ def post_watch_alert_enhanced(mint, price, base_price, source, chat_id=None):
 ALERTS_API_LOG = "/tmp/alerts_send_api.log"
 
 
-def _alerts_send_html(chat_id: int, text: str):
+def _alerts_api_log(fut):
     try:
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        payload = {
-            "chat_id": chat_id,
-            "text": text,
-            "parse_mode": "HTML",
-            "disable_web_page_preview": True,
-        }
-        r = _post(url, json=payload, timeout=10)
-        success = r.ok
-        # Log result (status + first bytes of body)
-        with open(ALERTS_API_LOG, "a") as f:
-            f.write(f"{int(time.time())} ok={success} code={r.status_code} body={r.text[:160]}\n")
-        return success
+        res = fut.result()
+        code = res.get("error_code") or (200 if res.get("ok") else "")
+        body = str(res.get("description") or "")[:160]
+        line = f"ok={bool(res.get('ok'))} code={code} body={body}"
     except Exception as e:
+        line = f"EXC {type(e).__name__}: {e}"
+    try:
         with open(ALERTS_API_LOG, "a") as f:
-            f.write(f"{int(time.time())} EXC {type(e).__name__}: {e}\n")
-        return False
+            f.write(f"{int(time.time())} {line}\n")
+    except OSError:
+        pass
+
+
+def _alerts_send_html(chat_id: int, text: str):
+    """Queue an HTML alert on the outbox; True once queued (the result is logged)."""
+    payload = {
+        "chat_id": chat_id,
+        "text": text,
+        "parse_mode": "HTML",
+        "disable_web_page_preview": True,
+    }
+    fut = _OUTBOX.submit(payload, token=TELEGRAM_BOT_TOKEN)
+    fut.add_done_callback(_alerts_api_log)
+    return not fut.done() or bool(fut.result().get("ok"))
 
 
 # --- END: alerts HTML sender ---
@@ -3097,6 +3381,71 @@ def _alerts_try_send(
     return _alerts_send_html(chat_id, text)
 
 
+# --- add: per-tick alert digest ---
+# Threshold crossings of one tick are coalesced into ranked cards (alert_digest.py)
+# instead of one message per mint; a chat can opt back into individual messages with
+# /alerts_delivery individual. Per-mint cooldowns are applied before a mint is added.
+from html import escape as _html_escape
+
+from alert_digest import MODES as ALERTS_DELIVERY_MODES
+from alert_digest import Digest as AlertDigest
+from alert_digest import pack as _alert_digest_pack
+
+ALERTS_DELIVERY_DEFAULT = os.environ.get("ALERTS_DELIVERY", "digest")
+
+
+def _alerts_delivery_mode(chat_id) -> str:
+    """'digest' or 'individual' for a chat (alerts_config.json "delivery" map)."""
+    mode = (_alerts_load().get("delivery") or {}).get(str(chat_id))
+    return mode if mode in ALERTS_DELIVERY_MODES else ALERTS_DELIVERY_DEFAULT
+
+
+def _alert_digest_cards(items: list[dict], fmt: str = "html") -> list[str]:
+    """Ranked digest card(s) for one chat; fmt is the parse mode, 'html' or 'mdv2'."""
+    labels = resolve_names([it["mint"] for it in items])
+    n = len(items)
+    lines = []
+    for it in items:
+        d = it["delta_pct"]
+        label = _alert_label(it["mint"], labels.get(it["mint"]))
+        price = f"${float(it.get('price') or 0):,.6f}"
+        src = str(it.get("src") or "?")
+        if fmt == "mdv2":
+            lines.append(
+                f"{_arrow(d)} {_mdv2.bold(f'{d:+.2f}%')} {_mdv2.esc(label)}"
+                f" {_mdv2.esc(price)} · {_mdv2.esc(src)}"
+            )
+        else:
+            lines.append(
+                f"{_arrow(d)} <b>{d:+.2f}%</b> {_html_escape(label)} {price} · {_html_escape(src)}"
+            )
+    if fmt == "mdv2":
+        header = f"🔔 *Price Alerts* · {n} mover{'s' if n != 1 else ''}"
+        return _alert_digest_pack(header, lines, part=" \\({i}/{n}\\)")
+    header = f"🔔 <b>Price Alerts</b> · {n} mover{'s' if n != 1 else ''}"
+    return _alert_digest_pack(header, lines)
+
+
+def _alerts_digest_flush(digest: "AlertDigest", fmt: str = "html") -> dict:
+    """Send each chat's collected crossings as digest card(s); returns {chat_id: cards sent}."""
+    sent = {}
+    for chat_id, items in digest.chats().items():
+        sent[chat_id] = 0
+        for card in _alert_digest_cards(items, fmt):
+            if fmt == "mdv2":
+                ok = alerts_send(card).get("ok")
+            else:
+                ok = _alerts_send_html(chat_id, card)
+            sent[chat_id] += int(bool(ok))
+        logger.info(
+            "[ALERTS] digest chat=%s movers=%d cards=%d", chat_id, len(items), sent[chat_id]
+        )
+    return sent
+
+
+# --- end add ---
+
+
 # ---- Background ticker functions ----
 def watch_tick_internal() -> str:
     """
@@ -3114,16 +3463,24 @@ def watch_tick_internal() -> str:
     checked = 0
     alerts = 0
     out_lines = []
+    digest = AlertDigest()  # this tick's crossings, sent as one ranked card per chat
+
+    mints = [
+        raw.get("mint") if isinstance(raw, dict) else (raw if isinstance(raw, str) else "")
+        for raw in wl
+    ]
+    # One batched lookup per tick instead of a round trip per mint
+    prices = _price_lookup_many([m for m in mints if m])
+    labels = resolve_names(mints)
 
-    for raw in wl:
-        mint = raw.get("mint") if isinstance(raw, dict) else (raw if isinstance(raw, str) else "")
+    for mint in mints:
         if not mint:
             continue
 
         checked += 1
 
         # Get real price with fallback chain
-        r = _price_lookup_any(mint)
+        r = prices.get(mint) or _price_lookup_any(mint)
         last_price = float(r.get("price") or 0.0)
         source = r.get("source") or "n/a"
 
@@ -3146,7 +3503,7 @@ def watch_tick_internal() -> str:
             tri = "△"
 
         # Display line with colorized arrow, token label, and real baseline delta
-        token_label = _token_label(mint)
+        token_label = _token_label(mint, labels.get(mint))
         out_lines.append(
             f"- {token_label} {tri} last=${last_price:.6f} Δ={delta_pct:+.4%} src={source}"
         )
@@ -3154,7 +3511,7 @@ def watch_tick_internal() -> str:
         # Only call alert hook if we have a real price
         if last_price > 0:
             try:
-                result = _post_watch_alert_hook(mint, last_price, source)
+                result = _post_watch_alert_hook(mint, last_price, source, digest=digest)
                 if result and result.get("alerted"):
                     alerts += 1
             except Exception as e:
@@ -3163,6 +3520,11 @@ def watch_tick_internal() -> str:
 
                 pylog.exception("watch alert hook failed for %s: %s", mint, e)
 
+    try:
+        _alerts_digest_flush(digest)
+    except Exception:
+        logger.exception("alert digest send failed")
+    _STATE.flush()  # one transaction for the whole tick's state writes
     body = "\n".join(out_lines) if out_lines else "(no items)"
     return f"🔁 *Watch tick*\nChecked: {checked} • Alerts: {alerts}\n{body}"
 
@@ -3248,6 +3610,19 @@ def _price_lookup_any(mint: str):
     return {"ok": False, "price": 0.0, "source": "n/a"}
 
 
+def _price_lookup_many(mints: list) -> dict:
+    """Batched _price_lookup_any: get_prices() first, per-mint chain only for misses"""
+    try:
+        out = get_prices(mints, _active_price_source())
+    except Exception:
+        out = {}
+    for mint in mints:
+        r = out.get(mint) or {}
+        if not (r.get("ok") and float(r.get("price") or 0) > 0):
+            out[mint] = _price_lookup_any(mint)
+    return out
+
+
 def _alerts_cfg():
     # existing file is alerts_config.json
     return _load_json("alerts_config.json") or {
@@ -3266,7 +3641,6 @@ PRICE_SOURCE_FILE = "price_source.json"
 
 
 def _load_alerts_cfg():
-    import json
 
     cfg = {
         "chat_id": None,
@@ -3275,10 +3649,7 @@ def _load_alerts_cfg():
         "muted_until": 0,
         "muted": False,
     }
-    try:
-        cfg.update(json.load(open(ALERTS_CFG_FILE)))
-    except FileNotFoundError:
-        pass
+    cfg.update(_STATE.load(ALERTS_CFG_FILE, {}))
     cfg["min_move_pct"] = float(cfg.get("min_move_pct", 1.0))
     cfg["rate_per_min"] = int(cfg.get("rate_per_min", 5))
     cfg["muted_until"] = int(cfg.get("muted_until", 0))
@@ -3321,29 +3692,23 @@ def _alerts_can_send(cfg, now_ts, recent_log):
 
 
 def _alert_baseline_get(mint):
-    import json
-
-    try:
-        base = json.load(open(ALERTS_BASELINE_FILE))
-    except FileNotFoundError:
-        base = {}
-    return base.get(mint)
+    return _STATE.get(ALERTS_BASELINE_FILE, mint)
 
 
 def _alert_baseline_set(mint, price, src="watch"):
-    import json
     import time
 
-    try:
-        base = json.load(open(ALERTS_BASELINE_FILE))
-    except FileNotFoundError:
-        base = {}
-    base[mint] = {"price": float(price), "ts": int(time.time()), "src": src}
-    json.dump(base, open(ALERTS_BASELINE_FILE, "w"))
+    _STATE.update(
+        ALERTS_BASELINE_FILE, mint, {"price": float(price), "ts": int(time.time()), "src": src}
+    )
 
 
-def _post_watch_alert_hook(mint: str, price: float, src: str):
-    """Enhanced alert hook with colored arrows, no-price guard, clear trace"""
+def _post_watch_alert_hook(mint: str, price: float, src: str, digest=None):
+    """
+    Enhanced alert hook with colored arrows, no-price guard, clear trace.
+    With a tick's `digest`, a crossing in a digest-mode chat is collected there (and
+    sent with the rest of the tick) instead of being sent on its own.
+    """
     import logging as pylog  # avoid name clash
 
     TRACE = "/tmp/alerts_debug.log"
@@ -3365,8 +3730,8 @@ def _post_watch_alert_hook(mint: str, price: float, src: str):
             pass
         return {"ok": False, "reason": "no-price"}
 
-    base = _load_baseline()
-    bl = base.get(mint)
+    # one row per mint in the state store: read/update just this mint, not the whole file
+    bl = _STATE.get(BASELINE_PATH, mint)
     base_price = float(bl["price"]) if (bl and "price" in bl) else None
 
     delta_pct = None
@@ -3379,7 +3744,7 @@ def _post_watch_alert_hook(mint: str, price: float, src: str):
     # Rate limit
     ok_rate = True
     rl_key = f"_rl_{mint}"
-    last_sent = int(base.get(rl_key, 0))
+    last_sent = int(_STATE.get(BASELINE_PATH, rl_key, 0))
     min_interval = max(1, int(60 / max(1, rate_per_min)))
     if now - last_sent < min_interval:
         ok_rate = False
@@ -3414,17 +3779,20 @@ def _post_watch_alert_hook(mint: str, price: float, src: str):
         pass
 
     # Send and update
-    if should_alert:
+    if should_alert and digest is not None and _alerts_delivery_mode(chat_id) == "digest":
+        _record_price(mint, price, src)
+        digest.add(chat_id, mint, delta_pct, price=price, base=base_price, src=src)
+        _STATE.update(BASELINE_PATH, rl_key, now)
+    elif should_alert:
         try:
             success = _alerts_try_send(chat_id, mint, price, base_price, delta_pct, src)
             if success:
-                base[rl_key] = now
+                _STATE.update(BASELINE_PATH, rl_key, now)
         except Exception as e:
             pylog.exception("HTML alert send failed: %s", e)
 
     # Always refresh baseline if we had a real price
-    base[mint] = {"price": float(price), "ts": now, "src": src}
-    _save_baseline(base)
+    _STATE.update(BASELINE_PATH, mint, {"price": float(price), "ts": now, "src": src})
 
     return {"ok": True, "alerted": should_alert, "delta_pct": delta_pct, "reason": reason}
 
@@ -3550,6 +3918,7 @@ def get_token_changes(mint: str) -> dict:
 
 # --- Alerts wiring: price→group hook (lightweight & safe) --------------------
 # Persists last seen price per mint; honors your alerts_config.json thresholds.
+# Both paths can be overridden; names the state store does not manage stay JSON files.
 ALERTS_CFG_PATH = os.getenv("ALERTS_CFG_PATH", "alerts_config.json")
 ALERTS_BASE_PATH = os.getenv("ALERTS_BASE_PATH", "alerts_price_baseline.json")
 WATCH_STATE_PATH = "watch_state.json"  # per-mint state: last_price, last_alert_ts
@@ -3561,11 +3930,7 @@ _PRICE_BLOCK_RE = re.compile(
 
 
 def _alerts_load_cfg():
-    try:
-        with open(ALERTS_CFG_PATH) as f:
-            cfg = json.load(f)
-    except Exception:
-        cfg = {}
+    cfg = _load_json_safe(ALERTS_CFG_PATH)
     # sane defaults
     cfg.setdefault("chat_id", None)
     cfg.setdefault("min_move_pct", 0.0)  # %; set with /alerts_minmove
@@ -3576,27 +3941,15 @@ def _alerts_load_cfg():
 
 
 def _alerts_save_cfg(cfg):
-    try:
-        with open(ALERTS_CFG_PATH, "w") as f:
-            json.dump(cfg, f, indent=2)
-    except Exception:
-        pass
+    _save_json_safe(ALERTS_CFG_PATH, cfg)
 
 
 def _baseline_load():
-    try:
-        with open(ALERTS_BASE_PATH) as f:
-            return json.load(f)
-    except Exception:
-        return {}
+    return _load_json_safe(ALERTS_BASE_PATH)
 
 
 def _baseline_save(obj):
-    try:
-        with open(ALERTS_BASE_PATH, "w") as f:
-            json.dump(obj, f, indent=2)
-    except Exception:
-        pass
+    _save_json_safe(ALERTS_BASE_PATH, obj)
 
 
 def _alerts_allowed(cfg, now):
@@ -3716,18 +4069,12 @@ def _alerts_defaults():
 
 
 def _alerts_load():
-    try:
-        with open(ALERTS_CFG_FILE) as f:
-            data = json.load(f)
-            return {**_alerts_defaults(), **data}
-    except Exception:
-        return _alerts_defaults()
+    return {**_alerts_defaults(), **_STATE.load(ALERTS_CFG_FILE, {})}
 
 
 def _alerts_save(cfg):
     tmp = {**_alerts_defaults(), **(cfg or {})}
-    with open(ALERTS_CFG_FILE, "w") as f:
-        json.dump(tmp, f, indent=2)
+    _STATE.save(ALERTS_CFG_FILE, tmp)
     return tmp
 
 
@@ -3784,14 +4131,17 @@ def _alerts_settings_text():
         f"chat: {cfg.get('chat_id') or 'not set'}\n"
         f"min_move_pct: {cfg.get('min_move_pct', 0.0):.1f}%\n"
         f"rate_per_min: {cfg.get('rate_per_min', 60)}\n"
+        f"delivery: {_alerts_delivery_mode(cfg.get('chat_id'))}\n"
         f"muted: {mu_txt}"
     )
 
 
-def alerts_send(text, force=False):
+def alerts_send(text, force=False, wait=False):
     """
     Unified alert sender with mute + per-minute throttling.
     Returns dict like tg_send; {'ok':False,'description':'...'} if blocked.
+    The message is queued on the outbox; wait=True blocks for Telegram's answer,
+    otherwise {'ok': True, 'queued': True} is returned once it is queued.
     """
     cfg = _alerts_load()
     chat_id = cfg.get("chat_id")
@@ -3816,23 +4166,25 @@ def alerts_send(text, force=False):
     if not bot_token:
         return {"ok": False, "description": "no bot token"}
 
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
     payload = {
         "chat_id": int(chat_id),
-        "text": text,
+        "text": _mdv2.prepare(text),  # one call: markup is made valid locally
         "parse_mode": "MarkdownV2",
         "disable_web_page_preview": True,
     }
+    if wait:
+        return _OUTBOX.send(payload, token=bot_token)
+    fut = _OUTBOX.submit(payload, token=bot_token)
+    if fut.done():  # rejected (queue full)
+        return fut.result()
+    fut.add_done_callback(_alerts_send_logged)
+    return {"ok": True, "queued": True}
 
-    try:
-        response = _post(url, json=payload, timeout=10)
-        return (
-            response.json()
-            if response.status_code == 200
-            else {"ok": False, "description": f"HTTP {response.status_code}"}
-        )
-    except Exception as e:
-        return {"ok": False, "description": str(e)}
+
+def _alerts_send_logged(fut):
+    res = fut.result() if not fut.cancelled() else {"ok": False}
+    if not res.get("ok"):
+        logger.warning("[ALERTS] send failed: %s", res.get("description"))
 
 
 # --- Enhanced Watch State System: per-mint tracking with sophisticated rate limiting ---
@@ -3840,12 +4192,12 @@ def alerts_send(text, force=False):
 
 def _watch_state_load():
     """Load watch state with per-mint tracking."""
-    return load_json(WATCH_STATE_PATH, {})
+    return _STATE.load(WATCH_STATE_PATH, {})
 
 
 def _watch_state_save(st):
     """Save watch state with per-mint tracking."""
-    save_json(WATCH_STATE_PATH, st)
+    _STATE.save(WATCH_STATE_PATH, st)
     return st
 
 
@@ -3869,12 +4221,25 @@ def _alerts_mark_sent(now_ts: int, st: dict):
 
 
 def watch_eval_and_alert(
-    mint: str, price: float | None, src: str, now_ts: int | None = None
+    mint: str,
+    price: float | None,
+    src: str,
+    now_ts: int | None = None,
+    session=None,
+    digest=None,
 ) -> tuple[bool, str]:
     """
     Compare current price vs last baseline, send alert if |Δ| >= min_move_pct.
     Returns (alert_sent, note). Safe if price is None.
+    Tick loops pass their state session so watch state is loaded and committed once
+    per tick; without one, a single-call session is committed here. With a tick's
+    `digest`, digest-mode alerts are collected there (note "digested") for the tick
+    to send together.
     """
+    if session is None:
+        with _STATE.session() as ss:
+            return watch_eval_and_alert(mint, price, src, now_ts, session=ss, digest=digest)
+
     import time
 
     now_ts = now_ts or int(time.time())
@@ -3885,66 +4250,64 @@ def watch_eval_and_alert(
     chat = cfg.get("chat_id")  # Use chat_id key from existing system
     min_move = _as_float(cfg.get("min_move_pct"), 0.0)  # Use enhanced float parser
 
-    st = _watch_state_load()
+    st = session.doc(WATCH_STATE_PATH, {})
     mint_st = st.setdefault(mint, {})
     last = mint_st.get("last_price")
 
-    # Always record latest price for next tick
+    # Always record latest price for next tick (journaled now, committed with the tick)
     mint_st["last_price"] = price
     mint_st["last_src"] = src
     mint_st["last_ts"] = now_ts
+    session.mark(WATCH_STATE_PATH, mint)
 
     if last is None or min_move <= 0:
-        _watch_state_save(st)
         return False, "baseline_set"
 
     try:
         last_f = _as_float(last, 0.0)
         if last_f is None or last_f <= 0:
-            _watch_state_save(st)
             return False, "invalid_baseline"
         delta_pct = (price - last_f) / last_f * 100.0
     except Exception:
-        _watch_state_save(st)
         return False, "calc_err"
 
     if abs(delta_pct) < min_move:
-        _watch_state_save(st)
         return False, f"below_{min_move}%"
 
     can, why = _alerts_can_send(now_ts, cfg, st, mint)
     if not can:
-        _watch_state_save(st)
         return False, why
 
     # Build alert message
     arrow = "🟢▲" if delta_pct >= 0 else "🔴▼"
     text = (
-        f"{arrow} *ALERT* `{mint[:10]}..`\n"
-        f"*Δ:* {delta_pct:+.2f}%   *price:* ${price:.6f}\n"
-        f"*src:* {src}"
+        f"{arrow} *ALERT* {_mdv2.code(mint[:10] + '..')}\n"
+        f"*Δ:* {_mdv2.esc(f'{delta_pct:+.2f}%')}   *price:* {_mdv2.esc(f'${price:.6f}')}\n"
+        f"*src:* {_mdv2.esc(src)}"
     )
 
-    if chat:
-        try:
-            # Use existing alerts_send system for consistent behavior
-            result = alerts_send(text)
-            if result.get("ok"):
-                _alerts_mark_sent(now_ts, st)
-                mint_st["last_alert_ts"] = now_ts
-                _watch_state_save(st)
-                return True, "sent"
-            else:
-                mint_st["last_err"] = result.get("description", "send_failed")
-                _watch_state_save(st)
-                return False, "send_err"
-        except Exception as e:
-            mint_st["last_err"] = str(e)
-            _watch_state_save(st)
-            return False, "send_err"
-    else:
-        _watch_state_save(st)
+    if not chat:
         return False, "no_chat"
+    if digest is not None and _alerts_delivery_mode(chat) == "digest":
+        digest.add(chat, mint, delta_pct, price=price, base=last_f, src=src)
+        mint_st["last_alert_ts"] = now_ts
+        session.mark(WATCH_STATE_PATH, mint)
+        return True, "digested"
+    try:
+        # Use existing alerts_send system for consistent behavior
+        result = alerts_send(text)
+        if result.get("ok"):
+            _alerts_mark_sent(now_ts, st)
+            mint_st["last_alert_ts"] = now_ts
+            session.mark(WATCH_STATE_PATH, "_global")
+            return True, "sent"
+        mint_st["last_err"] = result.get("description", "send_failed")
+        return False, "send_err"
+    except Exception as e:
+        mint_st["last_err"] = str(e)
+        return False, "send_err"
+    finally:
+        session.mark(WATCH_STATE_PATH, mint)
 
 
 # Define all commands at module scope to avoid UnboundLocalError
@@ -4023,6 +4386,7 @@ ALL_COMMANDS = [
     "/alerts_to_here",
     "/alerts_setchat",
     "/alerts_rate",
+    "/alerts_delivery",
     "/alerts_minmove",
     "/alerts_mute",
     "/alerts_unmute",
@@ -4155,27 +4519,20 @@ WATCH_RUN = {"enabled": True, "thread": None, "tick_secs": 15}
 
 
 def _watch_load():
-    try:
-        return json.load(open(WATCH_CFG_PATH))
-    except Exception:
-        return {"mints": []}
+    cfg = _STATE.load(WATCH_CFG_PATH)
+    return cfg if isinstance(cfg, dict) else {"mints": []}
 
 
 def _watch_save(cfg):
-    with contextlib.suppress(Exception):
-        json.dump(cfg, open(WATCH_CFG_PATH, "w"))
+    _STATE.save(WATCH_CFG_PATH, cfg)
 
 
 def _watch_state_load():
-    try:
-        return json.load(open(WATCH_STATE_PATH))
-    except Exception:
-        return {"baseline": {}, "last": {}}
+    return _STATE.load(WATCH_STATE_PATH) or {"baseline": {}, "last": {}}
 
 
 def _watch_state_save(st):
-    with contextlib.suppress(Exception):
-        json.dump(st, open(WATCH_STATE_PATH, "w"))
+    _STATE.save(WATCH_STATE_PATH, st)
 
 
 def _pct(a, b):
@@ -4225,27 +4582,16 @@ def _normalize_watch_item(item):
 
 
 def _load_watchlist():
-    import json
-    import os
-
-    if not os.path.exists(WATCHLIST_PATH):
-        return []
-    try:
-        data = json.load(open(WATCHLIST_PATH))
-    except Exception:
-        return []
+    data = _STATE.load(WATCHLIST_PATH)
     if not isinstance(data, list):
         return []
     return [_normalize_watch_item(x) for x in data]
 
 
 def _save_watchlist(items):
-    import json
-
     # Always write normalized dict items
     norm = [_normalize_watch_item(x) for x in items]
-    with open(WATCHLIST_PATH, "w") as f:
-        json.dump(norm, f, indent=2)
+    _STATE.save(WATCHLIST_PATH, norm)
 
 
 def _watch_contains(wl, mint):
@@ -4253,9 +4599,6 @@ def _watch_contains(wl, mint):
 
 
 def _load_alerts_cfg():
-    import json
-    import os
-
     path = "alerts_config.json"
     base = {
         "chat_id": None,
@@ -4264,10 +4607,10 @@ def _load_alerts_cfg():
         "muted_until": 0,
         "muted": False,
     }
-    if not os.path.exists(path):
-        return base
     try:
-        cfg = json.load(open(path))
+        cfg = _STATE.load(path)
+        if cfg is None:
+            return base
         if not isinstance(cfg, dict):
             return base
         # normalize known keys
@@ -4294,99 +4637,124 @@ def watch_tick_once(send_alerts=False):
     lines = []
     new_wl = []
 
-    for raw in wl:
-        it = _normalize_watch_item(raw)
-        mint = it.get("mint") or ""
-        if not mint:
-            new_wl.append(it)
-            continue
+    pref = load_current_source()
+    items = [_normalize_watch_item(raw) for raw in wl]
+    prices = get_prices(
+        [it.get("mint") for it in items if it.get("mint")], pref, label_fallback=True
+    )
+    labels = resolve_names([it.get("mint") for it in items])
 
-        pref = load_current_source()
-        info = get_price_with_preference(mint, pref)
-        if not info or not info.get("ok"):
-            new_wl.append(it)
-            continue
+    # state is committed on exit, also when a mint raises mid-tick
+    with _STATE.session() as ss:
+        digest = AlertDigest()
+        for it in items:
+            mint = it.get("mint") or ""
+            if not mint:
+                new_wl.append(it)
+                continue
 
-        price = info.get("price")
-        src = info.get("source", "n/a")
-        logging.info(f"[watch_tick] mint={mint} preferred={pref} resolved_src={src} price={price}")
-        if price is None:
-            new_wl.append(it)
-            continue
+            info = prices.get(mint)
+            if not info or not info.get("ok"):
+                new_wl.append(it)
+                continue
+
+            price = info.get("price")
+            src = info.get("source", "n/a")
+            logging.info(
+                f"[watch_tick] mint={mint} preferred={pref} resolved_src={src} price={price}"
+            )
+            if price is None:
+                new_wl.append(it)
+                continue
 
-        checked += 1
+            checked += 1
 
-        last = it.get("last")
-        last_f = _as_float(last, None)
-        if last_f in (None, 0.0):
-            delta = 0.0  # first baseline set, no alert
-        else:
-            delta = round((price - last_f) / last_f * 100.0, 2)
+            last = it.get("last")
+            last_f = _as_float(last, None)
+            if last_f in (None, 0.0):
+                delta = 0.0  # first baseline set, no alert
+            else:
+                delta = round((price - last_f) / last_f * 100.0, 2)
 
-        it["last"] = price
-        it["delta_pct"] = delta
-        it["src"] = src
-        new_wl.append(it)
+            it["last"] = price
+            it["delta_pct"] = delta
+            it["src"] = src
+            new_wl.append(it)
 
-        lines.append(f"- {_token_label(mint)}  last=${price:.6f}  Δ={delta:+.2f}%  src={src}")
+            label = _token_label(mint, labels.get(mint))
+            lines.append(f"- {label}  last=${price:.6f}  Δ={delta:+.2f}%  src={src}")
 
-        # Enhanced dual-layer alert processing with detailed tracking
-        if send_alerts and abs(delta) >= min_move:
-            try:
-                # Use enhanced watch_eval_and_alert for sophisticated tracking
-                sent, note = watch_eval_and_alert(mint, price, src)
-                if sent:
-                    fired += 1
-                # Add detailed note to lines for debugging/monitoring
-                lines.append(
-                    f"   Alert: {_token_label(mint)} ${price:.6f} Δ={delta:+.2f}% src={src} note={note}"
-                )
-            except Exception:
-                # Fallback to simple alert system
+            # Enhanced dual-layer alert processing with detailed tracking
+            if send_alerts and abs(delta) >= min_move:
                 try:
-                    if "alerts_send" in globals():
-                        alerts_send(f"📈 {mint} {delta:+.2f}% price=${price:.6f} src={src}")
+                    # Use enhanced watch_eval_and_alert for sophisticated tracking
+                    sent, note = watch_eval_and_alert(mint, price, src, session=ss, digest=digest)
+                    if sent:
                         fired += 1
-                        lines.append(
-                            f"   Alert: {mint[:10]}.. ${price:.6f} Δ={delta:+.2f}% src={src} note=fallback_sent"
-                        )
-                except Exception:
+                    # Add detailed note to lines for debugging/monitoring
                     lines.append(
-                        f"   Alert: {mint[:10]}.. ${price:.6f} Δ={delta:+.2f}% src={src} note=failed"
+                        f"   Alert: {label} ${price:.6f} Δ={delta:+.2f}% src={src} note={note}"
                     )
+                except Exception:
+                    # Fallback to simple alert system
+                    try:
+                        if "alerts_send" in globals():
+                            alerts_send(f"📈 {mint} {delta:+.2f}% price=${price:.6f} src={src}")
+                            fired += 1
+                            lines.append(
+                                f"   Alert: {mint[:10]}.. ${price:.6f} Δ={delta:+.2f}% src={src} note=fallback_sent"
+                            )
+                    except Exception:
+                        lines.append(
+                            f"   Alert: {mint[:10]}.. ${price:.6f} Δ={delta:+.2f}% src={src} note=failed"
+                        )
+
+        if len(digest):
+            st = ss.doc(WATCH_STATE_PATH, {})
+            now_ts = int(time.time())
+            for _ in range(sum(_alerts_digest_flush(digest, fmt="mdv2").values())):
+                _alerts_mark_sent(now_ts, st)  # the per-minute budget counts cards
+            ss.mark(WATCH_STATE_PATH, "_global")
 
-    _save_watchlist(new_wl)
+        _save_watchlist(new_wl)
     return checked, fired, lines
 
 
 def _watch_tick_once():
     """Legacy wrapper for backwards compatibility"""
     cfg = _watch_load()
-    st = _watch_state_load()
     if not cfg.get("mints"):
         return
     alerts_cfg = _alerts_load_cfg()
     min_move = _as_float(alerts_cfg.get("min_move_pct", 0.0), 0.0)
-    for mint in list(cfg.get("mints", [])):
+    mints = list(cfg.get("mints", []))
+    # uses selected /source with fallbacks, batched across the whole list
+    prices = get_prices(mints, load_current_source(), label_fallback=True)
+    # state is loaded once and committed once, also when a mint raises mid-tick
+    with _STATE.session() as ss:
+        st = ss.doc(WATCH_STATE_PATH, {})
+        st.setdefault("baseline", {})
+        st.setdefault("last", {})
         try:
-            pr = get_price_with_preference(mint)  # uses selected /source with fallbacks
-            if not pr.get("ok"):
-                continue
-            price = _as_float(pr["price"], 0.0)
-            src = pr.get("source", "?")
-            base = st["baseline"].get(mint)
-            st["last"].get(mint)
-            st["last"][mint] = price
-            if base is None:
-                st["baseline"][mint] = price
-                continue
-            move = _pct(price, base)
-            if abs(move) >= min_move:
-                _watch_alert(mint, price, src, move, alerts_cfg)
-                # reset baseline after alert so we don't spam
-                st["baseline"][mint] = price
+            for mint in mints:
+                pr = prices.get(mint) or get_price_with_preference(mint)
+                if not pr.get("ok"):
+                    continue
+                price = _as_float(pr["price"], 0.0)
+                src = pr.get("source", "?")
+                base = st["baseline"].get(mint)
+                st["last"][mint] = price
+                if base is None:
+                    st["baseline"][mint] = price
+                    continue
+                move = _pct(price, base)
+                if abs(move) >= min_move:
+                    _watch_alert(mint, price, src, move, alerts_cfg)
+                    # reset baseline after alert so we don't spam
+                    st["baseline"][mint] = price
         finally:
-            _watch_state_save(st)
+            ss.mark(WATCH_STATE_PATH, "baseline")
+            ss.mark(WATCH_STATE_PATH, "last")
 
 
 def _watch_loop():
@@ -4404,10 +4772,6 @@ def watch_start():
     t.start()
 
 
-# simple 15s cache: key=(source,mint) -> {price,ts}
-_PRICE_CACHE = {}
-_PRICE_TTL_S = 15
-
 PRICE_SOURCE_PATH = "/tmp/mork_price_source"
 
 
@@ -4419,35 +4783,49 @@ def load_current_source() -> str:
         return "sim"
 
 
-def get_price_with_preference(mint: str, preferred: str | None = None) -> dict:
+def get_price_with_preference(
+    mint: str, preferred: str | None = None, hedge: bool | None = None
+) -> dict:
     """
     Unified price fetch with clear source labeling and graceful fallback.
+    hedge=None follows PRICE_HEDGE; hedged mode races birdeye/dex (see get_price).
     Returns: {ok: bool, price: float|None, source: str, cached: bool|None}
     """
     preferred = (preferred or load_current_source()).lower()
-    chain = [preferred] + [s for s in ("birdeye", "dex", "sim") if s != preferred]
-    # NOTE: existing functions return dict format: {"ok": bool, "price": float, "source": str}
-    for prov in chain:
+    chain = _health_chain(preferred)
+    hedge = _PRICE_HEDGE if hedge is None else hedge
+
+    def _call(prov):
+        # NOTE: existing functions return dict format: {"ok": bool, "price": float, "source": str}
         if prov == "birdeye":
-            result = price_birdeye(mint)
-        elif prov == "dex":
-            result = price_dexscreener(mint) if "price_dexscreener" in globals() else {"ok": False}
-        else:
-            # sim always succeeds
-            result = price_sim(mint)
+            return price_birdeye(mint)
+        if prov == "dex":
+            return price_dex(mint)
+        # sim always succeeds
+        return price_sim(mint)
+
+    def _label(prov):
+        # Check if this is the preferred source or a fallback
+        is_preferred = prov == preferred
+        is_sim_fallback = prov == "sim" and preferred == "sim"
+        return prov if is_preferred or is_sim_fallback else f"{prov} (fallback from {preferred})"
+
+    if hedge and chain[0] != "sim":
+
+        def _leg(prov):
+            res = _call(prov) or {}
+            ok = res.get("ok") and res.get("price") is not None
+            return (float(res["price"]) if ok else None), res.get("err")
+
+        prov, px, _ = _hedged_net_price(chain[:-1], _leg)
+        if px is not None:
+            return {"ok": True, "price": px, "source": _label(prov)}
+        chain = chain[-1:]
 
+    for prov in chain:
+        result = _call(prov)
         if result.get("ok") and result.get("price") is not None:
-            px = result["price"]
-            # Check if this is the preferred source or a fallback
-            is_preferred = prov == preferred
-            is_sim_fallback = prov == "sim" and preferred == "sim"
-
-            if is_preferred or is_sim_fallback:
-                label = prov
-            else:
-                label = f"{prov} (fallback from {preferred})"
-
-            return {"ok": True, "price": float(px), "source": label}
+            return {"ok": True, "price": float(result["price"]), "source": _label(prov)}
     # ultimate guard
     return {
         "ok": True,
@@ -4457,18 +4835,32 @@ def get_price_with_preference(mint: str, preferred: str | None = None) -> dict:
 
 
 def _cache_get(src, mint):
-    k = (src, mint)
-    v = _PRICE_CACHE.get(k)
-    if not v:
-        return None
-    if time.time() - v["ts"] > _PRICE_TTL_S:
-        _PRICE_CACHE.pop(k, None)
-        return None
-    return v["price"]
+    """Fresh per-provider price from the shared cache, else None."""
+    return _PCACHE.get(("px", src, mint))
 
 
 def _cache_put(src, mint, price):
-    _PRICE_CACHE[(src, mint)] = {"price": price, "ts": time.time()}
+    _PCACHE.set(("px", src, mint), float(price), _PRICE_TTL_S, _PRICE_STALE_S)
+
+
+def _cached_provider_price(tag: str, fn, mint: str):
+    """
+    (state, price, err) for one provider through the shared cache.
+    Stale prices are served while a background refresh runs; provider
+    failures are cached negatively so the chain skips them for a while.
+    """
+    errs = []
+
+    def _load():
+        res = fn(mint) or {}
+        if res.get("ok") and res.get("price") is not None:
+            return float(res["price"])
+        errs.append(res.get("err"))
+        return None
+
+    st, px = _PCACHE.load(("px", tag, mint), _load, _PRICE_TTL_S, _PRICE_STALE_S, _PRICE_NEG_TTL_S)
+    err = errs[0] if errs else (f"{tag} recently failed" if px is None else None)
+    return st, px, err
 
 
 def _read_price_source():
@@ -4501,10 +4893,21 @@ def price_sim(mint):
 
 # ── Price provider: DexScreener
 def price_dex(mint, timeout=6):
+    if not _HEALTH.allow("dex", "/tokens"):
+        return {"ok": False, "err": "dex circuit open"}
+    t0 = time.time()
     try:
         # token search endpoint
         url = f"https://api.dexscreener.com/latest/dex/tokens/{mint}"
         r = requests.get(url, timeout=timeout)
+        _HEALTH.record(
+            "dex",
+            "/tokens",
+            r.status_code == 200,
+            time.time() - t0,
+            r.status_code,
+            _retry_after_s(r),
+        )
         if r.status_code != 200:
             return {"ok": False, "err": f"dex http {r.status_code}"}
         j = r.json()
@@ -4516,12 +4919,16 @@ def price_dex(mint, timeout=6):
         price = float(pairs[0].get("priceUsd") or 0)
         if price <= 0:
             return {"ok": False, "err": "dex invalid price"}
+        _HEALTH.mark_good("dex", "/tokens")
         return {"ok": True, "price": price, "source": "dex"}
     except Exception as e:
+        if "r" not in locals():
+            _HEALTH.record("dex", "/tokens", False, time.time() - t0)
         return {"ok": False, "err": f"dex error: {e}"}
 
 
 # ── Price provider: Birdeye (requires BIRDEYE_API_KEY)
+@single_flight("birdeye")
 def price_birdeye(mint: str):
     import json
     import os
@@ -4534,6 +4941,8 @@ def price_birdeye(mint: str):
     mint = normalize_mint(mint)
     if not is_valid_mint(mint):
         return {"ok": False, "err": "invalid mint format"}
+    if _QUARANTINE.active(mint, "price"):
+        return {"ok": False, "err": "birdeye: mint quarantined (no price data)"}
     sess = requests.Session()
     base = "https://public-api.birdeye.so"
     headers = {
@@ -4552,7 +4961,21 @@ def price_birdeye(mint: str):
             qp["address"] = mint
         if params:
             qp.update(params)
-        r = sess.get(url, headers=headers, params=qp, timeout=8)
+        t0 = time.time()
+        try:
+            r = sess.get(url, headers=headers, params=qp, timeout=8)
+        except Exception as e:
+            _HEALTH.record("birdeye", path, False, time.time() - t0)
+            print(f"INFO:birdeye_req error path={path} err={e}")
+            return None
+        _HEALTH.record(
+            "birdeye",
+            path,
+            r.status_code == 200,
+            time.time() - t0,
+            r.status_code,
+            _retry_after_s(r),
+        )
         body_snip = (r.text or "")[:120].replace("\n", " ")
         print(
             f"INFO:birdeye_req status={r.status_code} path={path} qp={json.dumps(qp, separators=(',', ':'))} body~={body_snip!r}"
@@ -4592,49 +5015,231 @@ def price_birdeye(mint: str):
                     return float(v)
         return None
 
-    for path, multi in [
-        ("/defi/price", False),
-        ("/public/price", False),
-        ("/defi/v3/token/market-data", False),
-        ("/public/multi_price", True),
-        ("/defi/multi_price", True),
-    ]:
-        j = _req(path, multi=multi)
+    endpoints = {
+        "/defi/price": False,
+        "/public/price": False,
+        "/defi/v3/token/market-data": False,
+        "/public/multi_price": True,
+        "/defi/multi_price": True,
+    }
+    # last endpoint that worked first, then by health; open circuits are skipped
+    tried = answered = 0
+    for path in _HEALTH.order_endpoints("birdeye", list(endpoints)):
+        if not _HEALTH.allow("birdeye", path):
+            continue
+        tried += 1
+        j = _req(path, multi=endpoints[path])
+        answered += j is not None
         p = _extract_price(j)
         if p:
+            _HEALTH.mark_good("birdeye", path)
+            _QUARANTINE.ok(mint, "price")
             return {"ok": True, "price": p, "source": "birdeye"}
+    if not tried:
+        return {"ok": False, "err": "birdeye circuit open"}
+    if answered:  # Birdeye responded but has no price for this mint
+        _QUARANTINE.fail(mint, "price", "birdeye has no price")
     return {"ok": False, "err": "birdeye all endpoints failed"}
 
 
-def get_price(mint, preferred=None):
+def get_price(mint, preferred=None, hedge=None):
     """
     Resolve price using preferred source with graceful fallback.
     Order: preferred → (birdeye → dex → sim)
+    hedge=None follows PRICE_HEDGE. Hedged: birdeye/dex are raced with a
+    p50-based stagger and a deadline instead of strictly one after another;
+    sim still answers last if neither does.
     """
     preferred = (preferred or _read_price_source()).lower()
-    chain = []
-    if preferred == "birdeye":
-        chain = [price_birdeye, price_dex, price_sim]
-    elif preferred == "dex":
-        chain = [price_dex, price_birdeye, price_sim]
-    else:
-        chain = [price_sim, price_birdeye, price_dex]
+    fns = {"birdeye": price_birdeye, "dex": price_dex, "sim": price_sim}
+    order = _health_chain(preferred if preferred in fns else "sim")
+    hedge = _PRICE_HEDGE if hedge is None else hedge
 
     last_err = None
+    if hedge and order[0] != "sim":
+
+        def _leg(tag):
+            st, px, err = _cached_provider_price(tag, fns[tag], mint)
+            return ((st, px) if px is not None else None), err
+
+        tag, val, last_err = _hedged_net_price(order[:-1], _leg)
+        if val is not None:
+            st, px = val
+            res = {"ok": True, "price": px, "source": tag}
+            if st != "loaded":
+                res["cached"] = True
+            return res
+        order = order[-1:]
+
+    chain = [fns[p] for p in order]
     for fn in chain:
         # cache check per function identity name (source tag)
         tag = fn.__name__.replace("price_", "")
-        cached = _cache_get(tag, mint)
-        if cached is not None:
-            return {"ok": True, "price": cached, "source": tag, "cached": True}
-        res = fn(mint)
-        if res.get("ok"):
-            _cache_put(res["source"], mint, res["price"])
+        st, px, err = _cached_provider_price(tag, fn, mint)
+        if px is not None:
+            res = {"ok": True, "price": px, "source": tag}
+            if st != "loaded":
+                res["cached"] = True
             return res
-        last_err = res.get("err")
+        last_err = err
     return {"ok": False, "err": last_err or "all providers failed"}
 
 
+# --- add: batched multi-mint price fetch (tick loops) ---
+_BIRDEYE_MULTI_CHUNK = int(os.getenv("BIRDEYE_MULTI_CHUNK", "100"))  # multi_price cap
+_DEX_TOKENS_CHUNK = 30  # DexScreener /tokens/ accepts up to 30 comma-separated mints
+
+
+def _chunks(seq, n):
+    for i in range(0, len(seq), max(1, n)):
+        yield seq[i : i + n]
+
+
+def _birdeye_multi_price(mints: list[str]) -> dict[str, float]:
+    """One /defi/multi_price call per chunk; returns {mint: price} for the hits only."""
+    api_key = os.getenv("BIRDEYE_API_KEY", "").strip()
+    if not api_key or not mints:
+        return {}
+    headers = {
+        "X-API-KEY": api_key,
+        "X-Chain": "solana",
+        "Accept": "application/json",
+        "User-Agent": "fetch-bot/1.0",
+    }
+    out = {}
+    for chunk in _chunks(mints, _BIRDEYE_MULTI_CHUNK):
+        if not _HEALTH.allow("birdeye", "/defi/multi_price"):
+            break
+        t0 = time.time()
+        try:
+            r = _get(
+                f"{BIRDEYE_BASE}/defi/multi_price",
+                headers=headers,
+                params={"chain": "solana", "list_address": ",".join(chunk)},
+                timeout=8,
+            )
+            _HEALTH.record(
+                "birdeye",
+                "/defi/multi_price",
+                r.status_code == 200,
+                time.time() - t0,
+                r.status_code,
+                _retry_after_s(r),
+            )
+            if r.status_code != 200:
+                logger.info("birdeye multi_price status=%s n=%d", r.status_code, len(chunk))
+                continue
+            data = (r.json() or {}).get("data") or {}
+        except Exception as e:
+            _HEALTH.record("birdeye", "/defi/multi_price", False, time.time() - t0)
+            logger.info("birdeye multi_price error n=%d err=%s", len(chunk), e)
+            continue
+        for m in chunk:
+            node = data.get(m)
+            if not isinstance(node, dict):
+                continue
+            try:
+                f = float(node.get("value"))
+                if math.isfinite(f) and f > 0:
+                    out[m] = f
+            except Exception:
+                pass
+    return out
+
+
+def _dex_multi_price(mints: list[str]) -> dict[str, float]:
+    """Comma-separated DexScreener /tokens/ lookup; highest-liquidity pair wins per mint."""
+    out = {}
+    best_liq = {}
+    for chunk in _chunks(mints, _DEX_TOKENS_CHUNK):
+        if not _HEALTH.allow("dex", "/tokens"):
+            break
+        t0 = time.time()
+        try:
+            r = _get(DEXS_URL + ",".join(chunk), timeout=6)
+            _HEALTH.record(
+                "dex",
+                "/tokens",
+                r.status_code == 200,
+                time.time() - t0,
+                r.status_code,
+                _retry_after_s(r),
+            )
+            if r.status_code != 200:
+                continue
+            pairs = (r.json() or {}).get("pairs") or []
+        except Exception as e:
+            _HEALTH.record("dex", "/tokens", False, time.time() - t0)
+            logger.info("dex multi price error n=%d err=%s", len(chunk), e)
+            continue
+        wanted = set(chunk)
+        for p in pairs:
+            m = ((p or {}).get("baseToken") or {}).get("address")
+            if m not in wanted:
+                continue
+            try:
+                price = float(p.get("priceUsd") or 0)
+                liq = float((p.get("liquidity") or {}).get("usd") or 0)
+            except Exception:
+                continue
+            if price > 0 and liq >= best_liq.get(m, -1.0):
+                best_liq[m] = liq
+                out[m] = price
+    return out
+
+
+def get_prices(mints, preferred=None, label_fallback: bool = False) -> dict:
+    """
+    Batch counterpart of get_price(): {mint: {ok, price, source[, cached]}}.
+    Network providers are queried once per chunk in preferred order; only the
+    mints that none of them priced fall back to per-mint get_price().
+    With label_fallback=True sources read like get_price_with_preference()
+    ("dex (fallback from birdeye)").
+    """
+    preferred = (preferred or _read_price_source()).lower()
+    mints = list(dict.fromkeys(m for m in (mints or []) if m))
+    if preferred in ("birdeye", "dex"):
+        chain = _HEALTH.order_chain(["birdeye", "dex"], preferred)
+    else:
+        # sim is first in get_price() and always answers; nothing to batch
+        return {m: price_sim(m) for m in mints}
+
+    batch = {"birdeye": _birdeye_multi_price, "dex": _dex_multi_price}
+
+    def _label(tag):
+        if label_fallback and tag != preferred:
+            return f"{tag} (fallback from {preferred})"
+        return tag
+
+    out = {}
+    for tag in chain:
+        todo = []
+        for m in mints:
+            if m in out:
+                continue
+            cached = _cache_get(tag, m)
+            if cached is not None:
+                out[m] = {"ok": True, "price": cached, "source": _label(tag), "cached": True}
+            else:
+                todo.append(m)
+        if not todo:
+            continue
+        for m, px in batch[tag](todo).items():
+            _cache_put(tag, m, px)
+            out[m] = {"ok": True, "price": px, "source": _label(tag)}
+
+    for m in mints:
+        if m not in out:
+            res = get_price(m, preferred)
+            if label_fallback and res.get("ok"):
+                res = dict(res, source=_label(res.get("source") or "sim"))
+            out[m] = res
+    return out
+
+
+# --- end add ---
+
+
 import json
 import queue
 import time
@@ -4669,38 +5274,13 @@ def _looks_like_mint(s: str) -> bool:
     return 32 <= len(s) <= 44 and all(ch in _BASE58 for ch in s)
 
 
-def _iter_name_overrides():
-    """
-    Yields (mint, ticker, long_name) from whatever override store we have.
-    Works with either _NAME_OVERRIDES or NAME_OVERRIDES and via
-    name_override_* helpers if present. Falls back to empty if none exist.
-    """
-    store = globals().get("_NAME_OVERRIDES") or globals().get("NAME_OVERRIDES") or {}
-    for m, tup in getattr(store, "items", list)():
-        # support either tuple or dict shape
-        if isinstance(tup, list | tuple) and len(tup) >= 2:
-            yield m, str(tup[0]), str(tup[1])
-        elif isinstance(tup, dict):
-            yield m, str(tup.get("ticker", "")), str(tup.get("name", ""))
-
-
 def _ticker_to_mint(sym: str) -> str | None:
     """
-    Resolve a ticker symbol to a mint via overrides, else fallback table.
-    Compare uppercase against override tickers (case-insensitive).
+    Resolve a ticker symbol to a mint via the reverse symbol index
+    (overrides first, then builtins, name cache and the Jupiter catalog, the catalog
+    only for symbols a single token uses).
     """
-    s = (sym or "").strip()
-    if not s:
-        return None
-    su = s.upper()
-    # overrides first
-    for m, tkr, _ in _iter_name_overrides():
-        if tkr and tkr.upper() == su:
-            return m
-    # fallback table (SOL etc.)
-    if su in _FALLBACK_TICKER_TO_MINT:
-        return _FALLBACK_TICKER_TO_MINT[su]
-    return None
+    return _SYMBOLS.resolve(sym)
 
 
 def _resolve_arg_to_mint(arg: str) -> str | None:
@@ -4839,42 +5419,217 @@ def _render_auto_status_card() -> str:
 
 # --- end helper ---
 
-# --- content-aware dedupe for tg_send ---------------------------------------
-# content-aware de-dup memory: (chat_id, msg_hash) -> last_sent_ts
-_LAST_SENT: dict[tuple[int, str], float] = {}
 
+# --- perf stats card (admin) ---
+def _render_perf_stats() -> str:
+    sf = single_flight_stats()
+    lines = [
+        "📈 *Perf stats*",
+        "",
+        "*Single\\-flight*",
+        f"calls: `{sf['calls']}` coalesced: `{sf['coalesced']}` in\\-flight: `{sf['inflight']}`",
+    ]
+    for prov, st in sorted(sf["by_provider"].items()):
+        lines.append(f"• `{prov}`: `{st['coalesced']}`/`{st['calls']}` coalesced")
+    pc = _PCACHE.snapshot()
+    lines += [
+        "",
+        "*Price cache*",
+        f"L1: `{pc['l1_hits']}` hits, size `{pc['l1_size']}`, evicted `{pc['l1_evictions']}`",
+        f"L2 (shared): `{pc['l2_hits']}` hits{'' if pc['shared'] else ' (disabled)'}",
+        f"miss: `{pc['misses']}` stale: `{pc['stale_served']}` neg: `{pc['negative_hits']}`"
+        f" refresh: `{pc['refreshes']}`",
+    ]
+    dx = _DEADLINE_EXECUTOR.snapshot()
+    lines += [
+        "",
+        "*Deadline executor* \\(with\\_timeout\\)",
+        f"queue: `{dx['queue_depth']}` \\(max `{dx['max_queue_depth']}`\\)"
+        f" running: `{dx['running']}`/`{dx['workers']}`",
+        f"done: `{dx['completed']}` abandoned: `{dx['abandoned']}` expired: `{dx['expired']}`"
+        f" rejected: `{dx['rejected']}` errors: `{dx['errors']}`",
+    ]
+    ob = _OUTBOX.snapshot()
+    p50 = f"{ob['latency_p50_ms']:.0f}ms" if ob["latency_p50_ms"] is not None else "—"
+    p95 = f"{ob['latency_p95_ms']:.0f}ms" if ob["latency_p95_ms"] is not None else "—"
+    rtt = f"{ob['send_avg_ms']:.0f}ms" if ob["send_avg_ms"] is not None else "—"
+    lines += [
+        "",
+        "*Telegram outbox*",
+        f"queue: `{ob['queue_depth']}` \\(max `{ob['max_queue_depth']}`\\)"
+        f" in\\-flight: `{ob['inflight']}`/`{ob['workers']}` paused chats: `{ob['paused_chats']}`",
+        f"sent: `{ob['sent']}` failed: `{ob['failed']}` errors: `{ob['errors']}`"
+        f" dropped: `{ob['dropped']}`",
+        f"429s: `{ob['rate_limited']}` retries: `{ob['retries']}` throttled: `{ob['throttled']}`",
+        f"latency p50 `{p50}` p95 `{p95}` http avg `{rtt}`",
+    ]
+    dd = _TG_DEDUP_RING.snapshot()
+    ring = "shared ring" if dd["shared"] else "process\\-local"
+    lines += [
+        "",
+        f"*Send dedup* \\({ring}, `{dd['span_s']:.0f}`s span\\)",
+        f"checks: `{dd['checks']}` duplicates: `{dd['hits']}` expired buckets:"
+        f" `{dd['expired_buckets']}` overflows: `{dd['overflows']}`",
+    ]
+    md = _mdv2.STATS.snapshot()
+    lines += [
+        "",
+        "*MarkdownV2 rendering* \\(one call per message\\)",
+        f"messages: `{md['messages']}` valid as\\-is: `{md['as_is']}` repaired: `{md['repaired']}`"
+        f" plain fallbacks: `{md['plain_fallback']}`",
+    ]
+    we = _WL_ENGINE.snapshot()
+    lines += [
+        "",
+        f"*Watchlist engine* (`{_WATCHLIST_ENGINE}`)",
+        f"runs: `{we['runs']}` requests: `{we['requests']}` errors: `{we['errors']}`"
+        f" deadline misses: `{we['deadline_misses']}` cache hits: `{we['cache_hits']}`",
+    ]
+    ss = _STATE.snapshot()
+    lines += [
+        "",
+        f"*State store* \\(write\\-behind {'on' if ss['write_behind'] else 'off'}\\)",
+        f"loads: `{ss['loads']}` saves: `{ss['saves']}` pending: `{ss['pending']}`",
+        f"flushes: `{ss['flushes']}` upserts: `{ss['rows_written']}` deletes: `{ss['rows_deleted']}`"
+        f" last: `{ss['last_flush_ms']:.1f}` ms errors: `{ss['errors']}`",
+    ]
+    ph = _PRICE_STORE.snapshot()
+    lines += [
+        "",
+        "*Price history*",
+        f"mints: `{ph['mints']}` disk: `{ph['bytes'] / 1048576:.1f}` MB"
+        f" \\(budget `{_PRICE_STORE_MAX_BYTES / 1048576:.0f}` MB\\)",
+        f"retention runs: `{ph['runs']}` compacted: `{ph['compacted']}` dropped: `{ph['dropped']}`",
+    ]
+    nr = _NAME_RACE.snapshot()
+    lines += [
+        "",
+        "*Name resolution* \\(first\\-wins race\\)",
+        f"misses: `{nr['calls']}` complete: `{nr['complete']}` budget hit: `{nr['timeouts']}`",
+    ]
+    for src, st in sorted(nr["by_source"].items(), key=lambda kv: -kv[1]["first_rate"]):
+        avg = f"{st['avg_ms']:.0f}ms" if st["avg_ms"] is not None else "—"
+        lines.append(
+            f"• `{src}`: first `{st['first']}`/`{st['launched']}` answered `{st['answered']}`"
+            f" avg `{avg}`"
+        )
+    hs = _HEDGE_STATS.snapshot()
+    lines += [
+        "",
+        f"*Hedged price* ({'on' if _PRICE_HEDGE else 'off'} by default)",
+        f"calls: `{hs['calls']}` deadline misses: `{hs['timeouts']}`",
+    ]
+    for prov, st in sorted(hs["by_provider"].items()):
+        lines.append(
+            f"• `{prov}`: hedge rate `{st['hedge_rate'] * 100:.0f}%`"
+            f" win rate `{st['win_rate'] * 100:.0f}%` \\(`{st['wins']}`/`{st['launched']}`\\)"
+        )
+    return "\n".join(lines)
+
+
+# --- end perf stats card ---
 
-def _dedupe_recent(chat_id: int, text: str, ttl: float = 3.0) -> bool:
-    """
-    Return True if the exact same message text was sent to this chat within `ttl` seconds.
-    """
-    import logging
-    import time
 
-    h = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
-    key = (chat_id, h)
-    now = time.time()
-    last = _LAST_SENT.get(key, 0.0)
-    if now - last < ttl:
-        logging.info(f"[SEND] deduped chat_id={chat_id} within {ttl}s (key={h})")
-        return True
-    _LAST_SENT[key] = now
-    # light GC
-    if len(_LAST_SENT) > 1000:
-        for k, t in list(_LAST_SENT.items()):
-            if now - t > ttl:
-                _LAST_SENT.pop(k, None)
-    return False
+# --- cache stats card (admin) ---
+def _render_cache_stats() -> str:
+    lines = ["🗄 *Cache stats*"]
+    for name, st in memo_stats().items():
+        looks = st["hits"] + st["negative_hits"] + st["misses"]
+        rate = (st["hits"] + st["negative_hits"]) / looks * 100 if looks else 0.0
+        lines += [
+            "",
+            f"*{_escape_mdv2(name)}* size `{st['size']}`/`{st['maxsize']}`"
+            f" ttl `{st['ttl']:.0f}s`/neg `{st['neg_ttl']:.0f}s`",
+            f"hit `{st['hits']}` neg `{st['negative_hits']}` miss `{st['misses']}`"
+            f" \\({rate:.0f}%\\) coalesced `{st['coalesced']}`",
+            f"evicted `{st['evictions']}` refresh `{st['refreshes']}` errors `{st['errors']}`",
+        ]
+    nc = _NAMES.stats()
+    looks = nc["hits"] + nc["misses"]
+    lines += [
+        "",
+        f"*token\\_names* size `{nc['size']}` dirty `{nc['dirty']}`",
+        f"hit `{nc['hits']}` miss `{nc['misses']}`"
+        f" \\({(nc['hits'] / looks * 100 if looks else 0.0):.0f}%\\)",
+        f"sets `{nc['sets']}` flushes `{nc['flushes']}` reloads `{nc['reloads']}`",
+    ]
+    jc = _JUP_CATALOG.stats()
+    age = f"{jc['age_s'] / 3600:.1f}h" if jc["age_s"] is not None else "—"
+    busy = " \\(refreshing\\)" if jc["refreshing"] else ""
+    lines += [
+        "",
+        f"*jupiter\\_catalog* tokens `{jc['tokens']}` age `{age}`{busy}",
+        f"lookups `{jc['lookups']}` hits `{jc['hits']}` refreshes `{jc['refreshes']}`"
+        f" errors `{jc['refresh_errors']}`",
+    ]
+    return "\n".join(lines)
+
+
+# --- end cache stats card ---
+
+
+# --- quarantine list (admin) ---
+def _render_quarantine(limit: int = 30) -> str:
+    ents = _QUARANTINE.entries()
+    qs = _QUARANTINE.stats()
+    lines = [
+        f"🚧 *Quarantined mints* `{len(ents)}`",
+        f"skipped lookups `{qs['skipped']}` released `{qs['released']}`",
+    ]
+    for e in ents[:limit]:
+        lines.append(
+            f"• `{e['mint']}` {_escape_mdv2(e['kind'])} misses `{e['fails']}`"
+            f" re\\-probe in `{e['left_s'] / 60:.0f}m`"
+        )
+    if len(ents) > limit:
+        lines.append(f"… and `{len(ents) - limit}` more")
+    lines.append("Clear with `/quarantine_clear <MINT|all>`")
+    return "\n".join(lines)
+
+
+# --- end quarantine list ---
+
+
+# --- provider health table (/source) ---
+_HEALTH_ICON = {"closed": "✅", "half_open": "🟡", "open": "⛔"}
+
+
+def _render_provider_health() -> str:
+    rows = _HEALTH.snapshot()
+    if not rows:
+        return "**Health:** no provider calls yet"
+    lines = ["**Health** (last 10m, ⭐ = last good endpoint)"]
+    for r in rows:
+        p50 = f"{r['p50_ms']:.0f}ms" if r["p50_ms"] is not None else "—"
+        line = (
+            f"{_HEALTH_ICON.get(r['state'], '')} `{r['provider']} {r['endpoint']}`"
+            f" n={r['n']} err={r['err'] * 100:.0f}% 429={r['r429'] * r['n']:.0f} p50={p50}"
+        )
+        if r["state"] == "open":
+            line += f" retry in {r['cooldown_left']:.0f}s"
+        if r["last_good"]:
+            line += " ⭐"
+        lines.append(line)
+    order = " → ".join(_health_chain(_read_price_source()))
+    lines.append(f"**Chain now:** {order}")
+    return "\n".join(lines)
+
+
+# --- end provider health table ---
+
+# --- add: outbound Telegram dispatcher ---
+# Bot API sends are queued to tg_outbox.py workers (pooled keep-alive session, per-chat +
+# global token buckets, 429 retry_after honoured) instead of posting on the caller's thread.
+# MarkdownV2 is made valid locally (mdv2.py) so each message is a single send.
+import mdv2 as _mdv2
+from tg_outbox import OUTBOX as _OUTBOX
+
+# --- end add ---
 
 
 # --- Shared Telegram send with MarkdownV2 fallback (used by webhook & poller) ---
 def _escape_mdv2(text: str) -> str:
-    if text is None:
-        return ""
-    text = text.replace("\\", "\\\\")
-    for ch in "_*[]()~`>#+-=|{}.!":
-        text = text.replace(ch, f"\\{ch}")
-    return text
+    return _mdv2.esc(text)
 
 
 def tg_send(
@@ -4886,20 +5641,14 @@ def tg_send(
     force: bool = False,
 ):
     """
-    Telegram send with dual-layer deduplication: content-aware + cross-process.
-    Uses in-memory hash for fast content deduplication and SQLite for cross-worker protection.
+    Telegram send with content-aware deduplication across all workers: identical text
+    to the same chat within the dedup window (at least 3s) is skipped unless forced.
     """
     text = _tg_norm(text)
 
-    # Content-aware de-dup: skip identical text within 3s unless forced
-    if not force and _dedupe_recent(chat_id, text, ttl=3.0):
-        return {"ok": True, "deduped": True}
-
-    # Second layer: cross-process deduplication (SQLite-based) - also respect force flag
-    if not force and _tg_dedup_hit_and_mark(chat_id, text):
-        logger.info(
-            "[SEND] deduped chat_id=%s within %ss (cross-proc)", chat_id, TG_DEDUP_WINDOW_SEC
-        )
+    window = max(3, TG_DEDUP_WINDOW_SEC)
+    if not force and _tg_dedup_hit_and_mark(chat_id, text, window):
+        logger.info("[SEND] deduped chat_id=%s within %ss", chat_id, window)
         return {"ok": True, "deduped": True, "layer": "cross-process"}
 
     token = os.getenv("TELEGRAM_BOT_TOKEN", "")
@@ -4907,59 +5656,37 @@ def tg_send(
         logger.error("[SEND] Missing TELEGRAM_BOT_TOKEN")
         return {"ok": False, "error": "no_token"}
 
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-
     def _try_send(mode, body):
-        try:
-            p = {
-                "chat_id": chat_id,
-                "text": body,
-                "disable_web_page_preview": no_preview or not preview,
-            }
-            if mode:
-                p["parse_mode"] = mode
-            r = _post(url, json=p, timeout=15)
-            try:
-                j = (
-                    r.json()
-                    if r.headers.get("content-type", "").startswith("application/json")
-                    else {"ok": False}
-                )
-            except Exception:
-                j = {"ok": False}
-            return j if (r.status_code == 200 and j.get("ok")) else False
-        except Exception as e:
-            logger.warning("[SEND] exception mode=%s chat_id=%s err=%s", mode, chat_id, e)
-            return False
-
-    sent = False
-
-    # 1) as-is in MarkdownV2
-    if not sent and parse_mode == "MarkdownV2":
-        sent = _try_send("MarkdownV2", text)
-        if sent:
-            logger.info("[SEND] ok=mdv2 chat_id=%s", chat_id)
+        # paced by the outbox; waits for the answer so a parse error can fall back
+        p = {
+            "chat_id": chat_id,
+            "text": body,
+            "disable_web_page_preview": no_preview or not preview,
+        }
+        if mode:
+            p["parse_mode"] = mode
+        j = _OUTBOX.send(p, token=token)
+        if not j.get("ok"):
+            logger.warning(
+                "[SEND] failed mode=%s chat_id=%s err=%s", mode, chat_id, j.get("description")
+            )
+        return j
+
+    # MarkdownV2 is rendered locally (mdv2.py: entities kept, stray specials escaped), so
+    # one call normally suffices; plain text only if Telegram still rejects the markup
+    if parse_mode == "MarkdownV2":
+        res = _try_send("MarkdownV2", _mdv2.prepare(text))
+        if not res.get("ok") and "parse entities" in str(res.get("description") or ""):
+            _mdv2.note_fallback()
+            res = _try_send(None, text)
+    else:
+        res = _try_send(None, text)
 
-    # 2) escaped MarkdownV2 fallback
-    if not sent and parse_mode == "MarkdownV2":
-        try:
-            escaped = _escape_mdv2(text)
-        except Exception:
-            escaped = text
-        sent = _try_send("MarkdownV2", escaped)
-        if sent:
-            logger.info("[SEND] ok=mdv2_escaped chat_id=%s", chat_id)
-
-    # 3) plain text
-    if not sent:
-        sent = _try_send(None, text)
-        if sent:
-            logger.info("[SEND] ok=plain chat_id=%s", chat_id)
-
-    if not sent:
-        logger.warning("[SEND] all-attempts-failed chat_id=%s", chat_id)
+    if not res.get("ok"):
+        logger.warning("[SEND] failed chat_id=%s", chat_id)
         return {"ok": False}
 
+    logger.info("[SEND] ok chat_id=%s", chat_id)
     return {"ok": True}
 
 
@@ -5069,17 +5796,16 @@ def send_admin_md(text: str):
         admin_id = int(os.environ.get("ASSISTANT_ADMIN_TELEGRAM_ID", "0") or 0)
         if not bot_token or not admin_id:
             return False
-        requests.post(
-            f"https://api.telegram.org/bot{bot_token}/sendMessage",
-            json={
+        fut = _OUTBOX.submit(
+            {
                 "chat_id": admin_id,
                 "text": text,
                 "parse_mode": "Markdown",
                 "disable_web_page_preview": True,
             },
-            timeout=10,
+            token=bot_token,
         )
-        return True
+        return not fut.done() or bool(fut.result().get("ok"))
     except Exception as e:
         logger.exception("send_admin_md failed: %s", e)
         return False
@@ -5223,9 +5949,7 @@ def _parse_mints_or_count(arg_str: str):
 
 def _load_watchlist_for_chat(chat_id: int):
     try:
-        import json
-
-        st = json.load(open("scanner_state.json"))
+        st = _load_json_safe("scanner_state.json")
         wl = st.get("watchlist_by_chat", {}).get(str(chat_id), [])
         return [m for m in wl if isinstance(m, str)]
     except Exception:
@@ -5319,29 +6043,14 @@ def _normalize_token(token_data, source=None):
 
 # --- watch helpers (drop this above process_telegram_command) ---
 def _load_watchlist():
-    import json
-
-    try:
-        with open("watchlist.json") as f:
-            return json.load(f) or []
-    except Exception:
-        return []
+    return _STATE.load("watchlist.json") or []
 
 
 def _save_watchlist(items):
-    import json
-
-    try:
-        with open("watchlist.json", "w") as f:
-            json.dump(items, f, indent=2)
-    except Exception:
-        pass
+    _STATE.save("watchlist.json", items)
 
 
 def _load_alerts_cfg():
-    import json
-    import os
-
     path = "alerts_config.json"
     base = {
         "chat_id": None,
@@ -5350,10 +6059,10 @@ def _load_alerts_cfg():
         "muted_until": 0,
         "muted": False,
     }
-    if not os.path.exists(path):
-        return base
     try:
-        cfg = json.load(open(path))
+        cfg = _STATE.load(path)
+        if cfg is None:
+            return base
         if not isinstance(cfg, dict):
             return base
         # normalize known keys
@@ -5378,17 +6087,23 @@ def watch_tick_once(send_alerts=True):
     checked = fired = 0
     lines = []
     changed = False
+    digest = AlertDigest()
+    digest_mode = _alerts_delivery_mode(cfg.get("chat_id")) == "digest"
+
+    def _item_mint(item):
+        if isinstance(item, dict):
+            return item.get("mint")
+        return item if isinstance(item, str) else None
+
+    # use active source with fallback; one batched lookup for the whole list
+    prices = get_prices([m for m in map(_item_mint, wl) if m], None)
 
     for item in wl:
-        mint = (
-            item.get("mint")
-            if isinstance(item, dict)
-            else (item if isinstance(item, str) else None)
-        )
+        mint = _item_mint(item)
         if not mint:
             continue
 
-        pr = get_price(mint, None)  # use active source with fallback
+        pr = prices.get(mint) or get_price(mint, None)
         if not pr or not pr.get("ok"):
             lines.append(f"- {mint[:10]}… price: (n/a)")
             continue
@@ -5403,18 +6118,26 @@ def watch_tick_once(send_alerts=True):
 
         if send_alerts and (not muted) and abs(pct) >= min_move:
             fired += 1
-            with contextlib.suppress(Exception):
-                alerts_send(
-                    f"⚠️ {mint}\nΔ={pct:+.2f}%  price=${price:.6f}  src={pr.get('source', '?')}"
+            if digest_mode:
+                digest.add(
+                    cfg.get("chat_id"), mint, pct, price=price, base=last, src=pr.get("source")
                 )
+            else:
+                with contextlib.suppress(Exception):
+                    alerts_send(
+                        f"⚠️ {mint}\nΔ={pct:+.2f}%  price=${price:.6f}  src={pr.get('source', '?')}"
+                    )
 
         lines.append(
             f"- {mint[:10]}..  last=${price:.6f} Δ={pct:+.2f}% src={pr.get('source', '?')}"
         )
         checked += 1
 
+    with contextlib.suppress(Exception):
+        _alerts_digest_flush(digest, fmt="mdv2")
     if changed:
         _save_watchlist(wl)
+    _STATE.flush()
 
     return checked, fired, lines
 
@@ -5454,10 +6177,9 @@ def _split_primary_secondary(name: str):
 
 
 def _cached_primary_secondary(mint: str):
-    """Read token_names.json; support both old ('name') and new ('primary'/'secondary') shapes."""
+    """Cached name entry; support both old ('name') and new ('primary'/'secondary') shapes."""
     try:
-        data = json.load(open("token_names.json"))
-        entry = data.get(mint) or {}
+        entry = _NAMES.get(mint) or {}
         if isinstance(entry, dict):
             p = entry.get("primary")
             s = entry.get("secondary")
@@ -6019,6 +6741,35 @@ def process_telegram_command(update: dict):
             return _reply(f"Last: {int(ago)}s ago\nNext ~ in {nxt}s\nInterval: {int(interval)}s")
         # --- end add ---
 
+        # --- add: /cache_stats (admin; per memo cache counters) ---
+        elif cmd == "/cache_stats":
+            if not is_admin:
+                return _reply("Admin only.", status="error")
+            return _reply(_render_cache_stats())
+        # --- end add ---
+
+        # --- add: /quarantine, /quarantine_clear (admin; unresolvable-mint negative cache) ---
+        elif cmd == "/quarantine":
+            if not is_admin:
+                return _reply("Admin only.", status="error")
+            return _reply(_render_quarantine())
+        elif cmd == "/quarantine_clear":
+            if not is_admin:
+                return _reply("Admin only.", status="error")
+            if len(parts) < 2:
+                return _reply("Usage: /quarantine_clear <MINT|all>")
+            target = parts[1].strip()
+            n = _QUARANTINE.clear(None if target.lower() == "all" else target)
+            return _reply(f"🧹 Quarantine cleared: `{n}`")
+        # --- end add ---
+
+        # --- add: /perf_stats (admin; upstream savings + cache counters) ---
+        elif cmd == "/perf_stats":
+            if not is_admin:
+                return _reply("Admin only.", status="error")
+            return _reply(_render_perf_stats())
+        # --- end add ---
+
         # Router fallback (and only one in repo)
         if cmd not in ALL_COMMANDS:
             clean = (text or "").replace("\n", " ")
@@ -6042,16 +6793,16 @@ def process_telegram_command(update: dict):
             if len(parts) < 2:
                 return _reply("Usage: /name_refresh <mint>")
             mint = parts[1].strip()
-            cache = _load_json_safe(NAME_CACHE_FILE)
-            if mint in cache:
-                cache.pop(mint, None)
-                _save_json_safe(NAME_CACHE_FILE, cache)
+            _NAMES.pop(mint)
             # re-resolve immediately
             disp = resolve_token_name(mint, refresh=True)
             return _reply(f"🔄 Name cache refreshed:\n{mint}\n→ {disp}")
         elif cmd == "/name_refetch_jup":
-            _ensure_jup_catalog(force=True)
-            return _reply("🔄 Jupiter token catalog refreshed (cached for 24h).")
+            try:
+                n = _JUP_CATALOG.refresh()
+            except Exception as e:
+                return _reply(f"⚠️ Jupiter catalog refresh failed: {e}", status="error")
+            return _reply(f"🔄 Jupiter token catalog refreshed: {n} tokens (cached for 24h).")
         elif cmd == "/name":
             if len(parts) < 2:
                 return _reply("Usage: /name <mint>")
@@ -6067,16 +6818,14 @@ def process_telegram_command(update: dict):
             ticker, longname = (x.strip() for x in rest.split("|", 1))
             _name_overrides_set(mint, ticker, longname)
             # also update cache so it shows immediately
-            cache = _load_json_safe(NAME_CACHE_FILE)
-            cache[mint] = {"primary": ticker, "secondary": longname, "ts": int(time.time())}
-            _save_json_safe(NAME_CACHE_FILE, cache)
+            _NAMES.set(mint, {"primary": ticker, "secondary": longname, "ts": int(time.time())})
             return _reply(f"✅ Name override saved:\n{mint}\n{ticker}\n{longname}")
         elif cmd == "/name_show":
             if len(parts) < 2:
                 return _reply("Usage: /name_show <mint>")
             mint = parts[1].strip()
             p0, s0 = _name_overrides_get(mint)
-            cache = _load_json_safe(NAME_CACHE_FILE).get(mint) or {}
+            cache = _NAMES.get(mint) or {}
             msg = [
                 "*Name status*",
                 f"Mint: `{mint}`",
@@ -6089,9 +6838,7 @@ def process_telegram_command(update: dict):
                 return _reply("Usage: /name_clear <mint>")
             mint = parts[1].strip()
             _name_overrides_clear(mint)
-            cache = _load_json_safe(NAME_CACHE_FILE)
-            cache.pop(mint, None)
-            _save_json_safe(NAME_CACHE_FILE, cache)
+            _NAMES.pop(mint)
             return _reply(f"🧹 Cleared name override & cache for:\n`{mint}`")
 
         # Enhanced per-chat watchlist commands using dedicated handlers
@@ -6327,7 +7074,7 @@ def process_telegram_command(update: dict):
                 # Continue existing fetch logic (mint path when args)
                 mint = args.strip()
                 name_display = _display_name_for(mint)
-                pr = get_price(mint, "birdeye")
+                pr = get_price(mint, "birdeye", hedge=_PRICE_HEDGE_INTERACTIVE)
                 return _reply(
                     render_price_card(
                         mint, pr.get("price") or 0.0, pr.get("source") or "birdeye", name_display
@@ -6344,7 +7091,7 @@ def process_telegram_command(update: dict):
                 # Take first mint from watchlist
                 mint = wl[0]
                 name_display = _display_name_for(mint)
-                pr = get_price(mint, "birdeye")
+                pr = get_price(mint, "birdeye", hedge=_PRICE_HEDGE_INTERACTIVE)
                 return _reply(
                     render_price_card(
                         mint, pr.get("price") or 0.0, pr.get("source") or "birdeye", name_display
@@ -6356,6 +7103,8 @@ def process_telegram_command(update: dict):
             import time
 
             def _jload(path, default):
+                if _STATE.manages(path):
+                    return _STATE.load(path, default)
                 try:
                     with open(path) as f:
                         return json.load(f)
@@ -6557,11 +7306,9 @@ def process_telegram_command(update: dict):
             user_id = (msg.get("from") or {}).get("id")
             if user_id != 1653046781:
                 return _reply("Admin only.", status="error")
-            # wipe trades_state.json
+            # wipe the dry-run trade log
             try:
-                if os.path.exists(_TRADES_STATE_PATH):
-                    with open(_TRADES_STATE_PATH, "w", encoding="utf-8") as f:
-                        f.write("[]")
+                _TRADE_LOG.clear()
                 return _reply("Trades log cleared.")
             except Exception as e:
                 return _reply(f"Failed to clear trades: {e}", status="error")
@@ -6574,16 +7321,17 @@ def process_telegram_command(update: dict):
             n = 20
             if args:
                 try:
-                    n = int(str(args[0]).strip())
+                    n = max(1, int(str(args).split()[0]))
                 except Exception:
                     return _reply("Usage: /trades_csv [N]", status="error")
-            rows = _trade_log_latest(chat_id, n)
-            if not rows:
+            # rows are streamed from the log straight into the CSV
+            total = min(n, _TRADE_LOG.count(chat_id))
+            if not total:
                 return _reply("No trades to export.")
-            path = _trade_log_export_csv(chat_id, rows)
+            path = _trade_log_export_csv(chat_id, _TRADE_LOG.iter_chat(chat_id, n))
             if not path:
                 return _reply("Failed to export CSV.", status="error")
-            return _reply(f"Exported {len(rows)} trade(s) to {path}")
+            return _reply(f"Exported {total} trade(s) to {path}")
         # --- end add ---
 
         elif cmd == "/test123":
@@ -6658,6 +7406,7 @@ def process_telegram_command(update: dict):
                 f"**Primary:** {cur}\n"
                 "**Fallback:** API sources available\n"
                 "**Status:** ✅ Operational\n\n"
+                f"{_render_provider_health()}\n\n"
                 "Use `/source sim|dex|birdeye`"
             )
             return _reply(body)
@@ -6697,7 +7446,7 @@ def process_telegram_command(update: dict):
 
             # Use your unified price getter + current source
             src = CURRENT_PRICE_SOURCE if "CURRENT_PRICE_SOURCE" in globals() else "birdeye"
-            pr = get_price(mint, src)
+            pr = get_price(mint, src, hedge=_PRICE_HEDGE_INTERACTIVE)
             price = float(pr.get("price") or 0.0)
             source = pr.get("source") or src
 
@@ -6900,6 +7649,25 @@ def process_telegram_command(update: dict):
             _alerts_save(cfg)
             return _reply(f"🧮 Alerts rate limit: {n}/min")
 
+        elif cmd == "/alerts_delivery" and is_admin:
+            # /alerts_delivery [digest|individual] [chat_id]; default chat = the alerts chat
+            cfg = _alerts_load()
+            parts = (arg or "").split()
+            target = parts[1] if len(parts) > 1 else cfg.get("chat_id")
+            if not parts:
+                return _reply(
+                    f"📨 Alerts delivery for `{target}`: *{_alerts_delivery_mode(target)}*\n"
+                    "Usage: `/alerts_delivery <digest|individual> [chat_id]`"
+                )
+            mode = parts[0].lower()
+            if mode not in ALERTS_DELIVERY_MODES:
+                return _reply("Usage: `/alerts_delivery <digest|individual> [chat_id]`")
+            if not target:
+                return _reply("❌ No alerts chat set; pass a chat id.")
+            cfg["delivery"] = {**(cfg.get("delivery") or {}), str(target): mode}
+            _alerts_save(cfg)
+            return _reply(f"📨 Alerts delivery for `{target}`: *{mode}*")
+
         elif cmd == "/alerts_ticker_on" and is_admin:
             alerts_auto_on()
             ival = int(_alerts_interval_get() or 0)
@@ -6957,9 +7725,7 @@ def process_telegram_command(update: dict):
             cfg = _load_alerts_cfg()
             cfg["min_move_pct"] = value
             try:
-                import json
-
-                json.dump(cfg, open("alerts_config.json", "w"), indent=2)
+                _STATE.save("alerts_config.json", cfg)
             except Exception as e:
                 return _reply(f"❌ Failed to save: {e}")
             return _reply(f"👀 Watch sensitivity set to {value:.2f}%")
@@ -6980,7 +7746,7 @@ def process_telegram_command(update: dict):
 
         elif cmd == "/alerts_test" and is_admin:
             msg = arg if arg else "Test alert"
-            res = alerts_send(f"🚨 *Alert:*\n{msg}", force=True)
+            res = alerts_send(f"🚨 *Alert:*\n{msg}", force=True, wait=True)
             if res.get("ok"):
                 return _reply("✅ Test alert sent.")
             else:
@@ -7230,6 +7996,7 @@ def process_telegram_command(update: dict):
                 import time
 
                 now = int(time.time())
+                names = resolve_names(_normalize_watch_item(raw).get("mint") for raw in wl)
 
                 for raw in wl:
                     item = _normalize_watch_item(raw)
@@ -7267,8 +8034,9 @@ def process_telegram_command(update: dict):
                         alert_ago = now - int(last_alert_ts)
                         alert_info = f" alert={alert_ago}s"
 
+                    sym = _display_pair(names.get(mint), mint)[0]
                     lines.append(
-                        f"- `{mint[:10]}..`  last={last_s} src={src} age={age}{alert_info}"
+                        f"- {sym} `{mint[:10]}..`  last={last_s} src={src} age={age}{alert_info}"
                     )
 
                 return _reply("\n".join(lines))
@@ -7800,17 +8568,11 @@ def webhook_v2():
                 # Send response using simple method
                 import os
 
-                import requests
-
                 bot_token = os.environ.get("TELEGRAM_BOT_TOKEN")
                 if chat_id and bot_token and response_text:
                     payload = {"chat_id": chat_id, "text": response_text, "parse_mode": "Markdown"}
-                    resp = requests.post(
-                        f"https://api.telegram.org/bot{bot_token}/sendMessage",
-                        json=payload,
-                        timeout=10,
-                    )
-                    logger.info(f"[WEBHOOK_V2] Response sent: {resp.status_code}")
+                    _OUTBOX.submit(payload, token=bot_token)
+                    logger.info("[WEBHOOK_V2] Response queued")
 
             except Exception as e:
                 logger.error(f"[WEBHOOK_V2] Command processing failed: {e}")
@@ -7991,8 +8753,6 @@ def webhook():
                 txt: str, parse_mode: str = "Markdown", no_preview: bool = True
             ) -> bool:
                 try:
-                    import requests
-
                     bot_token = os.environ.get("TELEGRAM_BOT_TOKEN")
                     payload = {
                         "chat_id": message["chat"]["id"],
@@ -8000,12 +8760,7 @@ def webhook():
                         "parse_mode": parse_mode,
                         "disable_web_page_preview": no_preview,
                     }
-                    r = requests.post(
-                        f"https://api.telegram.org/bot{bot_token}/sendMessage",
-                        json=payload,
-                        timeout=15,
-                    )
-                    return r.status_code == 200
+                    return bool(_OUTBOX.send(payload, token=bot_token).get("ok"))
                 except Exception as e:
                     logger.exception("sendMessage failed: %s", e)
                     return False
@@ -0,0 +1,142 @@
+# deadline_executor.py
+# Process-wide bounded executor with real deadline semantics for with_timeout().
+#   - fixed pool of daemon workers fed by a bounded queue (no per-call pool churn)
+#   - the caller waits at most `timeout` and then returns its default; the task is
+#     abandoned, never joined
+#   - tasks whose deadline passed while queued are dropped before they start; running
+#     work can poll deadline_remaining()/abandoned() to stop early (cooperative cancel)
+#   - nested calls from a worker run inline under the outer deadline (no pool deadlock)
+import logging
+import os
+import queue
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+_WORKERS = int(os.environ.get("DEADLINE_EXECUTOR_WORKERS", "16"))
+_MAX_QUEUE = int(os.environ.get("DEADLINE_EXECUTOR_QUEUE", "256"))
+
+_local = threading.local()
+
+
+class _Task:
+    __slots__ = ("fn", "args", "kwargs", "deadline", "done", "result", "exc", "abandoned")
+
+    def __init__(self, fn, args, kwargs, deadline):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.deadline = deadline
+        self.done = threading.Event()
+        self.result = None
+        self.exc = None
+        self.abandoned = False
+
+
+def deadline_remaining() -> float | None:
+    """Seconds left for the task running on this worker thread (None outside one)."""
+    t = getattr(_local, "task", None)
+    return None if t is None else t.deadline - time.monotonic()
+
+
+def abandoned() -> bool:
+    """True once the caller has given up on the current task."""
+    t = getattr(_local, "task", None)
+    return bool(t and (t.abandoned or time.monotonic() >= t.deadline))
+
+
+class DeadlineExecutor:
+    def __init__(self, workers: int = _WORKERS, max_queue: int = _MAX_QUEUE, name="deadline"):
+        self.workers = max(1, int(workers))
+        self.name = name
+        self._q: queue.Queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        self._started = False
+        self._running = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "errors": 0,
+            "abandoned": 0,  # caller timed out; result discarded
+            "expired": 0,  # deadline passed while queued; never started
+            "rejected": 0,  # queue full
+            "inline": 0,  # nested call from a worker
+            "max_queue_depth": 0,
+        }
+
+    def _count(self, k: str, n: int = 1):
+        with self._lock:
+            self._stats[k] += n
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, daemon=True, name=f"{self.name}-{i}").start()
+
+    def _worker(self):
+        _local.executor = self
+        while True:
+            t = self._q.get()
+            if t.abandoned or time.monotonic() >= t.deadline:
+                self._count("expired")
+                t.done.set()
+                continue
+            with self._lock:
+                self._running += 1
+            _local.task = t
+            try:
+                t.result = t.fn(*t.args, **t.kwargs)
+                self._count("completed")
+            except BaseException as e:
+                t.exc = e
+                self._count("errors")
+            finally:
+                _local.task = None
+                with self._lock:
+                    self._running -= 1
+                t.done.set()
+
+    def run(self, fn, /, *args, timeout: float = 4, default=None, **kwargs):
+        """fn(*args, **kwargs) bounded by timeout; default on timeout, error or overload."""
+        if getattr(_local, "executor", None) is self:
+            # already on one of our workers: the outer deadline governs
+            self._count("inline")
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                return default
+        self._start()
+        t = _Task(fn, args, kwargs, time.monotonic() + timeout)
+        try:
+            self._q.put_nowait(t)
+        except queue.Full:
+            self._count("rejected")
+            return default
+        with self._lock:
+            self._stats["submitted"] += 1
+            depth = self._q.qsize()
+            if depth > self._stats["max_queue_depth"]:
+                self._stats["max_queue_depth"] = depth
+        if not t.done.wait(timeout):
+            t.abandoned = True
+            self._count("abandoned")
+            return default
+        if t.exc is not None:
+            return default
+        return t.result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["running"] = self._running
+        out["queue_depth"] = self._q.qsize()
+        out["workers"] = self.workers
+        return out
+
+
+# process-wide executor behind app.with_timeout
+EXECUTOR = DeadlineExecutor()
@@ -0,0 +1,239 @@
+# jup_catalog.py
+# Memory-mapped index of the Jupiter token catalog (mint -> symbol, name).
+# The catalog (hundreds of thousands of tokens) is packed once into jupiter_tokens.idx:
+#
+#   header   "<4sIQI"   magic, version, built-at unix ts, record count
+#   records  "<44sIHH"  mint (NUL-padded, sorted), string offset, symbol len, name len
+#   strings  utf-8 symbol + name back to back
+#
+# Lookups binary-search the mmapped records (O(log n), no JSON parsing). The file is
+# opened lazily once per process and remapped when another worker replaced it.
+# When the index is older than the TTL a background thread refetches the catalog,
+# writes a new index to a temp file and os.replace()s it in.
+# A legacy jupiter_tokens.json ({"ts", "by_mint"}) is converted on first use.
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+
+log = logging.getLogger(__name__)
+
+HDR = struct.Struct("<4sIQI")
+REC = struct.Struct("<44sIHH")
+_MAGIC = b"JCAT"
+_VERSION = 1
+_KEY = 44  # longest base58 encoding of a 32-byte key
+
+_INDEX_PATH = os.environ.get("JUP_CATALOG_INDEX", "jupiter_tokens.idx")
+_TTL_S = int(os.environ.get("JUP_CATALOG_TTL", str(24 * 60 * 60)))
+_RETRY_S = 300  # after a failed refresh
+_CHECK_EVERY_S = 5.0
+
+Fetch = Callable[[], Iterable[tuple[str, str | None, str | None]]]
+
+
+def write_index(path: str, items: Iterable[tuple[str, str | None, str | None]], ts=None) -> int:
+    """Pack (mint, symbol, name) rows into an index file atomically; returns the count."""
+    rows = {}
+    for mint, sym, name in items:
+        key = (mint or "").encode()
+        if not key or len(key) > _KEY or not (sym or name):
+            continue
+        rows[key.ljust(_KEY, b"\0")] = ((sym or "").encode()[:255], (name or "").encode()[:1024])
+    keys = sorted(rows)
+    recs, strings, off = [], [], 0
+    for k in keys:
+        s, n = rows[k]
+        recs.append(REC.pack(k, off, len(s), len(n)))
+        strings += (s, n)
+        off += len(s) + len(n)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HDR.pack(_MAGIC, _VERSION, int(ts or time.time()), len(keys)))
+        f.write(b"".join(recs))
+        f.write(b"".join(strings))
+    os.replace(tmp, path)
+    return len(keys)
+
+
+class JupCatalog:
+    def __init__(
+        self,
+        path: str = _INDEX_PATH,
+        fetch: Fetch | None = None,
+        ttl: float = _TTL_S,
+        legacy_json: str | None = None,
+        check_every: float = _CHECK_EVERY_S,
+    ):
+        self.path = path
+        self.fetch = fetch
+        self.ttl = ttl
+        self.legacy_json = legacy_json
+        self.check_every = check_every
+        self._lock = threading.Lock()
+        self._mm = None
+        self._stamp = None
+        self._n = 0
+        self._ts = 0
+        self._strings = 0
+        self._checked = 0.0
+        self._refreshing = False
+        self._last_attempt = 0.0
+        self._stats = {"lookups": 0, "hits": 0, "refreshes": 0, "refresh_errors": 0}
+
+    # -- mapping ---------------------------------------------------------------
+    def _map(self):
+        """(Re)map the index file when it appeared or was replaced; caller holds the lock."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp or st.st_size < HDR.size:
+            return
+        with open(self.path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, ver, ts, n = HDR.unpack_from(mm, 0)
+        if magic != _MAGIC or ver != _VERSION:
+            mm.close()
+            log.warning("jup_catalog: ignoring %s (bad header)", self.path)
+            return
+        if self._mm is not None:
+            self._mm.close()
+        self._mm, self._stamp, self._n, self._ts = mm, stamp, n, ts
+        self._strings = HDR.size + n * REC.size
+
+    def _ensure_mapped(self):
+        now = time.monotonic()
+        if self._mm is not None and now - self._checked < self.check_every:
+            return
+        self._checked = now
+        self._map()
+        if self._mm is None and self.legacy_json:
+            self._import_legacy()
+            self._map()
+
+    def _import_legacy(self):
+        try:
+            with open(self.legacy_json, encoding="utf-8") as f:
+                cat = json.load(f)
+        except (OSError, ValueError):
+            return
+        by_mint = cat.get("by_mint") if isinstance(cat, dict) else None
+        if by_mint:
+            n = write_index(
+                self.path,
+                ((m, d.get("symbol"), d.get("name")) for m, d in by_mint.items()),
+                ts=int(cat.get("ts") or 0),
+            )
+            log.info("jup_catalog: converted %s (%d tokens)", self.legacy_json, n)
+
+    # -- refresh ---------------------------------------------------------------
+    def _stale(self) -> bool:
+        return self._mm is None or time.time() - self._ts > self.ttl
+
+    def refresh(self) -> int:
+        """Fetch the catalog and swap in a new index (synchronously); returns the count."""
+        self._last_attempt = time.monotonic()
+        try:
+            rows = list(self.fetch())
+            if not rows:
+                raise RuntimeError("empty catalog")  # keep the current index
+            n = write_index(self.path, rows)
+        except Exception:
+            self._stats["refresh_errors"] += 1
+            raise
+        with self._lock:
+            self._stats["refreshes"] += 1
+            self._map()
+        return n
+
+    def _refresh_bg(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            log.warning("jup_catalog refresh failed: %s", e)
+        finally:
+            self._refreshing = False
+
+    def _maybe_refresh(self):
+        """Start a background refresh when stale; caller holds the lock."""
+        if self.fetch is None or self._refreshing or not self._stale():
+            return
+        if self._last_attempt and time.monotonic() - self._last_attempt < _RETRY_S:
+            return
+        self._refreshing = True
+        self._last_attempt = time.monotonic()
+        threading.Thread(target=self._refresh_bg, daemon=True, name="jup-catalog").start()
+
+    # -- lookups ---------------------------------------------------------------
+    def _key(self, i: int) -> bytes:
+        o = HDR.size + i * REC.size
+        return self._mm[o : o + _KEY]
+
+    def _row(self, i: int) -> tuple[str, str | None, str | None]:
+        key, off, ls, ln = REC.unpack_from(self._mm, HDR.size + i * REC.size)
+        o = self._strings + off
+        sym = self._mm[o : o + ls].decode("utf-8", "replace") or None
+        name = self._mm[o + ls : o + ls + ln].decode("utf-8", "replace") or None
+        return key.rstrip(b"\0").decode(), sym, name
+
+    def lookup(self, mint: str) -> tuple[str | None, str | None] | None:
+        """(symbol, name) for a mint, or None when the catalog does not list it."""
+        key = (mint or "").encode()
+        if not key or len(key) > _KEY:
+            return None
+        key = key.ljust(_KEY, b"\0")
+        with self._lock:
+            self._ensure_mapped()
+            self._maybe_refresh()
+            self._stats["lookups"] += 1
+            if self._mm is None:
+                return None
+            lo, hi = 0, self._n
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._key(mid) < key:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == self._n or self._key(lo) != key:
+                return None
+            self._stats["hits"] += 1
+            _, sym, name = self._row(lo)
+        return sym, name
+
+    def items(self) -> Iterator[tuple[str, str | None, str | None]]:
+        """All (mint, symbol, name) rows of the current index, in mint order."""
+        with self._lock:
+            self._ensure_mapped()
+            n = self._n if self._mm is not None else 0
+        for i in range(n):
+            with self._lock:
+                if i >= self._n:
+                    return
+                row = self._row(i)
+            yield row
+
+    def version(self):
+        """Identity of the mapped index file (changes when a refresh swaps it)."""
+        with self._lock:
+            self._ensure_mapped()
+            return self._stamp
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_mapped()
+            return self._n if self._mm is not None else 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["tokens"] = self._n if self._mm is not None else 0
+            out["age_s"] = int(time.time() - self._ts) if self._mm is not None else None
+            out["refreshing"] = self._refreshing
+        return out
@@ -0,0 +1,185 @@
+# mdv2.py
+# Local Telegram MarkdownV2 renderer, so a message needs one Bot API call instead of
+# "try as-is, retry escaped, retry plain".
+#
+# render(text) keeps every well-formed entity (*bold*, _italic_, __underline__,
+# ~strike~, ||spoiler||, `code`, ```pre```, [text](url), > quote at line start) and
+# backslash-escapes every special character that is not part of one, so the result
+# always parses. Text that is already valid MarkdownV2 comes back unchanged; is_valid()
+# is exactly that check. A "_" inside a word (rate_per_min) is always literal, never
+# an italic marker.
+# The card helpers (esc, bold, code, link) build valid MarkdownV2 from raw values.
+# prepare() is what senders call; it counts how often text needed repair and, through
+# note_fallback(), how often Telegram still rejected the result.
+import threading
+
+SPECIAL = "_*[]()~`>#+-=|{}.!"
+_PAIRED = ("||", "__", "*", "_", "~")  # longest first
+
+
+def esc(text) -> str:
+    """Escape a raw value for use as MarkdownV2 text."""
+    s = "" if text is None else str(text)
+    out = []
+    for ch in s:
+        if ch in SPECIAL or ch == "\\":
+            out.append("\\")
+        out.append(ch)
+    return "".join(out)
+
+
+def bold(text) -> str:
+    return f"*{esc(text)}*"
+
+
+def code(text) -> str:
+    s = "" if text is None else str(text)
+    return "`" + s.replace("\\", "\\\\").replace("`", "\\`") + "`"
+
+
+def link(text, url: str) -> str:
+    return f"[{esc(text)}](" + str(url).replace("\\", "\\\\").replace(")", "\\)") + ")"
+
+
+def _is_escape(s: str, i: int) -> bool:
+    return s[i] == "\\" and i + 1 < len(s) and 0 < ord(s[i + 1]) < 127
+
+
+def _word(ch: str) -> bool:
+    return ch.isalnum()
+
+
+def _find_code_end(s: str, i: int, fence: str) -> int:
+    """Index of the fence closing a code span whose body starts at i, or -1."""
+    while i < len(s):
+        if _is_escape(s, i):
+            i += 2
+        elif s.startswith(fence, i):
+            return i
+        else:
+            i += 1
+    return -1
+
+
+def _find_close(s: str, i: int, end: int, mark: str) -> int:
+    """Index of the unescaped `mark` closing an entity opened before i, or -1."""
+    while i < end:
+        if _is_escape(s, i):
+            i += 2
+            continue
+        if s[i] == "`":
+            fence = "```" if s.startswith("```", i) else "`"
+            j = _find_code_end(s, i + len(fence), fence)
+            if j >= 0:
+                i = j + len(fence)
+                continue
+        if s.startswith(mark, i):
+            if mark != "_":
+                return i
+            if not (i + 1 < end and _word(s[i + 1])) and s[i - 1] != "_":
+                return i
+        i += 1
+    return -1
+
+
+def _code_body(body: str) -> str:
+    """Inside code only ` and \\ are special: keep escapes of those, escape bare ones."""
+    out = []
+    i = 0
+    while i < len(body):
+        if body[i] == "\\" and i + 1 < len(body) and body[i + 1] in "`\\":
+            out.append(body[i : i + 2])
+            i += 2
+            continue
+        out.append("\\" + body[i] if body[i] in "`\\" else body[i])
+        i += 1
+    return "".join(out)
+
+
+def _render(s: str, i: int, end: int, out: list):
+    while i < end:
+        ch = s[i]
+        if _is_escape(s, i):
+            out.append(s[i : i + 2])
+            i += 2
+            continue
+        if ch == "\\":
+            out.append("\\\\")
+            i += 1
+            continue
+        if ch == "`":
+            fence = "```" if s.startswith("```", i) else "`"
+            j = _find_code_end(s, i + len(fence), fence)
+            if j >= 0 and j + len(fence) <= end and j > i + len(fence):
+                out += [fence, _code_body(s[i + len(fence) : j]), fence]
+                i = j + len(fence)
+                continue
+        if ch == "[":
+            j = _find_close(s, i + 1, end, "]")
+            if j > i + 1 and j + 1 < end and s[j + 1] == "(":
+                k = _find_close(s, j + 2, end, ")")
+                if k > j + 2:
+                    out.append("[")
+                    _render(s, i + 1, j, out)
+                    out += ["](", s[j + 2 : k], ")"]
+                    i = k + 1
+                    continue
+        if ch == ">" and (i == 0 or s[i - 1] == "\n"):
+            out.append(">")
+            i += 1
+            continue
+        mark = next((m for m in _PAIRED if s.startswith(m, i)), None)
+        if mark and not (mark == "_" and i > 0 and _word(s[i - 1])):
+            j = _find_close(s, i + len(mark), end, mark)
+            if j > i + len(mark):
+                out.append(mark)
+                _render(s, i + len(mark), j, out)
+                out.append(mark)
+                i = j + len(mark)
+                continue
+        if ch in SPECIAL:
+            out.append("\\")
+        out.append(ch)
+        i += 1
+
+
+def render(text) -> str:
+    """Valid MarkdownV2 for `text`: entities kept, stray special characters escaped."""
+    s = "" if text is None else str(text)
+    out: list[str] = []
+    _render(s, 0, len(s), out)
+    return "".join(out)
+
+
+def is_valid(text) -> bool:
+    return render(text) == text
+
+
+class RenderStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"messages": 0, "as_is": 0, "repaired": 0, "plain_fallback": 0}
+
+    def count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+STATS = RenderStats()
+
+
+def prepare(text) -> str:
+    """render() for sending, counted as as_is (already valid) or repaired."""
+    body = render(text)
+    STATS.count("messages")
+    STATS.count("as_is" if body == text else "repaired")
+    return body
+
+
+def note_fallback():
+    """Telegram rejected a rendered message and it was re-sent as plain text."""
+    STATS.count("plain_fallback")
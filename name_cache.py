@@ -0,0 +1,171 @@
+# name_cache.py
+# Process-resident token name cache backed by token_names.json.
+# The file is parsed once; lookups are dict reads. Writes mark entries dirty and a timer
+# thread flushes them in one atomic rewrite (merged with whatever other workers wrote
+# since our last sync). Other workers' flushes are picked up by checking the file's
+# mtime at most every `check_every` seconds.
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+_FLUSH_EVERY_S = float(os.environ.get("NAME_CACHE_FLUSH_EVERY", "2.0"))
+_CHECK_EVERY_S = float(os.environ.get("NAME_CACHE_CHECK_EVERY", "1.0"))
+
+_DELETED = object()
+
+
+class NameCache:
+    def __init__(self, path: str, check_every: float = _CHECK_EVERY_S):
+        self.path = path
+        self.check_every = check_every
+        self._lock = threading.RLock()
+        self._data: dict | None = None
+        self._dirty: dict = {}  # mint -> entry | _DELETED
+        self._stamp = None  # (mtime, inode, size) of the file version merged into _data
+        self._checked = 0.0
+        self._flusher = None
+        self._version = 0  # bumped on every change to the entries (local or reloaded)
+        self._stats = {"hits": 0, "misses": 0, "sets": 0, "flushes": 0, "reloads": 0}
+
+    def _read_disk(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _stat_key(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_ino, st.st_size  # inode: rewrites are os.replace
+
+    def _sync(self, force: bool = False):
+        """(Re)load when first used or when another worker rewrote the file."""
+        now = time.monotonic()
+        if self._data is not None and not force and now - self._checked < self.check_every:
+            return
+        self._checked = now
+        stamp = self._stat_key()
+        if self._data is not None and stamp == self._stamp:
+            return
+        if self._data is not None:
+            self._stats["reloads"] += 1
+        data = self._read_disk()
+        for k, v in self._dirty.items():
+            if v is _DELETED:
+                data.pop(k, None)
+            else:
+                data[k] = v
+        self._data = data
+        self._stamp = stamp
+        self._version += 1
+
+    # -- reads ---------------------------------------------------------------
+    def get(self, mint: str):
+        with self._lock:
+            self._sync()
+            ent = self._data.get(mint)
+            self._stats["hits" if ent is not None else "misses"] += 1
+            return ent
+
+    def snapshot(self) -> dict:
+        """Shallow copy of all entries (for legacy whole-dict callers and scans)."""
+        with self._lock:
+            self._sync()
+            return dict(self._data)
+
+    def version(self) -> int:
+        """Changes whenever the entries change (local writes or another worker's flush)."""
+        with self._lock:
+            self._sync()
+            return self._version
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return len(self._data)
+
+    # -- writes --------------------------------------------------------------
+    def set(self, mint: str, entry: dict):
+        with self._lock:
+            self._sync()
+            self._data[mint] = entry
+            self._dirty[mint] = entry
+            self._version += 1
+            self._stats["sets"] += 1
+
+    def pop(self, mint: str):
+        with self._lock:
+            self._sync()
+            ent = self._data.pop(mint, None)
+            self._dirty[mint] = _DELETED
+            self._version += 1
+            return ent
+
+    def update(self, d: dict):
+        """Apply a whole-dict save from legacy callers: only changed keys become dirty."""
+        with self._lock:
+            self._sync()
+            for k, v in d.items():
+                if self._data.get(k) != v:
+                    self._data[k] = v
+                    self._dirty[k] = v
+                    self._version += 1
+                    self._stats["sets"] += 1
+
+    def flush(self) -> int:
+        """Write dirty entries (merged over the current file) in one atomic rewrite."""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            self._sync(force=True)  # merge other workers' flushes first
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._data, f)
+            os.replace(tmp, self.path)
+            n = len(self._dirty)
+            self._dirty.clear()
+            self._stamp = self._stat_key()
+            self._stats["flushes"] += 1
+            return n
+
+    def _flush_quiet(self):
+        try:
+            self.flush()
+        except Exception:
+            log.exception("name cache flush failed")
+
+    def start_flusher(self, every_s: float = _FLUSH_EVERY_S):
+        """Flush dirty entries every `every_s` in a daemon thread (and at exit); idempotent."""
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(
+                target=self._flush_loop, args=(every_s,), daemon=True, name="name-cache-flusher"
+            )
+        self._flusher.start()
+        atexit.register(self._flush_quiet)
+
+    def _flush_loop(self, every_s: float):
+        while True:
+            time.sleep(every_s)
+            self._flush_quiet()
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["size"] = len(self._data or ())
+            out["dirty"] = len(self._dirty)
+        return out
+
+
+# process-wide cache behind resolve_token_name / _token_labels and the /name_* commands
+NAMES = NameCache(os.environ.get("TOKEN_NAMES_PATH", "token_names.json"))
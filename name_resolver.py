@@ -0,0 +1,134 @@
+# name_resolver.py
+# Concurrent first-wins token name resolution for cache misses.
+# All name sources start at once (in adaptive order, so a saturated pool runs the
+# historically fastest first); the race ends as soon as both a symbol and a name are
+# known, or when the time budget runs out. Losers are abandoned, not awaited; those
+# still queued are cancelled so they never take a pool worker.
+# Each source's answers and first-answer wins are counted; order() ranks sources by
+# how often they answered first.
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+_WORKERS = int(os.environ.get("NAME_RESOLVE_WORKERS", "8"))
+BUDGET_S = float(os.environ.get("NAME_RESOLVE_BUDGET", "4"))
+
+
+def as_pair(v) -> tuple[str | None, str | None]:
+    """(symbol, name) from either source shape: a tuple or a {"symbol", "name"} dict."""
+    if isinstance(v, tuple) and len(v) >= 2:
+        sym, name = v[0], v[1]
+    elif isinstance(v, dict):
+        sym, name = v.get("symbol"), v.get("name")
+    else:
+        return None, None
+    sym = str(sym or "").strip() or None
+    name = str(name or "").strip() or None
+    return sym, name
+
+
+class RaceStats:
+    """Per source: races entered, useful answers, first answers and total answer latency."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.complete = 0  # both symbol and name found
+        self.timeouts = 0  # budget ran out with sources still pending
+        self._by: dict[str, dict] = {}
+
+    def _s(self, tag: str) -> dict:
+        return self._by.setdefault(tag, {"launched": 0, "answered": 0, "first": 0, "ms": 0.0})
+
+    def launched(self, tag: str):
+        with self._lock:
+            self._s(tag)["launched"] += 1
+
+    def answered(self, tag: str, ms: float, first: bool):
+        with self._lock:
+            s = self._s(tag)
+            s["answered"] += 1
+            s["ms"] += ms
+            s["first"] += int(first)
+
+    def finish(self, complete: bool, timed_out: bool):
+        with self._lock:
+            self.calls += 1
+            self.complete += int(complete)
+            self.timeouts += int(timed_out)
+
+    def order(self, tags: list[str]) -> list[str]:
+        """Sources by first-answer rate (stable: unseen sources keep the given order)."""
+        with self._lock:
+            rate = {t: s["first"] / s["launched"] for t, s in self._by.items() if s["launched"]}
+        return sorted(tags, key=lambda t: -rate.get(t, 0.0))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            by = {
+                t: dict(
+                    s,
+                    first_rate=s["first"] / s["launched"] if s["launched"] else 0.0,
+                    avg_ms=s["ms"] / s["answered"] if s["answered"] else None,
+                )
+                for t, s in self._by.items()
+            }
+            return {
+                "calls": self.calls,
+                "complete": self.complete,
+                "timeouts": self.timeouts,
+                "by_source": by,
+            }
+
+
+_POOL = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix="name_resolve")
+
+
+def race_names(sources, budget_s: float = BUDGET_S, stats: "RaceStats | None" = None, clean=None):
+    """
+    sources: [(tag, fn)], fn() -> (symbol, name) tuple, {"symbol", "name"} dict or None.
+    Returns (symbol, name, timed_out, errors): errors counts sources that raised, so a
+    miss can be told apart from a network failure. The first source to supply each
+    field wins it; clean(symbol) may reject or normalize a symbol before it counts.
+    """
+    stats = stats or NAME_RACE
+    by_tag = dict(sources)
+    t0 = time.monotonic()
+    deadline = t0 + budget_s
+    pending = {}
+    for tag in stats.order(list(by_tag)):
+        pending[_POOL.submit(by_tag[tag])] = tag
+        stats.launched(tag)
+    sym = name = None
+    first = True
+    errors = 0
+    while pending and not (sym and name):
+        left = deadline - time.monotonic()
+        if left <= 0:
+            break
+        done, _ = wait(list(pending), timeout=left, return_when=FIRST_COMPLETED)
+        for f in done:
+            tag = pending.pop(f)
+            try:
+                s, n = as_pair(f.result())
+            except Exception:
+                errors += 1
+                continue
+            if clean is not None and s:
+                s = clean(s)
+            if not (s or n):
+                continue
+            stats.answered(tag, (time.monotonic() - t0) * 1000.0, first)
+            first = False
+            sym = sym or s
+            name = name or n
+    timed_out = bool(pending) and not (sym and name)
+    for f in pending:
+        f.cancel()  # queued losers never start, so they don't hold the pool for later races
+    stats.finish(bool(sym and name), timed_out)
+    return sym, name, timed_out, errors
+
+
+# process-wide stats; order() feeds back into the launch order of the next race
+NAME_RACE = RaceStats()
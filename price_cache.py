@@ -0,0 +1,531 @@
+# price_cache.py
+# Two-tier price/metadata cache shared by every gunicorn worker on the host.
+#   L1: bounded in-process LRU with per-entry TTL
+#   L2: SQLite (WAL) file all workers read/write, so one worker's fetch warms the rest
+# Entries have a fresh window plus an optional stale window (stale-while-revalidate);
+# failed lookups can be cached as negative entries for a short TTL.
+#
+# MemoCache / memoize(): named, in-process, bounded memo caches for function results
+# (the ttl_cache decorator in app.py), with per-cache stats for /cache_stats.
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+_DB_PATH = os.environ.get("PRICE_CACHE_DB", "/tmp/mork_price_cache.sqlite")
+_SHARED = os.environ.get("PRICE_CACHE_SHARED", "1") != "0"
+_MAX_ENTRIES = int(os.environ.get("PRICE_CACHE_MAX", "5000"))
+
+FRESH, STALE, NEGATIVE, MISS = "fresh", "stale", "negative", "miss"
+
+
+def _k(key) -> str:
+    if isinstance(key, tuple | list):
+        return ":".join(str(p) for p in key)
+    return str(key)
+
+
+class _Entry:
+    __slots__ = ("value", "neg", "fresh_until", "stale_until")
+
+    def __init__(self, value, neg, fresh_until, stale_until):
+        self.value = value
+        self.neg = neg
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+    def state(self, now: float) -> str:
+        if now < self.fresh_until:
+            return NEGATIVE if self.neg else FRESH
+        if not self.neg and now < self.stale_until:
+            return STALE
+        return MISS
+
+
+class LRUTTLCache:
+    """Bounded in-process LRU; entries expire on read, oldest evicted on write."""
+
+    def __init__(self, maxsize: int = _MAX_ENTRIES):
+        self.maxsize = max(1, int(maxsize))
+        self._d: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str, now: float) -> _Entry | None:
+        with self._lock:
+            ent = self._d.get(key)
+            if ent is None:
+                return None
+            if ent.state(now) == MISS:
+                self._d.pop(key, None)
+                return None
+            self._d.move_to_end(key)
+            return ent
+
+    def put(self, key: str, ent: _Entry):
+        with self._lock:
+            self._d[key] = ent
+            self._d.move_to_end(key)
+            while len(self._d) > self.maxsize:
+                self._d.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: str):
+        with self._lock:
+            self._d.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._d.clear()
+
+    def __len__(self):
+        return len(self._d)
+
+
+class SharedTier:
+    """SQLite WAL store; one connection per thread, failures degrade to L1-only."""
+
+    def __init__(self, path: str = _DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._last_sweep = 0.0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=2, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache(
+                    k TEXT PRIMARY KEY,
+                    v TEXT,
+                    neg INTEGER NOT NULL,
+                    fresh_until REAL NOT NULL,
+                    stale_until REAL NOT NULL
+                )
+            """
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> _Entry | None:
+        try:
+            row = (
+                self._conn()
+                .execute("SELECT v, neg, fresh_until, stale_until FROM cache WHERE k=?", (key,))
+                .fetchone()
+            )
+        except Exception as e:
+            log.debug("price_cache L2 read failed: %s", e)
+            return None
+        if not row:
+            return None
+        v, neg, fu, su = row
+        try:
+            value = json.loads(v) if v is not None else None
+        except Exception:
+            return None
+        return _Entry(value, bool(neg), float(fu), float(su))
+
+    def get_many(self, keys: list[str]) -> dict[str, _Entry]:
+        """One SELECT per 500 keys; keys with no (decodable) row are left out."""
+        out = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            marks = ",".join("?" * len(chunk))
+            try:
+                rows = (
+                    self._conn()
+                    .execute(
+                        f"SELECT k, v, neg, fresh_until, stale_until FROM cache WHERE k IN ({marks})",
+                        chunk,
+                    )
+                    .fetchall()
+                )
+            except Exception as e:
+                log.debug("price_cache L2 read failed: %s", e)
+                continue
+            for k, v, neg, fu, su in rows:
+                try:
+                    value = json.loads(v) if v is not None else None
+                except Exception:
+                    continue
+                out[k] = _Entry(value, bool(neg), float(fu), float(su))
+        return out
+
+    def put(self, key: str, ent: _Entry):
+        self.put_many([(key, ent)])
+
+    def put_many(self, items: list[tuple[str, _Entry]]):
+        """All rows in one transaction."""
+        now = time.time()
+        try:
+            conn = self._conn()
+            with conn:
+                conn.executemany(
+                    "REPLACE INTO cache(k, v, neg, fresh_until, stale_until) VALUES (?,?,?,?,?)",
+                    [
+                        (
+                            key,
+                            None if ent.neg else json.dumps(ent.value),
+                            int(ent.neg),
+                            ent.fresh_until,
+                            ent.stale_until,
+                        )
+                        for key, ent in items
+                    ],
+                )
+                # amortised sweep of dead rows, at most once a minute per process
+                if now - self._last_sweep > 60:
+                    self._last_sweep = now
+                    conn.execute(
+                        "DELETE FROM cache WHERE stale_until < ? AND fresh_until < ?", (now, now)
+                    )
+        except Exception as e:
+            log.debug("price_cache L2 write failed: %s", e)
+
+    def delete(self, key: str):
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM cache WHERE k=?", (key,))
+        except Exception as e:
+            log.debug("price_cache L2 delete failed: %s", e)
+
+
+class TwoTierCache:
+    def __init__(self, maxsize: int = _MAX_ENTRIES, shared: bool = _SHARED, path: str = _DB_PATH):
+        self.l1 = LRUTTLCache(maxsize)
+        self.l2 = SharedTier(path) if shared else None
+        self._lock = threading.Lock()
+        self._refreshing: set[str] = set()
+        self.stats = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "stale_served": 0,
+            "negative_hits": 0,
+            "refreshes": 0,
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def lookup(self, key) -> tuple[str, object]:
+        """Return (state, value); state is one of fresh/stale/negative/miss."""
+        k = _k(key)
+        now = time.time()
+        ent = self.l1.get(k, now)
+        if ent is not None and ent.state(now) == STALE and self.l2 is not None:
+            # another worker may already have revalidated it
+            shared = self.l2.get(k)
+            if shared is not None and shared.state(now) == FRESH:
+                self.l1.put(k, shared)
+                ent = shared
+        if ent is not None:
+            self._count("l1_hits")
+        elif self.l2 is not None:
+            ent = self.l2.get(k)
+            if ent is not None and ent.state(now) != MISS:
+                self.l1.put(k, ent)
+                self._count("l2_hits")
+            else:
+                ent = None
+        if ent is None:
+            self._count("misses")
+            return MISS, None
+        st = ent.state(now)
+        if st == NEGATIVE:
+            self._count("negative_hits")
+        elif st == STALE:
+            self._count("stale_served")
+        return st, ent.value
+
+    def get(self, key, default=None):
+        """Fresh-only read (stale and negative entries read as default)."""
+        st, val = self.lookup(key)
+        return val if st == FRESH else default
+
+    def set(self, key, value, ttl: float, stale_ttl: float = 0.0):
+        now = time.time()
+        ent = _Entry(value, False, now + ttl, now + ttl + max(0.0, stale_ttl))
+        k = _k(key)
+        self.l1.put(k, ent)
+        if self.l2 is not None:
+            self.l2.put(k, ent)
+
+    # L1-only reads/writes plus batched L2 access, for callers on an event loop: peek()
+    # and set_local() never touch SQLite; fetch_shared() and share() do one query or one
+    # transaction for many keys and belong in an executor.
+    def peek(self, key, default=None):
+        """Fresh L1-only read."""
+        now = time.time()
+        ent = self.l1.get(_k(key), now)
+        if ent is None or ent.state(now) != FRESH:
+            return default
+        self._count("l1_hits")
+        return ent.value
+
+    def set_local(self, key, value, ttl: float, stale_ttl: float = 0.0):
+        now = time.time()
+        self.l1.put(_k(key), _Entry(value, False, now + ttl, now + ttl + max(0.0, stale_ttl)))
+
+    def fetch_shared(self, keys) -> dict:
+        """Batched L2 read: {key: value} for fresh entries, which are also copied into L1."""
+        out = {}
+        if self.l2 is None:
+            return out
+        by_k = {_k(key): key for key in keys}
+        now = time.time()
+        found = self.l2.get_many(list(by_k))
+        for k, key in by_k.items():
+            ent = found.get(k)
+            if ent is not None and ent.state(now) == FRESH:
+                self.l1.put(k, ent)
+                self._count("l2_hits")
+                out[key] = ent.value
+            else:
+                self._count("misses")
+        return out
+
+    def share(self, items: dict, ttl: float, stale_ttl: float = 0.0):
+        """Batched L2 write of {key: value} (one transaction), e.g. after set_local()."""
+        if self.l2 is None or not items:
+            return
+        fresh_until = time.time() + ttl
+        stale_until = fresh_until + max(0.0, stale_ttl)
+        self.l2.put_many(
+            [(_k(key), _Entry(v, False, fresh_until, stale_until)) for key, v in items.items()]
+        )
+
+    def set_negative(self, key, ttl: float):
+        now = time.time()
+        ent = _Entry(None, True, now + ttl, now + ttl)
+        k = _k(key)
+        self.l1.put(k, ent)
+        if self.l2 is not None:
+            self.l2.put(k, ent)
+
+    def delete(self, key):
+        k = _k(key)
+        self.l1.pop(k)
+        if self.l2 is not None:
+            self.l2.delete(k)
+
+    def _store(self, key, value, ttl, stale_ttl, neg_ttl):
+        if value is None:
+            if neg_ttl:
+                self.set_negative(key, neg_ttl)
+        else:
+            self.set(key, value, ttl, stale_ttl)
+
+    def _refresh_async(self, key, loader, ttl, stale_ttl, neg_ttl):
+        k = _k(key)
+        with self._lock:
+            if k in self._refreshing:
+                return
+            self._refreshing.add(k)
+            self.stats["refreshes"] += 1
+
+        def run():
+            try:
+                val = loader()
+                # a failed refresh keeps serving the stale value until it ages out
+                if val is not None:
+                    self.set(key, val, ttl, stale_ttl)
+            except Exception as e:
+                log.debug("price_cache refresh failed key=%s err=%s", k, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(k)
+
+        threading.Thread(target=run, daemon=True, name="price_cache_refresh").start()
+
+    def load(self, key, loader, ttl: float, stale_ttl: float = 0.0, neg_ttl: float = 0.0):
+        """
+        Cached call of loader() -> value|None; returns (state, value).
+        Fresh: cached value. Stale: cached value now, refresh in background.
+        Negative: None without calling loader. Miss: call loader and store it
+        (None results become negative entries when neg_ttl > 0); state "loaded".
+        """
+        st, val = self.lookup(key)
+        if st in (FRESH, NEGATIVE):
+            return st, val
+        if st == STALE:
+            self._refresh_async(key, loader, ttl, stale_ttl, neg_ttl)
+            return st, val
+        val = loader()
+        self._store(key, val, ttl, stale_ttl, neg_ttl)
+        return "loaded", val
+
+    def get_or_load(self, key, loader, ttl: float, stale_ttl: float = 0.0, neg_ttl: float = 0.0):
+        return self.load(key, loader, ttl, stale_ttl, neg_ttl)[1]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self.stats)
+        out["l1_size"] = len(self.l1)
+        out["l1_evictions"] = self.l1.evictions
+        out["shared"] = self.l2 is not None
+        return out
+
+
+# process-wide singleton used by app.py price/metadata lookups
+CACHE = TwoTierCache()
+
+
+def stats() -> dict:
+    return CACHE.snapshot()
+
+
+class MemoCache:
+    """
+    Bounded memo cache for one function. LRU eviction at maxsize; values and None
+    results get separate TTLs (neg_ttl=0 disables negative caching); a hit in the
+    last `refresh_ahead` fraction of its TTL is served and refreshed in the
+    background; concurrent cold misses on a key share one load.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        neg_ttl: float | None = None,
+        maxsize: int = 1024,
+        refresh_ahead: float = 0.2,
+    ):
+        self.name = name
+        self.ttl = float(ttl)
+        self.neg_ttl = self.ttl if neg_ttl is None else float(neg_ttl)
+        self.refresh_ahead = max(0.0, min(1.0, float(refresh_ahead)))
+        self.l1 = LRUTTLCache(maxsize)
+        self._lock = threading.Lock()
+        self._inflight: dict = {}  # key -> {"done": Event, "val": ..., "exc": ...}
+        self.stats = {
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "refreshes": 0,
+            "errors": 0,
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _put(self, key, val):
+        now = time.time()
+        if val is None:
+            if self.neg_ttl > 0:
+                self.l1.put(key, _Entry(None, True, now + self.neg_ttl, now + self.neg_ttl))
+        else:
+            self.l1.put(key, _Entry(val, False, now + self.ttl, now + self.ttl))
+
+    def _load(self, key, loader):
+        """Single-flight load: the first caller fetches, the rest wait for its result."""
+        with self._lock:
+            slot = self._inflight.get(key)
+            leader = slot is None
+            if leader:
+                slot = self._inflight[key] = {"done": threading.Event(), "val": None, "exc": None}
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            slot["done"].wait()
+            if slot["exc"] is not None:
+                raise slot["exc"]
+            return slot["val"]
+        try:
+            slot["val"] = loader()
+            self._put(key, slot["val"])
+            return slot["val"]
+        except Exception as e:
+            slot["exc"] = e
+            self._count("errors")
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            slot["done"].set()
+
+    def _refresh_async(self, key, loader):
+        with self._lock:
+            if key in self._inflight:
+                return
+            self.stats["refreshes"] += 1
+
+        def run():
+            try:
+                self._load(key, loader)
+            except Exception as e:
+                log.debug("memo %s refresh failed: %s", self.name, e)
+
+        threading.Thread(target=run, daemon=True, name=f"memo_refresh_{self.name}").start()
+
+    def get_or_load(self, key, loader):
+        now = time.time()
+        ent = self.l1.get(key, now)
+        if ent is not None:
+            if ent.neg:
+                self._count("negative_hits")
+                return None
+            self._count("hits")
+            if self.refresh_ahead and ent.fresh_until - now <= self.ttl * self.refresh_ahead:
+                self._refresh_async(key, loader)
+            return ent.value
+        self._count("misses")
+        return self._load(key, loader)
+
+    def clear(self):
+        self.l1.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self.stats)
+        out["size"] = len(self.l1)
+        out["maxsize"] = self.l1.maxsize
+        out["evictions"] = self.l1.evictions
+        out["ttl"] = self.ttl
+        out["neg_ttl"] = self.neg_ttl
+        return out
+
+
+MEMO_CACHES: dict[str, MemoCache] = {}
+
+
+def memoize(
+    ttl: float,
+    neg_ttl: float | None = None,
+    maxsize: int = 1024,
+    refresh_ahead: float = 0.2,
+    name: str | None = None,
+):
+    """Decorator: cache fn(*args, **kwargs) in a registered MemoCache (see memo_stats)."""
+
+    def deco(fn):
+        cache = MemoCache(name or fn.__name__, ttl, neg_ttl, maxsize, refresh_ahead)
+        MEMO_CACHES[cache.name] = cache
+
+        @functools.wraps(fn)
+        def wrapper(*a, **k):
+            key = (a, tuple(sorted(k.items())))
+            return cache.get_or_load(key, lambda: fn(*a, **k))
+
+        wrapper.cache = cache
+        return wrapper
+
+    return deco
+
+
+def memo_stats() -> dict:
+    return {name: c.snapshot() for name, c in sorted(MEMO_CACHES.items())}
@@ -0,0 +1,149 @@
+# price_rollup.py
+# Incremental 1m / 5m / 1h OHLC bars per mint, folded from the binary price store
+# (price_store.py) as points arrive. Each observe()/query catches a mint up with
+# whatever was appended since its last folded ts (including appends by other
+# workers), so /info windows and "Since tracking" are answered from memory.
+# A window's reference price is the last point recorded at or before its start, and
+# only if that point is close to the start: within min(2 bars, a quarter of the
+# window). Otherwise (not tracked that long, or a gap) the window is None so the
+# caller can fall back to the APIs for that window only.
+import threading
+import time
+from bisect import bisect_right
+
+# resolution -> (bar seconds, bars kept)
+RESOLUTIONS = {
+    "1m": (60, 26 * 60),  # a bit over a day
+    "5m": (300, 3 * 288),  # 3 days
+    "1h": (3600, 30 * 24),  # 30 days
+}
+
+# /info windows (get_token_changes keys)
+WINDOWS = {"m30": 1800, "h1": 3600, "h4": 4 * 3600, "h12": 12 * 3600, "h24": 24 * 3600}
+
+
+class _Bars:
+    """Bars for one resolution: parallel lists, trimmed in amortised batches."""
+
+    __slots__ = ("step", "cap", "starts", "ohlc", "spans")
+
+    def __init__(self, step: int, cap: int):
+        self.step = step
+        self.cap = cap
+        self.starts: list[int] = []
+        self.ohlc: list[list[float]] = []
+        self.spans: list[list[int]] = []  # [ts of the open, ts of the close] per bar
+
+    def fold(self, ts: int, price: float):
+        start = ts - ts % self.step
+        if self.starts and self.starts[-1] == start:
+            b = self.ohlc[-1]
+            b[1] = max(b[1], price)
+            b[2] = min(b[2], price)
+            b[3] = price
+            self.spans[-1][1] = ts
+        elif not self.starts or start > self.starts[-1]:
+            self.starts.append(start)
+            self.ohlc.append([price, price, price, price])
+            self.spans.append([ts, ts])
+            if len(self.starts) > 2 * self.cap:
+                del self.starts[: -self.cap]
+                del self.ohlc[: -self.cap]
+                del self.spans[: -self.cap]
+
+    def price_at(self, t: int, max_gap: int | None = None) -> float | None:
+        """
+        Last price recorded at or before t: the close of a bar that closed by t, or
+        the open of the bar containing t when that open is not after t. None when
+        that point is more than max_gap (default 2 bars) before t.
+        """
+        max_gap = 2 * self.step if max_gap is None else max_gap
+        i = bisect_right(self.starts, t) - 1
+        while i >= 0:
+            (t_open, t_close), ohlc = self.spans[i], self.ohlc[i]
+            if t_close <= t:
+                ts, px = t_close, ohlc[3]
+            elif t_open <= t:
+                ts, px = t_open, ohlc[0]
+            else:
+                i -= 1  # the bar's first point is after t: look one bar back
+                continue
+            return px if t - ts <= max_gap else None
+        return None
+
+    def last(self) -> tuple[int, list[float]] | None:
+        return (self.starts[-1], self.ohlc[-1]) if self.starts else None
+
+
+class _Series:
+    __slots__ = ("bars", "last_ts")
+
+    def __init__(self):
+        self.bars = {r: _Bars(step, cap) for r, (step, cap) in RESOLUTIONS.items()}
+        self.last_ts = None  # highest ts folded
+
+
+class RollupEngine:
+    def __init__(self, store, horizon_s: int = 30 * 86400):
+        self.store = store
+        self.horizon_s = horizon_s
+        self._lock = threading.Lock()
+        self._series: dict[str, _Series] = {}
+
+    def observe(self, mint: str) -> _Series:
+        """Fold any points newer than what we've seen (bootstrap on first use)."""
+        with self._lock:
+            s = self._series.get(mint)
+            if s is None:
+                s = self._series[mint] = _Series()
+            now = int(time.time())
+            t0 = s.last_ts if s.last_ts is not None else now - self.horizon_s
+            # re-folding points at last_ts is idempotent (same bar, same h/l/c)
+            for ts, price in self.store.range(mint, t0, now + 86400):
+                for b in s.bars.values():
+                    b.fold(ts, price)
+                s.last_ts = ts
+            return s
+
+    def bars(self, mint: str, res: str) -> list[tuple[int, float, float, float, float]]:
+        b = self.observe(mint).bars[res]
+        with self._lock:
+            return [(t, *ohlc) for t, ohlc in zip(b.starts, b.ohlc, strict=True)]
+
+    def price_at(self, mint: str, t: int, max_gap: int | None = None) -> float | None:
+        """
+        Finest resolution first (coarser bars reach further back). Each resolution
+        allows at most min(2 of its bars, max_gap) between t and the point it uses.
+        """
+        s = self.observe(mint)
+        with self._lock:
+            for res in ("1m", "5m", "1h"):
+                b = s.bars[res]
+                gap = 2 * b.step if max_gap is None else min(2 * b.step, max_gap)
+                px = b.price_at(t, gap)
+                if px is not None:
+                    return px
+        return None
+
+    def change_pct(self, mint: str, secs: int, price_now: float | None = None, now=None):
+        now = int(now or time.time())
+        ref = self.price_at(mint, now - secs, max_gap=secs // 4)
+        if price_now is None:
+            with self._lock:
+                last = self._series[mint].bars["1m"].last()
+            price_now = last[1][3] if last else None
+        if not ref or price_now is None:
+            return None
+        return (float(price_now) - ref) / ref * 100.0
+
+    def changes(self, mint: str, price_now: float | None = None, windows=None) -> dict:
+        """{window_key: pct|None} for WINDOWS (or the given {key: secs})."""
+        now = int(time.time())
+        return {
+            k: self.change_pct(mint, secs, price_now, now)
+            for k, secs in (windows or WINDOWS).items()
+        }
+
+    def since_tracking(self, mint: str) -> tuple[int, float] | None:
+        """First recorded (ts, price) for the mint."""
+        return self.store.first(mint)
@@ -0,0 +1,397 @@
+# price_store.py
+# Append-only, fixed-width binary price history, segmented per mint per UTC day:
+#   <root>/<mint>/<YYYYMMDD>.bin   16-byte records (little-endian int64 ts + float64 price)
+# Segments are memory-mapped for reads. Each mapped segment carries a sparse time index
+# (ts of every _SPARSE_EVERY-th record), so a lookup bisects the index and then one
+# small block. "Price at or before T" goes straight to T's day segment (or the previous
+# existing one): O(log n) without parsing, however long the mint has been tracked.
+# Records are kept in ts order: an out-of-order sample is clamped to the last ts.
+#
+# Retention: compact() downsamples segments older than RAW_DAYS to the last point per
+# COMPACT_STEP_S bucket (keeping each segment's first point); enforce_budget() drops the
+# oldest past-day segments across all mints until the tree fits MAX_BYTES.
+# start_compactor() runs both periodically in a daemon thread.
+#
+# On first touch of a mint, its segments are seeded once from the older flat
+# <root>/<mint>.bin file, or else from an optional legacy loader (the old JSON / JSONL).
+import calendar
+import logging
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+from bisect import bisect_right
+
+log = logging.getLogger(__name__)
+
+REC = struct.Struct("<qd")
+REC_SIZE = REC.size  # 16
+DAY_S = 86400
+_SPARSE_EVERY = 64
+
+RAW_DAYS = int(os.environ.get("PRICE_HISTORY_RAW_DAYS", "7"))
+COMPACT_STEP_S = int(os.environ.get("PRICE_HISTORY_COMPACT_STEP", "300"))
+MAX_BYTES = int(float(os.environ.get("PRICE_HISTORY_MAX_MB", "256")) * 1024 * 1024)
+COMPACT_EVERY_S = int(os.environ.get("PRICE_HISTORY_COMPACT_EVERY", "3600"))
+
+
+def _day_name(day: int) -> str:
+    return time.strftime("%Y%m%d", time.gmtime(day * DAY_S))
+
+
+def _day_of(fname: str) -> int | None:
+    """Day number for a '<YYYYMMDD>.bin' segment name, else None."""
+    if not fname.endswith(".bin"):
+        return None
+    try:
+        return calendar.timegm(time.strptime(fname[:-4], "%Y%m%d")) // DAY_S
+    except ValueError:
+        return None
+
+
+def _write_atomic(path: str, points):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"".join(REC.pack(t, p) for t, p in points))
+    os.replace(tmp, path)
+
+
+class _Segment:
+    """One day file: append handle + read-only mmap + sparse ts index, remapped on change."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = None
+        self._map = None
+        self._mapped = 0
+        self._ino = None
+        self._sparse: list[int] = []
+
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+            size, ino = st.st_size, st.st_ino
+        except OSError:
+            size, ino = 0, None
+        size -= size % REC_SIZE  # ignore a torn tail record
+        if size == self._mapped and ino == self._ino:
+            return
+        grew = ino == self._ino and size > self._mapped
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if size:
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        if not grew:
+            self._sparse = []  # new or replaced by compaction: rebuild the index
+        n = size // REC_SIZE
+        for i in range(len(self._sparse) * _SPARSE_EVERY, n, _SPARSE_EVERY):
+            self._sparse.append(REC.unpack_from(self._map, i * REC_SIZE)[0])
+        self._mapped = size
+        self._ino = ino
+
+    def count(self) -> int:
+        self._refresh()
+        return self._mapped // REC_SIZE
+
+    def rec(self, i: int) -> tuple[int, float]:
+        return REC.unpack_from(self._map, i * REC_SIZE)
+
+    def bisect_right(self, ts: int) -> int:
+        """Index of the first record with rec.ts > ts (sparse index, then one block)."""
+        j = bisect_right(self._sparse, ts)
+        lo = (j - 1) * _SPARSE_EVERY if j else 0
+        hi = min(self._mapped // REC_SIZE, j * _SPARSE_EVERY)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if REC.unpack_from(self._map, mid * REC_SIZE)[0] <= ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def append(self, ts: int, price: float):
+        if self._fh is None:
+            self._fh = open(self.path, "ab", buffering=0)
+        self._fh.write(REC.pack(ts, float(price)))
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._mapped = 0
+        self._ino = None
+        self._sparse = []
+
+
+class _Series:
+    """A mint's directory of day segments; the day list is re-read when the dir changes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.segments: dict[int, _Segment] = {}
+        self._days: list[int] = []
+        self._dir_mtime = None
+
+    def days(self) -> list[int]:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return []
+        if mtime != self._dir_mtime:
+            found = sorted(d for d in map(_day_of, os.listdir(self.path)) if d is not None)
+            for gone in set(self.segments) - set(found):
+                self.segments.pop(gone).close()
+            self._days = found
+            self._dir_mtime = mtime
+        return self._days
+
+    def seg(self, day: int) -> _Segment:
+        s = self.segments.get(day)
+        if s is None:
+            s = self.segments[day] = _Segment(os.path.join(self.path, f"{_day_name(day)}.bin"))
+        return s
+
+    def last(self) -> tuple[int, float] | None:
+        for day in reversed(self.days()):
+            s = self.seg(day)
+            n = s.count()
+            if n:
+                return s.rec(n - 1)
+        return None
+
+    def close(self):
+        for s in self.segments.values():
+            s.close()
+        self.segments.clear()
+
+
+class PriceStore:
+    def __init__(self, root: str, legacy_loader=None):
+        """legacy_loader(mint) -> iterable of (ts, price); used once per mint to seed."""
+        self.root = root
+        self.legacy_loader = legacy_loader
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._series: dict[str, _Series] = {}
+        self._compactor = None
+        self.stats = {"runs": 0, "compacted": 0, "dropped": 0, "last_run": None}
+
+    def path(self, mint: str) -> str:
+        return os.path.join(self.root, mint)
+
+    def _get(self, mint: str) -> _Series:
+        with self._lock:
+            s = self._series.get(mint)
+            if s is None:
+                self._seed(mint)
+                s = self._series[mint] = _Series(self.path(mint))
+            return s
+
+    def _seed(self, mint: str):
+        path = self.path(mint)
+        if os.path.isdir(path):
+            return
+        flat = f"{path}.bin"
+        try:
+            if os.path.exists(flat):
+                with open(flat, "rb") as f:
+                    data = f.read()
+                data = data[: len(data) - len(data) % REC_SIZE]
+                pts = [REC.unpack_from(data, i) for i in range(0, len(data), REC_SIZE)]
+            elif self.legacy_loader is not None:
+                pts = sorted((int(t), float(p)) for t, p in self.legacy_loader(mint) or () if p)
+            else:
+                pts = []
+        except Exception as e:
+            log.warning("price_store seed failed mint=%s err=%s", mint, e)
+            pts = []
+        by_day: dict[int, list] = {}
+        last = 0
+        for t, p in pts:
+            last = max(int(t), last)
+            by_day.setdefault(last // DAY_S, []).append((last, p))
+        tmp = os.path.join(self.root, f".{mint}.{os.getpid()}.{threading.get_ident()}")
+        os.makedirs(tmp, exist_ok=True)
+        for day, day_pts in by_day.items():
+            _write_atomic(os.path.join(tmp, f"{_day_name(day)}.bin"), day_pts)
+        try:
+            os.rename(tmp, path)  # publish the whole dir at once: another worker may have won
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        if os.path.exists(flat):
+            os.unlink(flat)
+
+    # -- writes ------------------------------------------------------------
+    def append(self, mint: str, ts: int, price: float):
+        s = self._get(mint)
+        with s.lock:
+            # re-read the tail each time: other workers append to the same files (O_APPEND)
+            last = s.last()
+            ts = max(int(ts), last[0] if last else 0)
+            s.seg(ts // DAY_S).append(ts, price)
+
+    # -- reads -------------------------------------------------------------
+    def count(self, mint: str) -> int:
+        s = self._get(mint)
+        with s.lock:
+            return sum(s.seg(d).count() for d in s.days())
+
+    def first(self, mint: str) -> tuple[int, float] | None:
+        s = self._get(mint)
+        with s.lock:
+            for day in s.days():
+                seg = s.seg(day)
+                if seg.count():
+                    return seg.rec(0)
+        return None
+
+    def latest(self, mint: str) -> tuple[int, float] | None:
+        s = self._get(mint)
+        with s.lock:
+            return s.last()
+
+    def at_or_before(self, mint: str, ts: int) -> tuple[int, float] | None:
+        """Latest (ts, price) with ts <= the given ts: T's day segment, else earlier days."""
+        ts = int(ts)
+        s = self._get(mint)
+        with s.lock:
+            days = s.days()
+            i = bisect_right(days, ts // DAY_S)
+            while i > 0:
+                i -= 1
+                seg = s.seg(days[i])
+                j = seg.bisect_right(ts) if seg.count() else 0
+                if j:
+                    return seg.rec(j - 1)
+        return None
+
+    def range(self, mint: str, t0: int, t1: int) -> list[tuple[int, float]]:
+        """All (ts, price) with t0 <= ts <= t1."""
+        t0, t1 = int(t0), int(t1)
+        s = self._get(mint)
+        out = []
+        with s.lock:
+            for day in s.days():
+                if not t0 // DAY_S <= day <= t1 // DAY_S:
+                    continue
+                seg = s.seg(day)
+                if seg.count():
+                    out.extend(
+                        seg.rec(i) for i in range(seg.bisect_right(t0 - 1), seg.bisect_right(t1))
+                    )
+        return out
+
+    def mints(self) -> list[str]:
+        return sorted(
+            f for f in os.listdir(self.root) if f[0] != "." and os.path.isdir(self.path(f))
+        )
+
+    # -- retention ---------------------------------------------------------
+    def compact(self, now=None, raw_days: int = RAW_DAYS, step: int = COMPACT_STEP_S) -> int:
+        """
+        Downsample day segments older than raw_days to the last point per `step`
+        bucket (plus the segment's first point). Returns the number of segments rewritten.
+        """
+        cutoff = int(now or time.time()) // DAY_S - raw_days
+        done = 0
+        for mint in self.mints():
+            s = self._get(mint)
+            with s.lock:
+                for day in list(s.days()):
+                    if day >= cutoff:
+                        break
+                    seg = s.seg(day)
+                    n = seg.count()
+                    if n <= DAY_S // step + 1:
+                        continue  # already at (or below) the compacted density
+                    head = seg.rec(0)
+                    buckets = {}
+                    for i in range(1, n):
+                        t, p = seg.rec(i)
+                        buckets[t - t % step] = (t, p)
+                    _write_atomic(seg.path, [head, *buckets.values()])
+                    done += 1
+        self.stats["compacted"] += done
+        return done
+
+    def _segment_files(self):
+        for mint in self.mints():
+            d = self.path(mint)
+            for f in os.listdir(d):
+                day = _day_of(f)
+                if day is None:
+                    continue
+                try:
+                    yield day, mint, os.path.join(d, f), os.path.getsize(os.path.join(d, f))
+                except OSError:
+                    pass
+
+    def disk_usage(self) -> int:
+        return sum(size for *_, size in self._segment_files())
+
+    def enforce_budget(self, max_bytes: int = MAX_BYTES, now=None) -> int:
+        """Drop the oldest day segments across mints (never today's) until under budget."""
+        files = list(self._segment_files())
+        total = sum(size for *_, size in files)
+        today = int(now or time.time()) // DAY_S
+        dropped = 0
+        for day, mint, path, size in sorted(files):
+            if total <= max_bytes or day >= today:
+                break
+            s = self._get(mint)
+            with s.lock:
+                seg = s.segments.pop(day, None)
+                if seg is not None:
+                    seg.close()
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+            total -= size
+            dropped += 1
+        self.stats["dropped"] += dropped
+        return dropped
+
+    def run_retention(self, now=None):
+        n = self.compact(now)
+        d = self.enforce_budget(now=now)
+        self.stats["runs"] += 1
+        self.stats["last_run"] = int(time.time())
+        if n or d:
+            log.info("price_store retention: compacted=%d dropped=%d", n, d)
+
+    def start_compactor(self, every_s: int = COMPACT_EVERY_S):
+        """Run retention every `every_s` in a daemon thread (0 disables); idempotent."""
+        with self._lock:
+            if self._compactor is not None or every_s <= 0:
+                return
+            self._compactor = threading.Thread(
+                target=self._compactor_loop, args=(every_s,), daemon=True, name="price-compactor"
+            )
+        self._compactor.start()
+
+    def _compactor_loop(self, every_s: int):
+        while True:
+            time.sleep(every_s)
+            try:
+                self.run_retention()
+            except Exception:
+                log.exception("price_store retention failed")
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, mints=len(self.mints()), bytes=self.disk_usage())
+
+    def close(self):
+        with self._lock:
+            for s in self._series.values():
+                s.close()
+            self._series.clear()
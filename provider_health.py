@@ -0,0 +1,313 @@
+# provider_health.py
+# Rolling health per price provider and per endpoint (latency, error rate, 429s),
+# a circuit breaker per endpoint, and health-based ordering of fallback chains.
+#   closed    -> requests flow; opens after N consecutive failures or any 429
+#   open      -> skipped until its cooldown elapses (doubles on every re-open, capped)
+#   half_open -> one trial request; success closes, failure re-opens
+#
+# hedged_call(): staggered first-wins requests across a chain. The next provider
+# starts once the current one has been quiet for a p50-based delay (or failed),
+# and the first valid answer before the deadline wins.
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+_WINDOW_S = float(os.environ.get("PROVIDER_HEALTH_WINDOW", "600"))  # rolling window
+_MAX_SAMPLES = 200
+_FAIL_THRESHOLD = int(os.environ.get("PROVIDER_FAIL_THRESHOLD", "3"))
+_OPEN_BASE_S = float(os.environ.get("PROVIDER_OPEN_BASE", "30"))
+_OPEN_MAX_S = float(os.environ.get("PROVIDER_OPEN_MAX", "600"))
+_TRIAL_TIMEOUT_S = 30.0
+
+_HEDGE_P50_MULT = float(os.environ.get("PRICE_HEDGE_P50_MULT", "1.5"))
+_HEDGE_MIN_S = float(os.environ.get("PRICE_HEDGE_MIN_MS", "150")) / 1000.0
+_HEDGE_MAX_S = float(os.environ.get("PRICE_HEDGE_MAX_MS", "2000")) / 1000.0
+_HEDGE_DEFAULT_S = float(os.environ.get("PRICE_HEDGE_DELAY_MS", "400")) / 1000.0
+_HEDGE_WORKERS = int(os.environ.get("PRICE_HEDGE_WORKERS", "8"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class _Endpoint:
+    __slots__ = ("samples", "state", "opened_at", "cooldown", "fails", "trial_at")
+
+    def __init__(self):
+        self.samples = deque(maxlen=_MAX_SAMPLES)  # (ts, latency_ms, ok, status)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.cooldown = 0.0
+        self.fails = 0  # consecutive
+        self.trial_at = 0.0
+
+    def window(self, now: float):
+        cutoff = now - _WINDOW_S
+        return [s for s in self.samples if s[0] >= cutoff]
+
+
+def _p50(values):
+    if not values:
+        return None
+    v = sorted(values)
+    return v[len(v) // 2]
+
+
+class ProviderRouter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._eps: dict[tuple[str, str], _Endpoint] = {}
+        self._last_good: dict[str, str] = {}
+
+    def _ep(self, provider: str, endpoint: str) -> _Endpoint:
+        key = (provider, endpoint)
+        ep = self._eps.get(key)
+        if ep is None:
+            ep = self._eps[key] = _Endpoint()
+        return ep
+
+    def _open(self, ep: _Endpoint, now: float, retry_after: float | None = None):
+        ep.cooldown = min(_OPEN_MAX_S, max(_OPEN_BASE_S, ep.cooldown * 2 or _OPEN_BASE_S))
+        if retry_after:
+            ep.cooldown = min(_OPEN_MAX_S, max(ep.cooldown, float(retry_after)))
+        ep.state = OPEN
+        ep.opened_at = now
+
+    # -- recording ---------------------------------------------------------
+    def record(
+        self,
+        provider: str,
+        endpoint: str,
+        ok: bool,
+        latency_s: float,
+        status: int | None = None,
+        retry_after: float | None = None,
+    ):
+        now = time.time()
+        with self._lock:
+            ep = self._ep(provider, endpoint)
+            ep.samples.append((now, latency_s * 1000.0, bool(ok), status))
+            if ok:
+                ep.fails = 0
+                ep.state = CLOSED
+                ep.cooldown = 0.0
+                return
+            ep.fails += 1
+            if status == 429 or ep.state == HALF_OPEN or ep.fails >= _FAIL_THRESHOLD:
+                self._open(ep, now, retry_after)
+
+    def mark_good(self, provider: str, endpoint: str):
+        with self._lock:
+            self._last_good[provider] = endpoint
+
+    def last_good(self, provider: str) -> str | None:
+        return self._last_good.get(provider)
+
+    # -- circuit -----------------------------------------------------------
+    def state(self, provider: str, endpoint: str) -> str:
+        """Peek without claiming a half-open trial."""
+        now = time.time()
+        with self._lock:
+            ep = self._eps.get((provider, endpoint))
+            if ep is None or ep.state == CLOSED:
+                return CLOSED
+            if ep.state == OPEN and now - ep.opened_at >= ep.cooldown:
+                return HALF_OPEN
+            return ep.state
+
+    def allow(self, provider: str, endpoint: str) -> bool:
+        """True if a request may go out now; claims the single half-open trial."""
+        now = time.time()
+        with self._lock:
+            ep = self._eps.get((provider, endpoint))
+            if ep is None or ep.state == CLOSED:
+                return True
+            if ep.state == OPEN:
+                if now - ep.opened_at < ep.cooldown:
+                    return False
+                ep.state = HALF_OPEN
+                ep.trial_at = now
+                return True
+            # half-open: only one trial in flight; a lost trial is re-granted
+            if now - ep.trial_at >= _TRIAL_TIMEOUT_S:
+                ep.trial_at = now
+                return True
+            return False
+
+    def provider_open(self, provider: str) -> bool:
+        """A provider is out only when every endpoint we've seen for it is open."""
+        eps = [e for (p, e) in list(self._eps) if p == provider]
+        return bool(eps) and all(self.state(provider, e) == OPEN for e in eps)
+
+    # -- scoring / ordering ------------------------------------------------
+    def _stats(self, samples):
+        n = len(samples)
+        if not n:
+            return {"n": 0, "err": 0.0, "r429": 0.0, "p50_ms": None}
+        errs = sum(1 for s in samples if not s[2])
+        r429 = sum(1 for s in samples if s[3] == 429)
+        return {
+            "n": n,
+            "err": errs / n,
+            "r429": r429 / n,
+            "p50_ms": _p50([s[1] for s in samples if s[2]]),
+        }
+
+    def _samples(self, provider: str, endpoint: str | None = None):
+        now = time.time()
+        with self._lock:
+            out = []
+            for (p, e), ep in self._eps.items():
+                if p == provider and (endpoint is None or e == endpoint):
+                    out.extend(ep.window(now))
+            return out
+
+    def score(self, provider: str, endpoint: str | None = None) -> float:
+        """Lower is healthier; unseen providers/endpoints score neutral."""
+        st = self._stats(self._samples(provider, endpoint))
+        if not st["n"]:
+            return 10.0
+        return st["err"] * 100.0 + st["r429"] * 200.0 + (st["p50_ms"] or 5000.0) / 100.0
+
+    def p50_ms(self, provider: str, endpoint: str | None = None) -> float | None:
+        return self._stats(self._samples(provider, endpoint))["p50_ms"]
+
+    def hedge_delay_s(self, provider: str) -> float:
+        """How long to wait on provider before hedging: p50 x multiplier, clamped."""
+        p50 = self.p50_ms(provider)
+        if p50 is None:
+            return _HEDGE_DEFAULT_S
+        return min(_HEDGE_MAX_S, max(_HEDGE_MIN_S, p50 / 1000.0 * _HEDGE_P50_MULT))
+
+    def order_endpoints(self, provider: str, endpoints: list[str]) -> list[str]:
+        """Last endpoint that worked first, then healthiest; open circuits dropped."""
+        good = self.last_good(provider)
+        live = [e for e in endpoints if self.state(provider, e) != OPEN]
+        return sorted(
+            live,
+            key=lambda e: (e != good, self.score(provider, e), endpoints.index(e)),
+        )
+
+    def order_chain(self, chain: list[str], preferred: str | None = None) -> list[str]:
+        """
+        Preferred provider stays first unless its circuit is open; the rest are
+        ordered by recent health. Open providers go last rather than disappearing.
+        """
+        head = [preferred] if preferred in chain and not self.provider_open(preferred) else []
+        rest = [p for p in chain if p not in head]
+        rest.sort(key=lambda p: (self.provider_open(p), self.score(p), chain.index(p)))
+        return head + rest
+
+    def snapshot(self) -> list[dict]:
+        now = time.time()
+        with self._lock:
+            keys = sorted(self._eps)
+        rows = []
+        for p, e in keys:
+            with self._lock:
+                ep = self._eps[(p, e)]
+                samples = ep.window(now)
+                cooldown_left = max(0.0, ep.cooldown - (now - ep.opened_at))
+            rows.append(
+                {
+                    "provider": p,
+                    "endpoint": e,
+                    "state": self.state(p, e),
+                    "cooldown_left": cooldown_left if ep.state == OPEN else 0.0,
+                    "last_good": self._last_good.get(p) == e,
+                    **self._stats(samples),
+                }
+            )
+        return rows
+
+
+class HedgeStats:
+    """Per provider: how often it needed a hedge as primary, and how often it won."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.timeouts = 0
+        self._by: dict[str, dict[str, int]] = {}
+
+    def _p(self, tag: str) -> dict:
+        return self._by.setdefault(tag, {"primary": 0, "hedged": 0, "launched": 0, "wins": 0})
+
+    def launched(self, tag: str):
+        with self._lock:
+            self._p(tag)["launched"] += 1
+
+    def finish(self, primary: str, hedged: bool, winner: str | None):
+        with self._lock:
+            self.calls += 1
+            p = self._p(primary)
+            p["primary"] += 1
+            p["hedged"] += int(hedged)
+            if winner is None:
+                self.timeouts += 1
+            else:
+                self._p(winner)["wins"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            by = {}
+            for tag, d in self._by.items():
+                by[tag] = dict(
+                    d,
+                    hedge_rate=d["hedged"] / d["primary"] if d["primary"] else 0.0,
+                    win_rate=d["wins"] / d["launched"] if d["launched"] else 0.0,
+                )
+            return {"calls": self.calls, "timeouts": self.timeouts, "by_provider": by}
+
+
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=_HEDGE_WORKERS, thread_name_prefix="price_hedge")
+
+
+def hedged_call(calls, delay_s: float, deadline_s: float, stats: "HedgeStats | None" = None):
+    """
+    calls: [(tag, fn)] in priority order, fn() -> (value|None, err).
+    Returns (tag, value, errs) for the first non-None value, or (None, None, errs)
+    once everything failed or the deadline passed. Losers are abandoned, not awaited.
+    """
+    stats = stats or HEDGE
+    t0 = time.monotonic()
+    deadline = t0 + deadline_s
+    primary = calls[0][0]
+    pending: dict = {}
+    errs: list = []
+    hedged = False
+    nxt = 0
+    next_at = t0
+
+    while True:
+        now = time.monotonic()
+        if nxt < len(calls) and (not pending or now >= next_at):
+            hedged = hedged or bool(pending)
+            tag, fn = calls[nxt]
+            nxt += 1
+            pending[_HEDGE_POOL.submit(fn)] = tag
+            stats.launched(tag)
+            next_at = now + delay_s
+        if not pending or now >= deadline:
+            break
+        wake = deadline if nxt >= len(calls) else min(deadline, next_at)
+        done, _ = wait(list(pending), timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+        for f in done:
+            tag = pending.pop(f)
+            try:
+                val, err = f.result()
+            except Exception as e:
+                val, err = None, f"{tag} error: {e}"
+            if val is not None:
+                stats.finish(primary, hedged, tag)
+                return tag, val, errs
+            errs.append(err)
+    if pending:
+        errs.append("hedge deadline exceeded")
+    stats.finish(primary, hedged, None)
+    return None, None, errs
+
+
+# process-wide router used by the app.py price chain
+ROUTER = ProviderRouter()
+HEDGE = HedgeStats()
@@ -0,0 +1,105 @@
+# quarantine.py
+# Negative-result cache for mints no provider knows (fake, mistyped or dead tokens).
+# Each lookup kind ("name", "price") counts consecutive definitive misses per mint:
+# the provider answered, but had nothing for it. Network errors and timeouts do not
+# count. After `after` misses in a row the mint is quarantined for `base_s`, doubling
+# on every further miss up to `max_s`. While quarantined, callers skip the network fan-out
+# and show "?". The first re-probe after expiry either clears the record (any hit)
+# or extends it.
+# Records live in the state store ("quarantine.json" -> table quarantine, one row per
+# mint), so all workers share them.
+import os
+import threading
+import time
+
+_AFTER = int(os.environ.get("QUARANTINE_AFTER", "2"))
+_BASE_S = float(os.environ.get("QUARANTINE_BASE_S", "300"))
+_MAX_S = float(os.environ.get("QUARANTINE_MAX_S", str(24 * 3600)))
+
+DOC = "quarantine.json"
+
+
+class Quarantine:
+    def __init__(self, store, after: int = _AFTER, base_s: float = _BASE_S, max_s: float = _MAX_S):
+        self.store = store
+        self.after = max(1, int(after))
+        self.base_s = base_s
+        self.max_s = max_s
+        self._lock = threading.Lock()
+        self._stats = {"skipped": 0, "quarantined": 0, "released": 0}
+
+    def active(self, mint: str, kind: str | None = None, now: float | None = None) -> bool:
+        """True while `mint` is quarantined for `kind` (any kind when None)."""
+        rec = self.store.get(DOC, mint) if mint else None
+        if not rec:
+            return False
+        now = time.time() if now is None else now
+        hit = any(
+            (k == kind or kind is None) and now < float(r.get("until") or 0) for k, r in rec.items()
+        )
+        if hit:
+            with self._lock:
+                self._stats["skipped"] += 1
+        return hit
+
+    def fail(self, mint: str, kind: str, reason: str = "", now: float | None = None):
+        """Record a definitive miss; returns the quarantine end time once quarantined."""
+        if not mint:
+            return None
+        now = time.time() if now is None else now
+        with self._lock:
+            rec = self.store.get(DOC, mint) or {}
+            r = rec.get(kind) or {"fails": 0, "first_ts": now}
+            r["fails"] = int(r["fails"]) + 1
+            r["last_ts"] = now
+            r["reason"] = reason
+            until = None
+            if r["fails"] >= self.after:
+                until = now + min(self.max_s, self.base_s * 2 ** (r["fails"] - self.after))
+                self._stats["quarantined"] += 1
+            r["until"] = until or 0
+            rec[kind] = r
+            self.store.update(DOC, mint, rec)
+        return until
+
+    def ok(self, mint: str, kind: str):
+        """A hit: drop the miss record for this kind."""
+        with self._lock:
+            rec = self.store.get(DOC, mint)
+            if not rec or kind not in rec:
+                return
+            rec.pop(kind)
+            doc = self.store.load(DOC, {})
+            if rec:
+                doc[mint] = rec
+            else:
+                doc.pop(mint, None)
+            self.store.save(DOC, doc)
+            self._stats["released"] += 1
+
+    def entries(self, now: float | None = None) -> list[dict]:
+        """Quarantined (mint, kind) records, longest remaining first."""
+        now = time.time() if now is None else now
+        out = []
+        for mint, rec in (self.store.load(DOC, {}) or {}).items():
+            for kind, r in rec.items():
+                left = float(r.get("until") or 0) - now
+                if left > 0:
+                    out.append(dict(r, mint=mint, kind=kind, left_s=left))
+        return sorted(out, key=lambda e: -e["left_s"])
+
+    def clear(self, mint: str | None = None) -> int:
+        """Forget one mint (or every record when mint is None); returns mints cleared."""
+        with self._lock:
+            doc = self.store.load(DOC, {}) or {}
+            if mint is None:
+                n = len(doc)
+                doc = {}
+            else:
+                n = int(doc.pop(mint, None) is not None)
+            self.store.save(DOC, doc)
+        return n
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
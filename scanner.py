@@ -1,9 +1,9 @@
 # scanner.py
-import json
-import os
 import threading
 import time
 
+from state_store import STATE
+
 _LOCK = threading.RLock()
 _STATE_PATH = "scanner_state.json"
 _state = {
@@ -20,18 +20,16 @@ _stop = False
 
 
 def _load():
-    if os.path.exists(_STATE_PATH):
-        try:
-            with open(_STATE_PATH) as f:
-                _state.update(json.load(f))
-        except Exception:
-            pass
+    try:
+        _state.update(STATE.load(_STATE_PATH, {}))
+    except Exception:
+        pass
 
 
 def _save():
     try:
-        with open(_STATE_PATH, "w") as f:
-            json.dump(_state, f)
+        STATE.save(_STATE_PATH, _state)
+        STATE.flush()  # rare config writes: no need to wait for the app's flusher
     except Exception:
         pass
 
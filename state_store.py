@@ -0,0 +1,519 @@
+# state_store.py
+# Transactional store for the small JSON documents the tick loops and commands
+# read-modify-write: alert baselines, watch state, watchlists, scanner state, the
+# alerts config and the unresolvable-mint quarantine. One SQLite table per document
+# (WAL), one row per top-level key, so updating one mint's baseline rewrites that row
+# instead of the whole file.
+#
+# Writes are write-behind: save() diffs the document against the cached copy and
+# queues only the changed keys; flush() commits everything queued in one transaction.
+# Tick loops flush once per tick; a background flusher covers command paths.
+# Reads see this process's pending writes; commits by other processes are picked up
+# through PRAGMA data_version.
+#
+# Queued changes are also appended to a per-process journal (<db>-pending.<pid>). After
+# its commit, flush() cuts the journal back to the lines of sessions that have not
+# committed yet. A journal left behind by a crashed process is replayed the next time
+# the store is opened. Every change carries its write time: journal lines and rows
+# (column ts; deleted keys keep theirs in _deleted), so a replay applies entries oldest
+# first and skips any older than the key's last committed write.
+#
+# StateSession gives one tick a single in-memory copy of each document: mark() journals
+# a key as soon as it changes, commit() writes the marked keys (and only those, so
+# changes other code made to the same documents during the tick are kept) and flushes
+# once at the end of the tick.
+#
+# Each table is seeded once from its legacy JSON file, which is left in place.
+import atexit
+import glob
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+_DB_PATH = os.environ.get("STATE_DB_PATH", "state.db")
+_WRITE_BEHIND = os.environ.get("STATE_WRITE_BEHIND", "1") != "0"
+_FLUSH_EVERY_S = float(os.environ.get("STATE_FLUSH_EVERY", "1.0"))
+
+# legacy file name -> table
+DOCS = {
+    "alerts_price_baseline.json": "baseline",
+    "watch_state.json": "watch_state",
+    "watchlist.json": "watchlist",
+    "scanner_state.json": "scanner_state",
+    "alerts_config.json": "alerts_config",
+    "quarantine.json": "quarantine",  # quarantine.py (no legacy file)
+}
+
+_ROOT = ""  # row key holding a non-dict document (e.g. the watchlist list)
+
+
+def _dumps(v) -> str:
+    return json.dumps(v, sort_keys=True, separators=(",", ":"))
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class StateStore:
+    def __init__(
+        self,
+        path: str = _DB_PATH,
+        docs: dict | None = None,
+        legacy_dir: str = ".",
+        write_behind: bool = _WRITE_BEHIND,
+    ):
+        self.path = path
+        self.docs = dict(docs or DOCS)
+        self.legacy_dir = legacy_dir
+        self.write_behind = write_behind
+        self._lock = threading.RLock()
+        self._conn = None
+        self._data_version = None
+        self._cache: dict[str, dict[str, str]] = {}
+        self._pending: dict[str, dict[str, tuple[str | None, float]]] = {}  # k -> (v, ts)
+        self._flusher = None
+        self._jfh = None
+        self._jpid = None
+        self._held: dict[int, list[str]] = {}  # session -> its journal lines, until commit
+        self._hold_ids = itertools.count(1)
+        self._released = False  # a hold was released since the journal was last cut
+        self._stats = {
+            "loads": 0,
+            "saves": 0,
+            "flushes": 0,
+            "rows_written": 0,
+            "rows_deleted": 0,
+            "reloads": 0,
+            "errors": 0,
+            "journaled": 0,
+            "replayed": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    # -- connection / migration ------------------------------------------------
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=5, check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            conn.execute("CREATE TABLE IF NOT EXISTS _migrated (tbl TEXT PRIMARY KEY, ts INTEGER)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS _deleted"
+                " (tbl TEXT NOT NULL, k TEXT NOT NULL, ts REAL NOT NULL, PRIMARY KEY (tbl, k))"
+            )
+            for table in self.docs.values():
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table}"
+                    " (k TEXT PRIMARY KEY, v TEXT NOT NULL, ts REAL NOT NULL DEFAULT 0)"
+                )
+                cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+                if "ts" not in cols:  # created before rows carried their write time
+                    try:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN ts REAL NOT NULL DEFAULT 0")
+                    except sqlite3.OperationalError:
+                        pass  # another worker added it first
+            for fname, table in self.docs.items():
+                self._migrate(conn, fname, table)
+            self._replay_journals(conn)
+            self._conn = conn
+        return self._conn
+
+    def _migrate(self, conn, fname: str, table: str):
+        """Import the legacy JSON file into an empty table, once (across processes)."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM _migrated WHERE tbl=?", (table,)).fetchone():
+                conn.execute("COMMIT")
+                return
+            try:
+                with open(os.path.join(self.legacy_dir, fname), encoding="utf-8") as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                data = None
+            except Exception as e:
+                log.warning("state_store: could not import %s: %s", fname, e)
+                data = None
+            if data is not None:
+                rows = self._rows(data)
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {table} (k, v) VALUES (?, ?)", rows.items()
+                )
+                log.info("state_store: imported %s (%d keys) into %s", fname, len(rows), table)
+            conn.execute("INSERT INTO _migrated (tbl, ts) VALUES (?, ?)", (table, int(time.time())))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _replay_journals(self, conn):
+        """
+        Apply journals left by dead processes (writes queued but never flushed), all
+        entries oldest first; an entry older than its key's last committed write (row
+        or deletion) is skipped, so a stale journal cannot undo newer commits.
+        """
+        tables = set(self.docs.values())
+        entries, paths = [], []
+        for path in glob.glob(f"{glob.escape(self.path)}-pending.*"):
+            try:
+                pid = int(path.rsplit(".", 1)[1])
+            except ValueError:
+                continue
+            if pid != os.getpid() and _alive(pid):
+                continue
+            try:
+                mtime = os.path.getmtime(path)
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            e = json.loads(line)
+                        except ValueError:
+                            break  # torn tail from the crash
+                        if e.get("t") in tables:
+                            ts = float(e.get("ts") or mtime)  # unstamped: older format
+                            entries.append((ts, len(entries), e["t"], e["k"], e["v"]))
+            except FileNotFoundError:
+                continue  # another worker replayed it first
+            paths.append(path)
+        if not paths:
+            return
+        entries.sort()
+        applied = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for ts, _, table, k, v in entries:
+                row = conn.execute(f"SELECT ts FROM {table} WHERE k=?", (k,)).fetchone()
+                if row is None:
+                    row = conn.execute(
+                        "SELECT ts FROM _deleted WHERE tbl=? AND k=?", (table, k)
+                    ).fetchone()
+                if row is not None and ts <= row[0]:
+                    continue
+                self._write_rows(conn, table, [(k, v, ts)])
+                applied += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self._stats["replayed"] += applied
+        if entries:
+            log.warning(
+                "state_store: replayed %d of %d pending writes from %d journal(s)",
+                applied,
+                len(entries),
+                len(paths),
+            )
+
+    @staticmethod
+    def _write_rows(conn, table: str, changes) -> tuple[int, int]:
+        """Upserts and deletes (v None) of (k, v, ts); returns (written, deleted)."""
+        ups = [(k, v, ts) for k, v, ts in changes if v is not None]
+        dels = [(k,) for k, v, ts in changes if v is None]
+        if ups:
+            conn.executemany(f"INSERT OR REPLACE INTO {table} (k, v, ts) VALUES (?, ?, ?)", ups)
+        if dels:
+            conn.executemany(f"DELETE FROM {table} WHERE k=?", dels)
+            conn.executemany(
+                "INSERT OR REPLACE INTO _deleted (tbl, k, ts) VALUES (?, ?, ?)",
+                [(table, k, ts) for k, v, ts in changes if v is None],
+            )
+        return len(ups), len(dels)
+
+    def _journal(self, table: str, items, ts: float, hold: int | None = None):
+        """
+        Append key changes (written at `ts`) so a crash before they are committed can
+        be replayed. Lines written for a session (`hold`) survive flushes until
+        release(hold).
+        """
+        if not items:
+            return
+        lines = "".join(json.dumps({"t": table, "k": k, "v": v, "ts": ts}) + "\n" for k, v in items)
+        if hold is not None:
+            self._held.setdefault(hold, []).append(lines)
+        try:
+            if self._jfh is None or self._jpid != os.getpid():
+                self._jpid = os.getpid()
+                self._jfh = open(f"{self.path}-pending.{self._jpid}", "a", encoding="utf-8")
+            self._jfh.write(lines)
+            self._jfh.flush()
+            self._stats["journaled"] += len(items)
+        except OSError as e:
+            log.warning("state_store journal write failed: %s", e)
+
+    def _cut_journal(self):
+        """After a commit: keep only the lines of sessions that have not committed yet."""
+        self._released = False
+        if self._jfh is None or self._jpid != os.getpid():
+            return
+        try:
+            self._jfh.truncate(0)
+            held = "".join(itertools.chain.from_iterable(self._held.values()))
+            if held:
+                self._jfh.write(held)
+                self._jfh.flush()
+        except OSError as e:
+            log.warning("state_store journal cut failed: %s", e)
+
+    @staticmethod
+    def _rows(obj) -> dict[str, str]:
+        if isinstance(obj, dict):
+            return {str(k): _dumps(v) for k, v in obj.items()}
+        return {_ROOT: _dumps(obj)}
+
+    def table_for(self, path) -> str | None:
+        return self.docs.get(os.path.basename(str(path)))
+
+    def manages(self, path) -> bool:
+        return self.table_for(path) is not None
+
+    # -- cache -----------------------------------------------------------------
+    def _doc(self, table: str) -> dict[str, str]:
+        conn = self._db()
+        v = conn.execute("PRAGMA data_version").fetchone()[0]
+        if v != self._data_version:
+            # another connection committed: drop cached docs (pending writes are kept)
+            if self._data_version is not None and self._cache:
+                self._stats["reloads"] += 1
+            self._cache.clear()
+            self._data_version = v
+        rows = self._cache.get(table)
+        if rows is None:
+            rows = dict(conn.execute(f"SELECT k, v FROM {table}").fetchall())
+            for k, (val, _ts) in self._pending.get(table, {}).items():
+                if val is None:
+                    rows.pop(k, None)
+                else:
+                    rows[k] = val
+            self._cache[table] = rows
+        return rows
+
+    # -- public API --------------------------------------------------------------
+    def load(self, path, default=None):
+        """The document stored for a legacy file name (freshly parsed: safe to mutate)."""
+        table = self.table_for(path)
+        with self._lock:
+            self._stats["loads"] += 1
+            rows = self._doc(table)
+            if not rows:
+                return default
+            if _ROOT in rows and len(rows) == 1:
+                return json.loads(rows[_ROOT])
+            return {k: json.loads(v) for k, v in rows.items() if k != _ROOT}
+
+    def save(self, path, obj):
+        """Replace the document; only keys whose value changed are queued for the flush."""
+        table = self.table_for(path)
+        with self._lock:
+            self._stats["saves"] += 1
+            old = self._doc(table)
+            new = self._rows(obj)
+            pending = self._pending.setdefault(table, {})
+            changed = [(k, None) for k in old.keys() - new.keys()]
+            changed += [(k, v) for k, v in new.items() if old.get(k) != v]
+            ts = time.time()
+            pending.update((k, (v, ts)) for k, v in changed)
+            self._journal(table, changed, ts)
+            self._cache[table] = new
+            if not pending:
+                del self._pending[table]
+        if not self.write_behind:
+            self.flush()
+
+    def update(self, path, key: str, value):
+        """Set one top-level key of a dict document (e.g. one mint's baseline)."""
+        table = self.table_for(path)
+        with self._lock:
+            self._stats["saves"] += 1
+            rows = self._doc(table)
+            v = _dumps(value)
+            if rows.get(str(key)) != v:
+                rows[str(key)] = v
+                ts = time.time()
+                self._pending.setdefault(table, {})[str(key)] = (v, ts)
+                self._journal(table, [(str(key), v)], ts)
+        if not self.write_behind:
+            self.flush()
+
+    def delete(self, path, key: str):
+        """Drop one top-level key of a dict document."""
+        table = self.table_for(path)
+        with self._lock:
+            self._stats["saves"] += 1
+            rows = self._doc(table)
+            if str(key) in rows:
+                del rows[str(key)]
+                ts = time.time()
+                self._pending.setdefault(table, {})[str(key)] = (None, ts)
+                self._journal(table, [(str(key), None)], ts)
+        if not self.write_behind:
+            self.flush()
+
+    def hold(self) -> int:
+        """A journal hold for a session: its lines outlive flushes until release()."""
+        with self._lock:
+            return next(self._hold_ids)
+
+    def release(self, hold: int):
+        with self._lock:
+            self._released |= self._held.pop(hold, None) is not None
+
+    def journal(self, path, key: str, value, hold: int | None = None):
+        """Journal one key's new value without queueing it (a session commits it later)."""
+        with self._lock:
+            self._journal(
+                self.table_for(path),
+                [(str(key), None if value is None else _dumps(value))],
+                time.time(),
+                hold,
+            )
+
+    def session(self) -> "StateSession":
+        return StateSession(self)
+
+    def get(self, path, key: str, default=None):
+        table = self.table_for(path)
+        with self._lock:
+            self._stats["loads"] += 1
+            v = self._doc(table).get(str(key))
+        return default if v is None else json.loads(v)
+
+    def flush(self) -> int:
+        """Commit all queued key changes in one transaction; returns rows touched."""
+        with self._lock:
+            if not self._pending:
+                if self._released:
+                    self._cut_journal()
+                return 0
+            t0 = time.perf_counter()
+            conn = self._db()
+            n = d = 0
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for table, changes in self._pending.items():
+                    w, x = self._write_rows(
+                        conn, table, [(k, v, ts) for k, (v, ts) in changes.items()]
+                    )
+                    n += w
+                    d += x
+                conn.execute("COMMIT")
+            except Exception:
+                self._stats["errors"] += 1
+                try:
+                    conn.execute("ROLLBACK")
+                except Exception:
+                    pass
+                raise
+            self._pending.clear()
+            self._cut_journal()  # queued lines are committed; uncommitted sessions' stay
+            self._stats["flushes"] += 1
+            self._stats["rows_written"] += n
+            self._stats["rows_deleted"] += d
+            self._stats["last_flush_ms"] = (time.perf_counter() - t0) * 1000.0
+            return n + d
+
+    def start_flusher(self, every_s: float = _FLUSH_EVERY_S):
+        """Flush pending writes every `every_s` in a daemon thread (and at exit); idempotent."""
+        with self._lock:
+            if self._flusher is not None or not self.write_behind:
+                return
+            self._flusher = threading.Thread(
+                target=self._flush_loop, args=(every_s,), daemon=True, name="state-flusher"
+            )
+        self._flusher.start()
+        atexit.register(self._flush_quiet)
+
+    def _flush_quiet(self):
+        try:
+            self.flush()
+        except Exception:
+            log.exception("state_store flush failed")
+
+    def _flush_loop(self, every_s: float):
+        while True:
+            time.sleep(every_s)
+            self._flush_quiet()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["pending"] = sum(len(p) for p in self._pending.values())
+        out["write_behind"] = self.write_behind
+        return out
+
+    def close(self):
+        with self._lock:
+            self._flush_quiet()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._cache.clear()
+            self._data_version = None
+
+
+class StateSession:
+    """
+    One tick's view of the store. Each document is loaded once and mutated in place;
+    mark() journals a changed key right away and commit() writes the marked keys, one
+    update (or delete, for a key now absent) each, and flushes once. Unmarked changes
+    to a session's documents are not written.
+    As a context manager it commits on exit even when the tick raised, so baselines
+    updated before the failure are kept.
+    """
+
+    def __init__(self, store: StateStore):
+        self.store = store
+        self._docs: dict[str, object] = {}
+        self._marked: dict[str, set[str]] = {}
+        self._hold = store.hold()
+
+    def doc(self, path, default=None):
+        d = self._docs.get(path)
+        if d is None:
+            d = self._docs[path] = self.store.load(path, {} if default is None else default)
+        return d
+
+    def mark(self, path, key: str):
+        self._marked.setdefault(path, set()).add(key)
+        self.store.journal(path, key, self._docs[path].get(key), self._hold)
+
+    def commit(self) -> int:
+        for path, keys in self._marked.items():
+            d = self._docs[path]
+            for key in sorted(keys):
+                if d.get(key) is None:
+                    self.store.delete(path, key)
+                else:
+                    self.store.update(path, key, d[key])
+        self._marked.clear()
+        self.store.release(self._hold)  # the updates above journaled the same keys
+        return self.store.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.commit()
+        return False
+
+
+# process-wide store behind the app's JSON state helpers
+STATE = StateStore()
@@ -0,0 +1,148 @@
+# symbol_index.py
+# Reverse index: ticker symbol -> candidate mints, so ticker commands (/price BONK)
+# resolve locally instead of scanning override maps or asking a provider.
+#
+# Sources are registered in priority order (overrides, builtin tables, the name cache,
+# the Jupiter catalog). Each source keeps its own symbol -> mints map, rebuilt when the
+# source's version() changes (checked at most every `check_every` seconds). Sources
+# marked background (the catalog, hundreds of thousands of rows) rebuild in a thread
+# while the previous map keeps serving. Candidates come out source by source; within
+# a source, ties between mints sharing a symbol are ranked by weight() (watch count).
+# Sources added with unique=True (the catalog, where copycat tokens reuse popular
+# tickers) only answer for symbols that exactly one of their mints carries.
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable
+
+log = logging.getLogger(__name__)
+
+Rows = Callable[[], Iterable[tuple[str, str | None]]]  # -> (mint, symbol)
+
+
+def norm_symbol(sym) -> str:
+    return str(sym or "").strip().lstrip("$").upper()
+
+
+class _Source:
+    def __init__(self, name: str, rows: Rows, version, background: bool, unique: bool):
+        self.name = name
+        self.rows = rows
+        self.version = version
+        self.background = background
+        self.unique = unique
+        self.built = None  # version the map was built from
+        self.map: dict[str, list[str]] = {}
+        self.building = False
+
+
+class SymbolIndex:
+    def __init__(self, check_every: float = 1.0):
+        self.check_every = check_every
+        self._lock = threading.Lock()
+        self._sources: list[_Source] = []
+        self._weight: Callable[[str], float] | None = None
+        self._checked = 0.0
+        self._stats = {"lookups": 0, "hits": 0, "rebuilds": 0, "ambiguous": 0}
+
+    def add_source(
+        self, name: str, rows: Rows, version=None, background: bool = False, unique: bool = False
+    ):
+        """
+        Register a source after the existing ones (lower priority). version=None: static.
+        unique=True: a symbol the source lists under several mints is ambiguous there
+        and yields no candidate from it.
+        """
+        with self._lock:
+            self._sources.append(_Source(name, rows, version, background, unique))
+            self._checked = 0.0
+
+    def set_weight(self, fn: Callable[[str], float]):
+        self._weight = fn
+
+    @staticmethod
+    def _build(src: _Source) -> dict[str, list[str]]:
+        m: dict[str, list[str]] = {}
+        for mint, sym in src.rows():
+            key = norm_symbol(sym)
+            if key and mint:
+                mints = m.setdefault(key, [])
+                if mint not in mints:
+                    mints.append(mint)
+        return m
+
+    def _rebuild(self, src: _Source, ver):
+        try:
+            new = self._build(src)
+        except Exception as e:
+            log.warning("symbol_index: %s rebuild failed: %s", src.name, e)
+            new = None
+        with self._lock:
+            if new is not None:
+                src.map, src.built = new, ver
+                self._stats["rebuilds"] += 1
+            src.building = False
+
+    def _refresh(self):
+        """Rebuild sources whose version moved; caller holds the lock."""
+        now = time.monotonic()
+        if now - self._checked < self.check_every:
+            return
+        self._checked = now
+        for src in self._sources:
+            if src.building:
+                continue
+            try:
+                ver = src.version() if src.version else 0
+            except Exception:
+                continue
+            if src.built is not None and ver == src.built:
+                continue
+            src.building = True
+            if src.background:
+                threading.Thread(
+                    target=self._rebuild, args=(src, ver), daemon=True, name="symbol-index"
+                ).start()
+            else:
+                self._lock.release()
+                try:
+                    self._rebuild(src, ver)
+                finally:
+                    self._lock.acquire()
+
+    def candidates(self, symbol: str, sources: Iterable[str] | None = None) -> list[str]:
+        """Mints listed under `symbol`, best first (source priority, then weight)."""
+        key = norm_symbol(symbol)
+        if not key:
+            return []
+        want = set(sources) if sources is not None else None
+        with self._lock:
+            self._refresh()
+            self._stats["lookups"] += 1
+            groups = []
+            for s in self._sources:
+                if want is not None and s.name not in want:
+                    continue
+                g = list(s.map.get(key, ()))
+                if s.unique and len(g) > 1:
+                    self._stats["ambiguous"] += 1
+                    continue
+                groups.append(g)
+        out: list[str] = []
+        for g in groups:
+            if len(g) > 1 and self._weight is not None:
+                g.sort(key=self._weight, reverse=True)  # stable: ties keep source order
+            out += [m for m in g if m not in out]
+        if out:
+            self._stats["hits"] += 1
+        return out
+
+    def resolve(self, symbol: str, sources: Iterable[str] | None = None) -> str | None:
+        c = self.candidates(symbol, sources)
+        return c[0] if c else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["symbols"] = {s.name: len(s.map) for s in self._sources}
+        return out
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Alert digest tests
+Per-chat ranking of a tick's crossings and splitting under Telegram's size limit
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alert_digest import Digest, pack, tg_len
+
+
+def test_ranks_by_absolute_move_per_chat():
+    d = Digest()
+    d.add(-1, "A", 2.0, price=1.0)
+    d.add(-1, "B", -9.5, price=2.0)
+    d.add(-1, "C", 4.0)
+    d.add(-1, "A", 3.0)  # same mint again in the tick: latest wins
+    d.add(7, "D", 1.0)
+    chats = d.chats()
+    assert [it["mint"] for it in chats[-1]] == ["B", "C", "A"]
+    assert chats[-1][2]["delta_pct"] == 3.0 and "price" not in chats[-1][2]
+    assert len(d) == 4 and list(chats[7][0]) == ["mint", "delta_pct"]
+
+
+def test_pack_single_card_and_split_under_limit():
+    assert pack("H", ["a", "b"]) == ["H\na\nb"]
+    lines = [
+        f"🟢▲ +{i}.00% TOKEN{i} — Some Token Name (Abcd..wxyz) $0.000123 · birdeye"
+        for i in range(200)
+    ]
+    cards = pack("🔔 Price Alerts", lines)
+    assert len(cards) > 1
+    assert all(tg_len(c) <= 4096 for c in cards)
+    assert cards[0].startswith(f"🔔 Price Alerts (1/{len(cards)})\n")
+    assert sum(c.count("\n") for c in cards) == len(lines)  # every line kept, in order
+    assert cards[-1].endswith(lines[-1])
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Shared deadline executor tests
+Caller returns at the deadline, queued work expires, nested calls run inline
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deadline_executor
+from deadline_executor import DeadlineExecutor
+
+
+def test_timeout_returns_immediately_and_counts_abandoned():
+    ex = DeadlineExecutor(workers=2)
+    t0 = time.monotonic()
+    assert ex.run(time.sleep, 1.0, timeout=0.05, default="dflt") == "dflt"
+    assert time.monotonic() - t0 < 0.3
+    assert ex.snapshot()["abandoned"] == 1
+    assert ex.run(lambda: 42, timeout=1) == 42
+    assert ex.run(lambda: 1 / 0, timeout=1, default=-1) == -1
+
+
+def test_queued_task_expires_before_starting():
+    ex = DeadlineExecutor(workers=1)
+    gate = threading.Event()
+    threading.Thread(target=ex.run, args=(gate.wait,), kwargs={"timeout": 2}).start()
+    time.sleep(0.05)  # the only worker is now blocked
+    ran = []
+    assert ex.run(ran.append, 1, timeout=0.05) is None
+    gate.set()
+    time.sleep(0.1)
+    assert ran == []
+    assert ex.snapshot()["expired"] == 1
+
+
+def test_nested_call_runs_inline_and_sees_deadline():
+    ex = DeadlineExecutor(workers=1)
+
+    def outer():
+        left = deadline_executor.deadline_remaining()
+        return ex.run(lambda: "inner", timeout=5), 0 < left <= 1
+
+    assert ex.run(outer, timeout=1) == ("inner", True)
+    assert ex.snapshot()["inline"] == 1
+
+
+def test_full_queue_rejects():
+    ex = DeadlineExecutor(workers=1, max_queue=1)
+    gate = threading.Event()
+    threading.Thread(target=ex.run, args=(gate.wait,), kwargs={"timeout": 2}).start()
+    time.sleep(0.05)
+    threading.Thread(target=ex.run, args=(gate.wait,), kwargs={"timeout": 2}).start()
+    time.sleep(0.05)
+    assert ex.run(lambda: 1, timeout=1, default="busy") == "busy"
+    assert ex.snapshot()["rejected"] == 1
+    gate.set()
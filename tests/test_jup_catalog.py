@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Jupiter catalog index tests
+Packed index lookups, legacy JSON conversion, and stale-index background refresh
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jup_catalog import JupCatalog, write_index
+
+SOL = "So11111111111111111111111111111111111111112"
+BONK = "DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263"
+
+
+def test_lookup_by_binary_search(tmp_path):
+    path = str(tmp_path / "cat.idx")
+    rows = [(f"Mint{i:06d}", f"T{i}", f"Token {i}") for i in range(5000)]
+    assert write_index(path, rows + [(SOL, "SOL", "Wrapped SOL"), ("Bad", None, None)]) == 5001
+    cat = JupCatalog(path)
+    assert cat.lookup(SOL) == ("SOL", "Wrapped SOL")
+    assert cat.lookup("Mint004321") == ("T4321", "Token 4321")
+    assert cat.lookup("Mint999999") is None and cat.lookup("Bad") is None
+    assert len(cat) == 5001
+    assert next(cat.items()) == ("Mint000000", "T0", "Token 0")
+
+
+def test_converts_legacy_json_and_refreshes_when_stale(tmp_path):
+    legacy = tmp_path / "jupiter_tokens.json"
+    old = int(time.time()) - 2 * 86400
+    legacy.write_text(
+        json.dumps({"ts": old, "by_mint": {BONK: {"symbol": "BONK", "name": "Bonk"}}})
+    )
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return [(BONK, "BONK", "Bonk"), (SOL, "SOL", "Solana")]
+
+    cat = JupCatalog(str(tmp_path / "cat.idx"), fetch=fetch, legacy_json=str(legacy), ttl=86400)
+    assert cat.lookup(BONK) == ("BONK", "Bonk")  # converted index; stale, so refresh starts
+    for _ in range(100):
+        if not cat.stats()["refreshing"]:
+            break
+        time.sleep(0.01)
+    assert cat.lookup(SOL) == ("SOL", "Solana")
+    assert len(calls) == 1
+    assert cat.stats()["tokens"] == 2
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+MarkdownV2 renderer tests
+Valid markup passes through unchanged, stray specials are escaped, entities survive
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mdv2 import STATS, code, esc, is_valid, link, prepare, render
+
+
+def test_valid_markup_is_unchanged():
+    for t in [
+        "📈 *Perf stats*\n*Single\\-flight*\ncalls: `3` in\\-flight: `0`",
+        "Usage: `/alerts_rate <n>`",
+        "_italic_ __under__ ~strike~ ||spoiler|| [Bonk](https://x.y/a_(b\\))",
+        "> quote\nplain",
+        "```\nx = \\`1\\`\n```",
+    ]:
+        assert is_valid(t), t
+        assert render(t) == t
+
+
+def test_stray_specials_are_escaped_and_entities_kept():
+    assert render("*Info*\nPrice: $1.50 (birdeye) -5%") == (
+        "*Info*\nPrice: $1\\.50 \\(birdeye\\) \\-5%"
+    )
+    assert render("rate_per_min: _on_") == "rate\\_per\\_min: _on_"
+    assert render("unclosed *bold and `code") == "unclosed \\*bold and \\`code"
+    assert render("a > b\\") == "a \\> b\\\\"
+    assert render("``` x = `1` ```") == "``` x = \\`1\\` ```"
+    assert all(is_valid(render(t)) for t in ["**", "~~a~~", "[x](", "|a|", "\\é"])
+
+
+def test_card_helpers_and_counters():
+    assert esc("1.5 (x)") == "1\\.5 \\(x\\)"
+    assert code("a`b\\c") == "`a\\`b\\\\c`"
+    assert link("x.y", "http://a/b)c") == "[x\\.y](http://a/b\\)c)"
+    before = STATS.snapshot()
+    prepare("*ok*")
+    prepare("not ok.")
+    after = STATS.snapshot()
+    assert after["messages"] - before["messages"] == 2
+    assert after["as_is"] - before["as_is"] == 1 and after["repaired"] - before["repaired"] == 1
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Token name cache tests
+Single parse, batched dirty flush, and coherence with another worker's writes
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from name_cache import NameCache
+
+
+def test_reads_once_and_flushes_dirty_batch(tmp_path):
+    path = tmp_path / "token_names.json"
+    path.write_text(json.dumps({"A": {"primary": "AAA", "secondary": "Alpha"}}))
+    nc = NameCache(str(path), check_every=3600)
+    assert nc.get("A")["primary"] == "AAA"
+    assert nc.get("B") is None
+    for i in range(100):
+        nc.set(f"M{i}", {"primary": f"T{i}", "secondary": None})
+    assert "M0" not in json.loads(path.read_text())  # write-behind
+    assert nc.flush() == 100
+    assert nc.flush() == 0
+    on_disk = json.loads(path.read_text())
+    assert len(on_disk) == 101 and on_disk["M7"]["primary"] == "T7"
+    st = nc.stats()
+    assert (st["hits"], st["misses"], st["flushes"], st["dirty"]) == (1, 1, 1, 0)
+
+
+def test_merges_other_worker_writes(tmp_path):
+    path = tmp_path / "token_names.json"
+    a = NameCache(str(path), check_every=0)
+    b = NameCache(str(path), check_every=0)
+    a.set("A", {"primary": "AAA"})
+    b.set("B", {"primary": "BBB"})
+    a.flush()
+    assert b.get("A") == {"primary": "AAA"}  # picked up via mtime
+    b.pop("A")
+    b.flush()
+    assert json.loads(path.read_text()) == {"B": {"primary": "BBB"}}
+    assert a.get("B") == {"primary": "BBB"} and a.get("A") is None
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Name resolution race tests
+First answer per field wins, early exit once both are known, time budget, adaptive order,
+queued losers cancelled
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import name_resolver
+from name_resolver import RaceStats, race_names
+
+
+def _after(s, v):
+    def fn():
+        time.sleep(s)
+        return v
+
+    return fn
+
+
+def test_first_wins_and_stops_when_complete():
+    st = RaceStats()
+    t0 = time.monotonic()
+    sym, name, timed_out, errors = race_names(
+        [
+            ("slow", _after(2.0, ("SLOW", "Slow Token"))),
+            ("sym", _after(0.01, {"symbol": " bonk ", "name": ""})),
+            ("name", _after(0.05, (None, "Bonk"))),
+            ("broken", _after(0.0, "garbage")),
+        ],
+        budget_s=1.0,
+        stats=st,
+        clean=str.upper,
+    )
+    assert (sym, name, timed_out, errors) == ("BONK", "Bonk", False, 0)
+    assert time.monotonic() - t0 < 0.5  # did not wait for "slow"
+    snap = st.snapshot()
+    assert snap["by_source"]["sym"]["first"] == 1 and snap["by_source"]["name"]["first"] == 0
+    assert st.order(["slow", "name", "sym"]) == ["sym", "slow", "name"]
+
+
+def test_budget_returns_partial():
+    st = RaceStats()
+    sym, name, timed_out, _ = race_names(
+        [("a", _after(0.01, ("AAA", None))), ("b", _after(1.0, (None, "Never")))],
+        budget_s=0.1,
+        stats=st,
+    )
+    assert (sym, name, timed_out) == ("AAA", None, True)
+    assert st.snapshot()["timeouts"] == 1
+
+
+def test_queued_losers_are_cancelled_at_the_budget(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(name_resolver, "_POOL", ThreadPoolExecutor(max_workers=1))
+    ran = []
+    busy = _after(0.3, None)
+    sym, _, timed_out, _ = race_names(
+        [("busy", busy), ("queued", lambda: ran.append(1))], budget_s=0.05, stats=RaceStats()
+    )
+    assert timed_out and sym is None
+    time.sleep(0.4)
+    assert ran == []
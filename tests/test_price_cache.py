@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Two-tier price cache tests (no network)
+L1 LRU eviction, shared SQLite tier, stale-while-revalidate, negative entries
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_cache import TwoTierCache
+
+
+def test_lru_evicts_oldest(tmp_path):
+    c = TwoTierCache(maxsize=2, shared=False)
+    c.set("a", 1, 60)
+    c.set("b", 2, 60)
+    c.get("a")  # touch -> b becomes oldest
+    c.set("c", 3, 60)
+    assert c.get("a") == 1
+    assert c.get("b") is None
+    assert c.snapshot()["l1_evictions"] == 1
+
+
+def test_shared_tier_warms_other_worker(tmp_path):
+    db = str(tmp_path / "cache.sqlite")
+    w1 = TwoTierCache(path=db)
+    w2 = TwoTierCache(path=db)
+    w1.set(("px", "birdeye", "MINT"), 1.25, 60)
+    assert w2.get(("px", "birdeye", "MINT")) == 1.25
+    assert w2.snapshot()["l2_hits"] == 1
+
+
+def test_stale_while_revalidate(tmp_path):
+    c = TwoTierCache(shared=False)
+    c.set("k", 1.0, ttl=0.05, stale_ttl=5)
+    time.sleep(0.1)
+    st, val = c.load("k", lambda: 2.0, ttl=5, stale_ttl=5)
+    assert (st, val) == ("stale", 1.0)
+    for _ in range(50):
+        if c.get("k") == 2.0:
+            break
+        time.sleep(0.01)
+    assert c.get("k") == 2.0
+
+
+def test_negative_entry_skips_loader(tmp_path):
+    c = TwoTierCache(shared=False)
+    calls = []
+    assert c.get_or_load("m", lambda: calls.append(1), ttl=5, neg_ttl=5) is None
+    assert c.get_or_load("m", lambda: calls.append(1), ttl=5, neg_ttl=5) is None
+    assert len(calls) == 1
+    assert c.snapshot()["negative_hits"] == 1
+
+
+def test_memoize_bounded_negative_ttl_and_single_load():
+    import threading
+
+    from price_cache import memoize
+
+    calls = []
+
+    @memoize(ttl=60, neg_ttl=0.05, maxsize=2, name="t_memo")
+    def f(x):
+        calls.append(x)
+        time.sleep(0.05)
+        return None if x == "none" else x * 2
+
+    ts = [threading.Thread(target=f, args=(1,)) for _ in range(5)]
+    [t.start() for t in ts]
+    [t.join() for t in ts]
+    assert calls == [1]  # one cold load shared by five callers
+    assert f("none") is None and f("none") is None
+    time.sleep(0.06)
+    f("none")  # negative entry expired -> reloaded
+    assert calls.count("none") == 2
+    f(2), f(3)
+    st = f.cache.snapshot()
+    assert st["size"] == 2 and st["evictions"] >= 1
+    assert st["coalesced"] == 4 and st["negative_hits"] == 1
+
+
+def test_memoize_refresh_ahead():
+    from price_cache import memoize
+
+    vals = iter([1, 2])
+
+    @memoize(ttl=0.2, refresh_ahead=0.9, name="t_refresh")
+    def g():
+        return next(vals)
+
+    assert g() == 1
+    time.sleep(0.05)  # inside the refresh-ahead window
+    assert g() == 1  # served immediately, refresh kicked off
+    for _ in range(50):
+        if g() == 2:
+            break
+        time.sleep(0.01)
+    assert g() == 2
+    assert g.cache.snapshot()["refreshes"] >= 1
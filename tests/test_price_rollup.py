@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+OHLC rollup tests over the binary price store
+Bar folding, local window changes, gaps fall back (None), cross-handle catch-up
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_rollup import RollupEngine
+from price_store import PriceStore
+
+
+def _seed(store, now, secs, step=30, price=lambda i: 100.0 + i):
+    for i, ts in enumerate(range(now - secs, now + 1, step)):
+        store.append("M", ts, price(i))
+
+
+def test_bars_fold_ohlc(tmp_path):
+    st = PriceStore(str(tmp_path))
+    base = int(time.time()) // 3600 * 3600 - 3600
+    for ts, px in [(base, 5.0), (base + 10, 7.0), (base + 20, 4.0), (base + 50, 6.0)]:
+        st.append("M", ts, px)
+    st.append("M", base + 60, 9.0)
+    bars = RollupEngine(st).bars("M", "1m")
+    assert bars == [(base, 5.0, 7.0, 4.0, 6.0), (base + 60, 9.0, 9.0, 9.0, 9.0)]
+
+
+def test_windows_from_local_history(tmp_path):
+    st = PriceStore(str(tmp_path))
+    now = int(time.time())
+    _seed(st, now, 2 * 3600, price=lambda i: 100.0 if i < 10 else 110.0)
+    ru = RollupEngine(st)
+    ch = ru.changes("M", price_now=110.0)
+    assert round(ch["m30"], 6) == 0.0
+    assert round(ch["h1"], 6) == 0.0
+    assert ch["h4"] is None and ch["h24"] is None  # not tracked that long -> API
+    assert ru.change_pct("M", 2 * 3600 - 30, 110.0) == 10.0
+    assert ru.since_tracking("M") == (now - 2 * 3600, 100.0)
+
+
+def test_gap_is_not_bridged_and_catch_up_sees_new_points(tmp_path):
+    st = PriceStore(str(tmp_path))
+    now = int(time.time())
+    st.append("M", now - 6 * 3600, 50.0)  # lone old point, then nothing for hours
+    st.append("M", now - 60, 100.0)
+    ru = RollupEngine(st)
+    assert ru.changes("M", 100.0)["h1"] is None
+    PriceStore(str(tmp_path)).append("M", now, 120.0)  # another worker appends
+    assert ru.change_pct("M", 60, None) == 20.0
+
+
+def test_sparse_history_is_not_labelled_as_a_window(tmp_path):
+    st = PriceStore(str(tmp_path))
+    now = int(time.time())
+    st.append("M", now - 8400, 100.0)  # ~2h20m ago, then only the current price
+    st.append("M", now, 150.0)
+    ch = RollupEngine(st).changes("M", 150.0)
+    assert ch["m30"] is None and ch["h1"] is None
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Binary price-history store tests
+Bisection lookups, range queries, out-of-order clamp, one-time legacy seeding,
+day segments, compaction and the disk budget
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_store import DAY_S, REC, REC_SIZE, PriceStore
+
+
+def test_at_or_before_and_range(tmp_path):
+    st = PriceStore(str(tmp_path))
+    for i in range(1000):
+        st.append("M", 1000 + i * 10, float(i))
+    assert st.count("M") == 1000
+    assert st.at_or_before("M", 999) is None
+    assert st.at_or_before("M", 1000) == (1000, 0.0)
+    assert st.at_or_before("M", 1055) == (1050, 5.0)
+    assert st.latest("M") == (10990, 999.0)
+    assert [p for _, p in st.range("M", 1010, 1040)] == [1.0, 2.0, 3.0, 4.0]
+
+
+def test_out_of_order_sample_is_clamped(tmp_path):
+    st = PriceStore(str(tmp_path))
+    st.append("M", 200, 1.0)
+    st.append("M", 100, 2.0)
+    assert st.latest("M") == (200, 2.0)
+
+
+def test_second_handle_sees_appends(tmp_path):
+    a, b = PriceStore(str(tmp_path)), PriceStore(str(tmp_path))
+    a.append("M", 10, 1.0)
+    assert b.latest("M") == (10, 1.0)
+    a.append("M", 20, 2.0)
+    assert b.at_or_before("M", 25) == (20, 2.0)
+
+
+def test_legacy_loader_seeds_once(tmp_path):
+    calls = []
+
+    def legacy(mint):
+        calls.append(mint)
+        return [(30, 3.0), (10, 1.0), (20, 2.0)]
+
+    st = PriceStore(str(tmp_path), legacy_loader=legacy)
+    assert st.at_or_before("M", 25) == (20, 2.0)
+    st.append("M", 40, 4.0)
+    assert PriceStore(str(tmp_path), legacy_loader=legacy).count("M") == 4
+    assert calls == ["M"]
+
+
+def test_day_segments_and_lookups_across_days(tmp_path):
+    st = PriceStore(str(tmp_path))
+    for d in (0, 1, 3):
+        for i in range(200):
+            st.append("M", d * DAY_S + i * 60, float(d * 1000 + i))
+    assert sorted(os.listdir(st.path("M"))) == ["19700101.bin", "19700102.bin", "19700104.bin"]
+    assert st.at_or_before("M", 2 * DAY_S + 5) == (DAY_S + 199 * 60, 1199.0)  # gap day
+    assert st.at_or_before("M", 3 * DAY_S + 130) == (3 * DAY_S + 120, 3002.0)
+    got = st.range("M", DAY_S + 199 * 60, 3 * DAY_S + 60)
+    assert [p for _, p in got] == [1199.0, 3000.0, 3001.0]
+    assert st.first("M") == (0, 0.0)
+
+
+def test_flat_file_is_migrated(tmp_path):
+    with open(tmp_path / "M.bin", "wb") as f:
+        f.write(REC.pack(10, 1.0) + REC.pack(DAY_S + 10, 2.0) + b"torn")
+    st = PriceStore(str(tmp_path))
+    assert st.count("M") == 2
+    assert st.latest("M") == (DAY_S + 10, 2.0)
+    assert not os.path.exists(tmp_path / "M.bin")
+
+
+def test_compaction_and_budget(tmp_path):
+    st = PriceStore(str(tmp_path))
+    for i in range(0, DAY_S, 10):  # day 0 at 10s resolution
+        st.append("M", i, float(i))
+    st.append("M", 20 * DAY_S, 1.0)
+    assert st.compact(now=20 * DAY_S, raw_days=7, step=300) == 1
+    assert st.count("M") == 288 + 2  # first point + one per 5m bucket + today
+    assert st.first("M") == (0, 0.0)
+    assert st.at_or_before("M", 3600 + 5) == (3590, 3590.0)  # previous bucket's close
+    assert st.at_or_before("M", 3600 + 295) == (3890, 3890.0)
+    assert st.compact(now=20 * DAY_S, raw_days=7, step=300) == 0  # idempotent
+    assert st.enforce_budget(max_bytes=REC_SIZE, now=20 * DAY_S) == 1
+    assert st.first("M") == (20 * DAY_S, 1.0)  # today's segment is never dropped
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Provider health / circuit breaker tests (no network)
+Opening on failures and 429s, half-open trial, endpoint and chain ordering
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import provider_health
+from provider_health import ProviderRouter
+
+
+def test_consecutive_failures_open_circuit():
+    r = ProviderRouter()
+    for _ in range(provider_health._FAIL_THRESHOLD):
+        assert r.allow("birdeye", "/defi/price")
+        r.record("birdeye", "/defi/price", False, 0.1, 500)
+    assert r.state("birdeye", "/defi/price") == "open"
+    assert not r.allow("birdeye", "/defi/price")
+
+
+def test_429_opens_immediately_and_half_open_trial(monkeypatch):
+    r = ProviderRouter()
+    r.record("dex", "/tokens", False, 0.05, 429)
+    assert r.state("dex", "/tokens") == "open"
+    assert r.provider_open("dex")
+    # pretend the cooldown elapsed: exactly one trial goes out
+    monkeypatch.setattr(time, "time", lambda: 10**10)
+    assert r.allow("dex", "/tokens")
+    assert not r.allow("dex", "/tokens")
+    r.record("dex", "/tokens", True, 0.05, 200)
+    assert r.state("dex", "/tokens") == "closed"
+
+
+def test_endpoint_order_prefers_last_good_and_skips_open():
+    r = ProviderRouter()
+    eps = ["/defi/price", "/public/price", "/defi/multi_price"]
+    r.record("birdeye", "/public/price", True, 0.2, 200)
+    r.mark_good("birdeye", "/public/price")
+    r.record("birdeye", "/defi/price", False, 0.1, 429)
+    assert r.order_endpoints("birdeye", eps) == ["/public/price", "/defi/multi_price"]
+
+
+def test_chain_demotes_open_preferred_provider():
+    r = ProviderRouter()
+    assert r.order_chain(["birdeye", "dex"], "birdeye") == ["birdeye", "dex"]
+    r.record("birdeye", "/defi/price", False, 0.1, 429)
+    assert r.order_chain(["birdeye", "dex"], "birdeye") == ["dex", "birdeye"]
+
+
+def test_hedge_fires_after_delay_and_backup_wins():
+    stats = provider_health.HedgeStats()
+
+    def slow():
+        time.sleep(0.5)
+        return 1.0, None
+
+    t0 = time.monotonic()
+    tag, val, _ = provider_health.hedged_call(
+        [("birdeye", slow), ("dex", lambda: (2.0, None))], 0.05, 2.0, stats
+    )
+    assert (tag, val) == ("dex", 2.0)
+    assert time.monotonic() - t0 < 0.4  # did not wait for the slow primary
+    snap = stats.snapshot()["by_provider"]
+    assert snap["birdeye"]["hedge_rate"] == 1.0
+    assert snap["dex"]["win_rate"] == 1.0
+
+
+def test_hedge_failure_moves_on_and_deadline_bounds_wait():
+    stats = provider_health.HedgeStats()
+    tag, val, errs = provider_health.hedged_call(
+        [("birdeye", lambda: (None, "boom")), ("dex", lambda: (3.0, None))], 5.0, 2.0, stats
+    )
+    assert (tag, val) == ("dex", 3.0)
+    assert stats.snapshot()["by_provider"]["birdeye"]["hedged"] == 0  # fallback, not a hedge
+
+    def hang():
+        time.sleep(1)
+        return None, None
+
+    t0 = time.monotonic()
+    tag, val, errs = provider_health.hedged_call([("birdeye", hang)], 0.05, 0.1, stats)
+    assert tag is None and "hedge deadline exceeded" in errs
+    assert time.monotonic() - t0 < 0.5
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Unresolvable-mint quarantine tests
+Threshold, exponential re-probe interval, per-kind release and admin clear
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quarantine import Quarantine
+from state_store import StateStore
+
+
+def _q(tmp_path, **kw):
+    return Quarantine(StateStore(str(tmp_path / "state.db"), legacy_dir=str(tmp_path)), **kw)
+
+
+def test_backoff_doubles_and_hit_releases(tmp_path):
+    q = _q(tmp_path, after=2, base_s=60, max_s=200)
+    assert q.fail("FAKE", "name", now=0) is None  # one miss is not enough
+    assert not q.active("FAKE", now=1)
+    assert q.fail("FAKE", "name", now=0) == 60
+    assert q.active("FAKE", now=59) and q.active("FAKE", "name", now=59)
+    assert not q.active("FAKE", "price", now=59) and not q.active("FAKE", now=61)
+    assert q.fail("FAKE", "name", now=100) == 220  # 120s
+    assert q.fail("FAKE", "name", now=300) == 500  # capped at 200s
+    q.fail("FAKE", "price", now=300)
+    q.ok("FAKE", "name")
+    assert not q.active("FAKE", "name", now=301)
+    assert q.store.get("quarantine.json", "FAKE")["price"]["fails"] == 1
+
+
+def test_entries_and_clear(tmp_path):
+    q = _q(tmp_path, after=1, base_s=60)
+    for m in ("A", "B", "C"):
+        q.fail(m, "price")
+    assert {e["mint"] for e in q.entries()} == {"A", "B", "C"}
+    assert q.clear("B") == 1 and q.clear("B") == 0
+    assert q.clear() == 2 and q.entries() == []
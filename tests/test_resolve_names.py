@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Bulk name resolution tests
+Local sources first, one DexScreener call per 30 mints, cache write-back, unknown mints,
+rate-limited name sources not counted as misses
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import app
+from name_cache import NameCache
+from quarantine import Quarantine
+from state_store import StateStore
+
+OVR, CACHED, CAT = "Ovr1" + "1" * 40, "Cch1" + "1" * 40, "Cat1" + "1" * 40
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    calls = []
+    dex = {}  # mint -> (symbol, name) DexScreener knows
+
+    def http(url, headers=None, params=None, timeout=8):
+        calls.append(url)
+        if "birdeye" in url:
+            asked = params["list_address"].split(",")
+            return {"data": {m: {"symbol": "BRD", "name": "Birdeye Coin"} for m in asked[:1]}}
+        asked = url.rsplit("/", 1)[-1].split(",")
+        pairs = [
+            {"baseToken": {"address": m, "symbol": dex[m][0], "name": dex[m][1]}}
+            for m in asked
+            if m in dex
+        ]
+        return {"pairs": pairs or None}
+
+    names = NameCache(str(tmp_path / "token_names.json"))
+    names.set(CACHED, {"primary": "CCH", "secondary": "Cached Coin", "ts": 1})
+    overrides = {OVR: {"primary": "OVR", "secondary": "Override Coin"}}
+    monkeypatch.setattr(app, "_http_get_json", http)
+    monkeypatch.setattr(app, "_NAMES", names)
+    monkeypatch.setattr(app, "_QUARANTINE", Quarantine(StateStore(str(tmp_path / "s.db")), after=1))
+    monkeypatch.setattr(
+        app, "_load_json_safe", lambda p: overrides if p == app.OVERRIDES_FILE else {}
+    )
+    monkeypatch.setattr(
+        app,
+        "_name_from_jup_catalog",
+        lambda m: ("CAT", "Catalog Coin") if m == CAT else (None, None),
+    )
+    monkeypatch.delenv("BIRDEYE_API_KEY", raising=False)
+    return calls, dex, names
+
+
+def test_local_sources_need_no_network(env):
+    calls, _, names = env
+    out = app.resolve_names([OVR, CACHED, CAT, OVR])
+    assert out == {
+        OVR: ("OVR", "Override Coin"),
+        CACHED: ("CCH", "Cached Coin"),
+        CAT: ("CAT", "Catalog Coin"),
+    }
+    assert calls == []
+    assert names.get(CAT)["primary"] == "CAT"  # catalog hits are cached too
+
+
+def test_one_dexscreener_call_per_30_mints_and_write_back(env):
+    calls, dex, names = env
+    mints = [f"Mint{i:040d}" for i in range(61)]
+    dex.update({m: (f"T{i}", f"Token {i}") for i, m in enumerate(mints) if i % 2 == 0})
+    out = app.resolve_names(mints)
+    assert len(calls) == 3 and all(len(u.rsplit("/", 1)[-1].split(",")) <= 30 for u in calls)
+    assert out[mints[0]] == ("T0", "Token 0") and names.get(mints[0])["secondary"] == "Token 0"
+    assert out[mints[1]] == (None, None)
+    assert app._QUARANTINE.active(mints[1], "name") and not app._QUARANTINE.active(mints[0])
+    calls.clear()
+    app.resolve_names(mints)
+    assert calls == []  # hits cached, misses quarantined
+
+
+def test_unknown_mint_shape_and_display(env):
+    calls, _, _ = env
+    unk = "Unk1" + "x" * 36 + "wxyz"
+    assert app.resolve_names([unk]) == {unk: (None, None)}
+    assert app._display_pair(None, unk) == (app._short_mint(unk), "?")
+    assert app._display_pair(("ABC", None), unk) == ("ABC", "?")
+
+
+def test_birdeye_batch_takes_dexscreener_leftovers_when_keyed(env, monkeypatch):
+    calls, _, _ = env
+    monkeypatch.setenv("BIRDEYE_API_KEY", "k")
+    a, b = "Brd1" + "1" * 40, "Brd2" + "1" * 40
+    out = app.resolve_names([a, b])
+    assert len(calls) == 2 and "birdeye" in calls[1]
+    assert out[a] == ("BRD", "Birdeye Coin") and out[b] == (None, None)
+
+
+def test_rate_limited_sources_are_errors_not_misses(env, monkeypatch):
+    unk = "Unk2" + "x" * 40
+    status = {"code": 429}
+    monkeypatch.setattr(
+        app, "_get", lambda url, **kw: SimpleNamespace(status_code=status["code"], json=dict)
+    )
+    assert app.resolve_token_name(unk) == app._short_mint(unk)
+    assert app._QUARANTINE.store.get("quarantine.json", unk) is None
+    status["code"] = 404
+    app.resolve_token_name(unk)
+    assert app._QUARANTINE.active(unk, "name")
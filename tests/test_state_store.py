@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+SQLite state store tests
+One-time JSON import, per-key write-behind flush, visibility across processes,
+tick sessions (marked keys only) and timestamped journal replay after a crash
+"""
+
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from state_store import StateStore
+
+
+def _store(tmp_path, **kw):
+    return StateStore(str(tmp_path / "state.db"), legacy_dir=str(tmp_path), **kw)
+
+
+def test_imports_legacy_json_once(tmp_path):
+    (tmp_path / "alerts_price_baseline.json").write_text(json.dumps({"M": {"price": 1.0}}))
+    (tmp_path / "watchlist.json").write_text(json.dumps([{"mint": "A"}]))
+    st = _store(tmp_path)
+    assert st.load("alerts_price_baseline.json") == {"M": {"price": 1.0}}
+    assert st.load("watchlist.json") == [{"mint": "A"}]
+    assert st.load("watch_state.json", {}) == {}
+    (tmp_path / "alerts_price_baseline.json").write_text(json.dumps({"X": {}}))
+    assert _store(tmp_path).load("alerts_price_baseline.json") == {"M": {"price": 1.0}}
+
+
+def test_write_behind_flushes_changed_keys_only(tmp_path):
+    st = _store(tmp_path)
+    base = {f"M{i}": {"price": float(i)} for i in range(200)}
+    st.save("alerts_price_baseline.json", base)
+    assert st.flush() == 200
+    for i in range(200):  # per-mint rewrite of the whole doc: only one key changes
+        doc = st.load("alerts_price_baseline.json")
+        doc[f"M{i}"]["price"] += 1
+        st.save("alerts_price_baseline.json", doc)
+    st.update("alerts_price_baseline.json", "_rl_M0", 123)
+    assert st.snapshot()["pending"] == 201
+    db = sqlite3.connect(str(tmp_path / "state.db"))
+    assert db.execute("SELECT v FROM baseline WHERE k='M5'").fetchone()[0] == '{"price":5.0}'
+    assert st.flush() == 201
+    assert db.execute("SELECT v FROM baseline WHERE k='M5'").fetchone()[0] == '{"price":6.0}'
+    st.save("alerts_price_baseline.json", {"M0": {"price": 0.0}})
+    st.flush()
+    assert db.execute("SELECT COUNT(*) FROM baseline").fetchone()[0] == 1
+
+
+def test_other_process_commits_are_visible(tmp_path):
+    a, b = _store(tmp_path), _store(tmp_path)
+    assert b.load("scanner_state.json", {}) == {}
+    a.save("scanner_state.json", {"watchlist_by_chat": {"1": ["M"]}})
+    assert b.load("scanner_state.json", {}) == {}  # not flushed yet
+    a.flush()
+    assert b.get("scanner_state.json", "watchlist_by_chat") == {"1": ["M"]}
+
+
+def test_session_commits_once_and_journal_survives_crash(tmp_path):
+    st = _store(tmp_path)
+    with st.session() as ss:
+        doc = ss.doc("watch_state.json")
+        for i in range(50):
+            doc[f"M{i}"] = {"last_price": float(i)}
+            ss.mark("watch_state.json", f"M{i}")
+    assert st.snapshot()["flushes"] == 1
+    assert not os.path.getsize(f"{st.path}-pending.{os.getpid()}")  # truncated on commit
+
+    ss = st.session()
+    ss.doc("watch_state.json")["M1"]["last_price"] = 9.0
+    ss.mark("watch_state.json", "M1")
+    st.update("alerts_price_baseline.json", "M1", {"price": 9.0})
+    # "crash": nothing flushed; the next store opened on this db replays the journal
+    st2 = _store(tmp_path)
+    assert st2.get("watch_state.json", "M1") == {"last_price": 9.0}
+    assert st2.get("alerts_price_baseline.json", "M1") == {"price": 9.0}
+    assert st2.snapshot()["replayed"] == 2
+
+
+def test_session_commit_writes_only_marked_keys(tmp_path):
+    st = _store(tmp_path)
+    st.save("watch_state.json", {"A": 1, "B": 2})
+    st.flush()
+    ss = st.session()
+    doc = ss.doc("watch_state.json")
+    doc["A"] = 10
+    ss.mark("watch_state.json", "A")
+    doc.pop("X", None)
+    ss.mark("watch_state.json", "X")  # absent at commit: deleted
+    st.delete("watch_state.json", "B")  # e.g. /unwatch during the tick
+    st.update("watch_state.json", "C", 3)
+    ss.commit()
+    assert _store(tmp_path).load("watch_state.json") == {"A": 10, "C": 3}
+
+
+def test_flush_keeps_open_sessions_journal(tmp_path):
+    st = _store(tmp_path)
+    journal = f"{st.path}-pending.{os.getpid()}"
+    for crash in (False, True):
+        ss = st.session()
+        ss.doc("watch_state.json")["A"] = {"last_price": float(crash)}
+        ss.mark("watch_state.json", "A")
+        st.update("alerts_price_baseline.json", "X", 1)
+        st.flush()  # unrelated flush (e.g. the 1s flusher) mid-tick
+        assert '"k": "A"' in open(journal).read()
+        if not crash:
+            ss.commit()
+            assert not os.path.getsize(journal)
+    assert _store(tmp_path).get("watch_state.json", "A") == {"last_price": 1.0}
+
+
+def test_replay_skips_entries_older_than_committed_writes(tmp_path):
+    st = _store(tmp_path)
+    st.update("watch_state.json", "A", "committed")
+    st.update("watch_state.json", "B", "gone")
+    st.flush()
+    st.delete("watch_state.json", "B")
+    st.flush()
+    p = subprocess.Popen([sys.executable, "-c", "pass"])
+    p.wait()  # a pid that is certainly dead
+    with open(f"{st.path}-pending.{p.pid}", "w") as f:
+        for k, v, ts in [("A", "stale", 1.0), ("B", "stale", 2.0), ("C", "new", 3.0)]:
+            f.write(json.dumps({"t": "watch_state", "k": k, "v": json.dumps(v), "ts": ts}) + "\n")
+    st2 = _store(tmp_path)
+    assert st2.load("watch_state.json") == {"A": "committed", "C": "new"}
+    assert st2.snapshot()["replayed"] == 1
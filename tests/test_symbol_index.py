@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Reverse symbol index tests
+Source priority, watch-count ranking, ambiguous catalog symbols, and rebuilds when a
+source's version moves
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from symbol_index import SymbolIndex
+
+
+def test_priority_weight_and_rebuild():
+    overrides = {"MineBonk": "bonk"}
+    catalog = [("FakeBonk", "BONK"), ("RealBonk", "BONK"), ("Wif", "WIF")]
+    watched = {"RealBonk": 3}
+    idx = SymbolIndex(check_every=0)
+    idx.add_source("overrides", lambda: overrides.items(), lambda: len(overrides))
+    idx.add_source("jupiter", lambda: catalog)
+    idx.set_weight(lambda m: watched.get(m, 0))
+
+    assert idx.candidates("$bonk") == ["MineBonk", "RealBonk", "FakeBonk"]
+    assert idx.resolve("BONK", sources=("jupiter",)) == "RealBonk"
+    assert idx.resolve("wif") == "Wif" and idx.resolve("NOPE") is None
+
+    overrides["MineWif"] = "WIF"  # version moved: the overrides map is rebuilt
+    assert idx.resolve("WIF") == "MineWif"
+    assert idx.stats()["symbols"] == {"overrides": 2, "jupiter": 2}
+
+
+def test_background_source_keeps_serving_while_rebuilding():
+    rows = [("A1", "AAA")]
+    ver = [1]
+    idx = SymbolIndex(check_every=0)
+    idx.add_source("jupiter", lambda: list(rows), lambda: ver[0], background=True)
+    for _ in range(100):
+        if idx.resolve("AAA"):
+            break
+        time.sleep(0.01)
+    assert idx.resolve("AAA") == "A1"
+    rows[:] = [("A2", "AAA")]
+    ver[0] = 2
+    for _ in range(100):
+        if idx.resolve("AAA") == "A2":
+            break
+        time.sleep(0.01)
+    assert idx.resolve("AAA") == "A2"
+
+
+def test_unique_source_skips_ambiguous_symbols():
+    catalog = [("CopyA", "XYZ"), ("CopyB", "XYZ"), ("Solo", "SOLO"), ("CopyA", "ABC")]
+    idx = SymbolIndex(check_every=0)
+    idx.add_source("names", lambda: [("Known", "ABC")])
+    idx.add_source("jupiter", lambda: catalog, unique=True)
+    assert idx.resolve("XYZ") is None  # two catalog tokens share it: no guess
+    assert idx.resolve("solo") == "Solo" and idx.resolve("ABC") == "Known"
+    assert idx.stats()["ambiguous"] == 1
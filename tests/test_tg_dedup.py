@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Send dedup ring tests
+Window semantics, bucket recycling as the ring wraps, windows longer than the ring,
+sharing across processes
+"""
+
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tg_dedup import DedupRing
+
+
+def test_duplicate_within_window_only():
+    r = DedupRing(path=None, buckets=8, slots=16, bucket_ms=1000)
+    assert r.hit_and_mark(1, "hello", 3, now=100.0) is False
+    assert r.hit_and_mark(1, "hello", 3, now=102.5) is True
+    assert r.hit_and_mark(2, "hello", 3, now=102.5) is False  # other chat
+    assert r.hit_and_mark(1, "hello", 3, now=103.1) is False  # window passed: re-marked
+    assert r.hit_and_mark(1, "hello", 3, now=103.2) is True
+    s = r.snapshot()
+    assert s["checks"] == 5 and s["hits"] == 2 and not s["shared"]
+
+
+def test_wrapped_buckets_are_recycled_and_full_buckets_evict():
+    r = DedupRing(path=None, buckets=4, slots=8, bucket_ms=1000)
+    r.hit_and_mark(1, "old", 2, now=10.0)
+    r.hit_and_mark(1, "new", 2, now=14.0)  # same ring slot as t=10: cleared, not merged
+    assert r.snapshot()["expired_buckets"] == 1
+    assert r.hit_and_mark(1, "old", 60, now=14.1) is False  # span is capped by the ring
+    for i in range(20):
+        r.hit_and_mark(1, f"m{i}", 2, now=20.0)
+    assert r.snapshot()["overflows"] == 12
+    assert r.hit_and_mark(1, "m19", 2, now=20.5) is True
+
+
+def _child(path, q):
+    r = DedupRing(path=path, buckets=8, slots=16)
+    q.put(r.hit_and_mark(-100, "card", 5))
+
+
+def test_ring_file_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "ring")
+    r = DedupRing(path=path, buckets=8, slots=16)
+    assert r.shared and r.hit_and_mark(-100, "card", 5) is False
+    q = multiprocessing.get_context("fork").Queue()
+    p = multiprocessing.get_context("fork").Process(target=_child, args=(path, q))
+    p.start()
+    p.join(10)
+    assert q.get(timeout=5) is True
+
+
+def test_window_longer_than_span_warns_and_wide_buckets_cover_it(caplog):
+    r = DedupRing(path=None, buckets=4, slots=8, bucket_ms=1000)
+    assert r.max_window_s == 3
+    r.hit_and_mark(1, "x", 10, now=100.0)
+    assert "capped" in caplog.text
+    wide = DedupRing(path=None, buckets=64, slots=8, bucket_ms=-(-3600_000 // 63))
+    assert wide.hit_and_mark(1, "x", 3600, now=1000.0) is False
+    assert wide.hit_and_mark(1, "x", 3600, now=1000.0 + 3500) is True
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Telegram outbox tests
+Per-chat pacing, 429 retry_after re-queueing, bounded queue
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tg_outbox import Outbox, TokenBucket
+
+
+class FakeApi:
+    def __init__(self, flood=0):
+        self.calls = []
+        self.flood = flood  # first N calls answer 429
+        self.lock = threading.Lock()
+
+    def __call__(self, url, payload, timeout):
+        with self.lock:
+            self.calls.append((time.monotonic(), payload["chat_id"], payload["text"]))
+            if self.flood:
+                self.flood -= 1
+                return {"ok": False, "error_code": 429, "parameters": {"retry_after": 0.2}}
+        return {"ok": True, "result": {"message_id": len(self.calls)}}
+
+
+def test_token_bucket_burst_then_rate():
+    b = TokenBucket(rate=2, burst=2, now=0.0)
+    b.take(0.0)
+    b.take(0.0)
+    assert b.wait(0.0) == 0.5
+    assert b.wait(0.5) == 0.0
+    b.pause(3.0)
+    assert b.wait(1.0) == 2.0 and b.wait(3.0) == 0.0
+
+
+def test_per_chat_bucket_paces_one_chat_but_not_others():
+    api = FakeApi()
+    ob = Outbox(workers=2, chat_rate=10, chat_burst=1, post=api)
+    futs = [ob.submit({"chat_id": 1, "text": f"m{i}"}) for i in range(3)]
+    other = ob.submit({"chat_id": 2, "text": "x"})
+    assert other.result(1)["ok"]
+    assert all(f.result(2)["ok"] for f in futs)
+    t = [ts for ts, chat, _ in api.calls if chat == 1]
+    assert t[2] - t[0] >= 0.15  # 10/s with no burst
+    assert [txt for _, chat, txt in api.calls if chat == 1] == ["m0", "m1", "m2"]
+    snap = ob.snapshot()
+    assert snap["sent"] == 4 and snap["throttled"] >= 2 and snap["latency_p50_ms"] is not None
+
+
+def test_429_honours_retry_after_and_requeues():
+    api = FakeApi(flood=1)
+    ob = Outbox(workers=1, post=api)
+    t0 = time.monotonic()
+    res = ob.send({"chat_id": -100, "text": "hi"}, timeout=2)
+    assert res["ok"] and time.monotonic() - t0 >= 0.2
+    snap = ob.snapshot()
+    assert snap["rate_limited"] == 1 and snap["retries"] == 1 and len(api.calls) == 2
+
+
+def test_full_queue_drops_instead_of_blocking():
+    gate = threading.Event()
+    ob = Outbox(workers=1, max_queue=1, post=lambda *a: gate.wait(2) and {"ok": True})
+    ob.submit({"chat_id": 1, "text": "a"})
+    time.sleep(0.05)  # first one in flight
+    ob.submit({"chat_id": 2, "text": "b"})
+    assert ob.submit({"chat_id": 3, "text": "c"}).result(0)["description"] == "outbox full"
+    gate.set()
+    assert ob.snapshot()["dropped"] == 1
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Dry-run trade log tests
+Per-chat offset index, last-N reads, streaming iteration, legacy import, clear
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trade_log import TradeLog
+
+
+def test_index_and_last_rows(tmp_path):
+    log = TradeLog(str(tmp_path / "t.jsonl"))
+    for i in range(100):
+        log.append({"ts": i, "kind": "buy", "chat_id": i % 3})
+    assert log.count(1) == 33
+    assert [e["ts"] for e in log.latest(1, 3)] == [91, 94, 97]
+    other = TradeLog(str(tmp_path / "t.jsonl"))  # another worker appends
+    other.append({"ts": 100, "kind": "sell", "chat_id": 1})
+    assert log.latest(1, 1) == [{"ts": 100, "kind": "sell", "chat_id": 1}]
+    rows = log.iter_chat(2)
+    assert next(rows)["ts"] == 2  # lazy generator
+    assert sum(1 for _ in rows) == 32
+
+
+def test_legacy_import_and_clear(tmp_path):
+    legacy = tmp_path / "dry_trades_log.json"
+    legacy.write_text(json.dumps([{"ts": 1, "chat_id": 7}, {"ts": 2, "chat_id": 8}]))
+    log = TradeLog(str(tmp_path / "t.jsonl"), legacy_path=str(legacy))
+    assert log.latest(7) == [{"ts": 1, "chat_id": 7}]
+    reader = TradeLog(str(tmp_path / "t.jsonl"), legacy_path=str(legacy))
+    assert reader.count(8) == 1
+    log.clear()
+    assert reader.count(8) == 0 and log.latest(7) == []
+    log.append({"ts": 3, "chat_id": 8})
+    assert reader.latest(8) == [{"ts": 3, "chat_id": 8}]
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Trade store tests
+Append-only fill ledger, incremental positions, snapshot + tail replay, legacy migration
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import trade_store
+from trade_store import FillLedger
+
+
+def _fill(side, qty, price, mint="M"):
+    return {"side": side, "mint": mint, "symbol": "T", "qty": qty, "price": price, "ts": 1.0}
+
+
+def test_positions_are_incremental_and_replayed(tmp_path):
+    led = FillLedger(str(tmp_path / "f.jsonl"), str(tmp_path / "snap.json"), snapshot_every=3)
+    led.append(_fill("BUY", 100, 1.0))
+    led.append(_fill("BUY", 100, 2.0))
+    assert led.positions()["M"]["avg_price"] == 1.5
+    led.append(_fill("SELL", 50, 3.0))
+    assert led.positions()["M"]["qty"] == 150
+    snap = json.loads((tmp_path / "snap.json").read_text())
+    assert snap["fills"] == 3 and snap["offset"] == os.path.getsize(tmp_path / "f.jsonl")
+
+    led.append(_fill("BUY", 10, 1.0, mint="N"))
+    # a fresh process restores from the snapshot and replays only the tail
+    again = FillLedger(str(tmp_path / "f.jsonl"), str(tmp_path / "snap.json"), snapshot_every=3)
+    assert again.positions() == led.positions()
+    assert again.count() == 4
+    # appends by another process are folded in on the next read
+    again.append(_fill("SELL", 150, 1.0))
+    assert led.positions()["M"] == {**led.positions()["M"], "qty": 0.0, "avg_price": 0.0}
+    assert len(led.fills()) == 5
+
+
+def test_legacy_fills_move_to_ledger(tmp_path, monkeypatch):
+    legacy = {"max_sol": 0.5, "positions": {}, "fills": [_fill("BUY", 4, 2.0)], "pending": {}}
+    (tmp_path / "trades_state.json").write_text(json.dumps(legacy))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(trade_store, "_state_mtime", None)
+    monkeypatch.setattr(trade_store, "_migrated", False)
+    monkeypatch.setattr(trade_store, "_state", dict(trade_store._state))
+    monkeypatch.setattr(trade_store, "_LEDGER", FillLedger("fills.jsonl", "snap.json"))
+    st = trade_store.get_state()
+    assert st["max_sol"] == 0.5 and st["positions"]["M"]["qty"] == 4
+    assert "fills" not in json.loads((tmp_path / "trades_state.json").read_text())
+    trade_store.record_fill("SELL", "M", "T", 1, 3.0, 0.0)
+    assert trade_store.positions()["M"]["qty"] == 3
+    assert [f["side"] for f in trade_store.fills()] == ["BUY", "SELL"]
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Async watchlist engine tests (no network, httpx.MockTransport)
+Batched prices with DexScreener fallback, per-mint overview modes, deadline bound,
+shared cache tier kept off the event loop
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+import watchlist_engine
+from price_cache import TwoTierCache
+from provider_health import ProviderRouter
+
+
+def _engine(monkeypatch, handler):
+    monkeypatch.setenv("BIRDEYE_API_KEY", "k")
+    monkeypatch.setattr(watchlist_engine, "CACHE", TwoTierCache(shared=False))
+    monkeypatch.setattr(watchlist_engine, "ROUTER", ProviderRouter())
+    eng = watchlist_engine.WatchlistEngine()
+    eng._ensure_loop()
+    eng._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return eng
+
+
+def test_prices_batch_then_dex_fallback(monkeypatch):
+    mints = [f"M{i:03d}" for i in range(150)]
+    seen = []
+
+    def handler(req):
+        seen.append(req.url.path)
+        if "multi_price" in req.url.path:
+            asked = req.url.params["list_address"].split(",")
+            return httpx.Response(200, json={"data": {m: {"value": 1.0} for m in asked[:-1]}})
+        asked = req.url.path.rsplit("/", 1)[-1].split(",")
+        pairs = [{"baseToken": {"address": m}, "priceUsd": "2.0"} for m in asked]
+        return httpx.Response(200, json={"pairs": pairs})
+
+    got = _engine(monkeypatch, handler).fetch("prices", mints)
+    assert len(got) == 150
+    assert sorted(got.values()).count(2.0) == 2  # last mint of each 100-chunk came from dex
+    assert len(seen) == 3  # 2 multi_price chunks + 1 dex batch
+
+
+def test_overview_modes_and_deadline(monkeypatch):
+    async def handler(req):
+        if req.url.params.get("address") == "SLOW":
+            await asyncio.sleep(2)
+        return httpx.Response(
+            200,
+            json={"data": {"price": 2.0, "circulatingSupply": 10, "holder": 7, "v24hUSD": 5}},
+        )
+
+    eng = _engine(monkeypatch, handler)
+    t0 = time.monotonic()
+    got = eng.fetch("caps", ["A", "B", "SLOW"], deadline_s=0.5)
+    assert got == {"A": 20.0, "B": 20.0}
+    assert time.monotonic() - t0 < 1.0
+    assert eng.fetch("holders", ["A"]) == {"A": 7.0}  # overview reused from cache
+
+
+def test_shared_tier_is_batched_off_the_loop(monkeypatch, tmp_path):
+    def handler(req):
+        asked = req.url.params["list_address"].split(",")
+        return httpx.Response(200, json={"data": {m: {"value": 3.0} for m in asked}})
+
+    eng = _engine(monkeypatch, handler)
+    cache = TwoTierCache(path=str(tmp_path / "c.sqlite"))
+    monkeypatch.setattr(watchlist_engine, "CACHE", cache)
+    threads = []
+    put_many = cache.l2.put_many
+    monkeypatch.setattr(
+        cache.l2,
+        "put_many",
+        lambda items: threads.append(threading.current_thread().name) or put_many(items),
+    )
+    assert eng.fetch("prices", ["A", "B", "C"]) == {"A": 3.0, "B": 3.0, "C": 3.0}
+    assert len(threads) == 1 and threads[0] != "watchlist_engine"
+    other = TwoTierCache(path=str(tmp_path / "c.sqlite"))  # another worker
+    assert other.get(("wl", "prices", "B")) == 3.0
@@ -0,0 +1,185 @@
+# tg_dedup.py
+# Cross-worker duplicate-send check for tg_send: a time-bucketed hash ring in shared
+# memory (an mmapped file on /dev/shm, so no disk and no SQLite transaction).
+#
+#   header   "<4sIIII"  magic, version, buckets, slots per bucket, bucket width (ms)
+#   bucket   "<QI4x"    epoch (now_ms // width) the bucket holds, entries used
+#            then `slots` x "<QQ" (64-bit message key, sent-at ms), open addressing
+#            with a bounded probe run
+#
+# A check probes only the buckets whose epochs overlap the window; a mark inserts into
+# the current epoch's bucket. Expiry is amortised: the first writer to reach a bucket
+# that still holds an older epoch (the ring wrapped) clears it, once per bucket width,
+# whatever the clock second. Python has no atomic compare-and-swap on shared memory, so
+# check+mark runs under one short flock on the ring file (a syscall, no I/O).
+# If the file cannot be opened the ring lives in anonymous (per-process) memory.
+# The ring spans (buckets - 1) bucket widths; by default the width is sized so the
+# span covers TG_DEDUP_WINDOW_SEC. A longer window is capped at the span, with a warning.
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+HDR = struct.Struct("<4sIIII")
+BUCKET = struct.Struct("<QI4x")
+ENTRY = struct.Struct("<QQ")
+_MAGIC = b"TGDR"
+_VERSION = 1
+
+_DEFAULT_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else "/tmp"
+_PATH = os.environ.get("TG_DEDUP_SHM", os.path.join(_DEFAULT_DIR, "tg_dedup.ring"))
+_BUCKETS = int(os.environ.get("TG_DEDUP_BUCKETS", "64"))
+_SLOTS = int(os.environ.get("TG_DEDUP_SLOTS", "512"))
+_WINDOW_S = max(3.0, float(os.environ.get("TG_DEDUP_WINDOW_SEC", "3")))  # app.tg_send's window
+_BUCKET_MS = int(
+    os.environ.get("TG_DEDUP_BUCKET_MS")
+    or max(1000, -(-int(_WINDOW_S * 1000) // max(1, _BUCKETS - 1)))
+)
+_MAX_PROBE = 16  # bounded probe run per lookup, so a crowded bucket stays O(1)
+
+
+def message_key(chat_id, text: str) -> int:
+    """Nonzero 64-bit key for (chat, text)."""
+    h = hashlib.blake2b(f"{chat_id}\0{text}".encode(), digest_size=8).digest()
+    return int.from_bytes(h, "little") or 1
+
+
+class DedupRing:
+    def __init__(
+        self,
+        path: str | None = _PATH,
+        buckets: int = _BUCKETS,
+        slots: int = _SLOTS,
+        bucket_ms: int = _BUCKET_MS,
+    ):
+        self.buckets = max(2, int(buckets))
+        self.slots = max(8, int(slots))
+        self.bucket_ms = max(1, int(bucket_ms))
+        self._stride = BUCKET.size + self.slots * ENTRY.size
+        self._size = HDR.size + self.buckets * self._stride
+        self._lock = threading.Lock()
+        self._fd = None
+        self._mm = self._open(path)
+        self._stats = {"checks": 0, "hits": 0, "marks": 0, "expired_buckets": 0, "overflows": 0}
+        self._warned: set[int] = set()  # windows already reported as longer than the span
+
+    def _open(self, path):
+        want = HDR.pack(_MAGIC, _VERSION, self.buckets, self.slots, self.bucket_ms)
+        if path:
+            try:
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    if os.fstat(fd).st_size != self._size or os.pread(fd, HDR.size, 0) != want:
+                        # new file, or another geometry: start over (zeros = empty ring)
+                        os.ftruncate(fd, 0)
+                        os.ftruncate(fd, self._size)
+                        os.pwrite(fd, want, 0)
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                self._fd = fd
+                return mmap.mmap(fd, self._size)
+            except OSError as e:
+                log.warning("tg_dedup: %s unavailable (%s); using process-local memory", path, e)
+        mm = mmap.mmap(-1, self._size)
+        mm[: HDR.size] = want
+        return mm
+
+    @property
+    def shared(self) -> bool:
+        return self._fd is not None
+
+    @property
+    def max_window_s(self) -> float:
+        """Longest window a check can look back over."""
+        return (self.buckets - 1) * self.bucket_ms / 1000.0
+
+    # -- ring ------------------------------------------------------------------
+    def _base(self, epoch: int) -> int:
+        return HDR.size + (epoch % self.buckets) * self._stride
+
+    def _find(self, base: int, key: int) -> tuple[int, int]:
+        """(slot offset, sent-at ms) of key in the bucket, or (first free offset, -1)."""
+        start = key % self.slots
+        for n in range(min(self.slots, _MAX_PROBE)):
+            off = base + BUCKET.size + ((start + n) % self.slots) * ENTRY.size
+            k, ts = ENTRY.unpack_from(self._mm, off)
+            if k == key:
+                return off, ts
+            if k == 0:
+                return off, -1
+        return base + BUCKET.size + start * ENTRY.size, -1  # crowded: evict the home slot
+
+    def _hit(self, key: int, now_ms: int, window_ms: int) -> bool:
+        cur = now_ms // self.bucket_ms
+        span = min(self.buckets - 1, -(-window_ms // self.bucket_ms))
+        for epoch in range(cur, cur - span - 1, -1):
+            base = self._base(epoch)
+            if BUCKET.unpack_from(self._mm, base)[0] != epoch:
+                continue
+            _, ts = self._find(base, key)
+            if ts >= 0 and now_ms - ts < window_ms:
+                return True
+        return False
+
+    def _mark(self, key: int, now_ms: int):
+        epoch = now_ms // self.bucket_ms
+        base = self._base(epoch)
+        held, used = BUCKET.unpack_from(self._mm, base)
+        if held != epoch:  # amortised expiry: this slot of the ring wrapped
+            self._mm[base : base + self._stride] = bytes(self._stride)
+            used = 0
+            self._stats["expired_buckets"] += int(held != 0)
+        off, _ = self._find(base, key)
+        held_key = ENTRY.unpack_from(self._mm, off)[0]
+        if held_key == 0:
+            used += 1
+        elif held_key != key:
+            self._stats["overflows"] += 1  # crowded probe run: evicted another message
+        ENTRY.pack_into(self._mm, off, key, now_ms)
+        BUCKET.pack_into(self._mm, base, epoch, used)
+
+    def hit_and_mark(self, chat_id, text: str, window_s: float, now: float | None = None) -> bool:
+        """True if (chat, text) was marked within window_s; otherwise mark it now."""
+        key = message_key(chat_id, text)
+        now_ms = int((time.time() if now is None else now) * 1000)
+        window_ms = int(window_s * 1000)
+        if window_ms > (self.buckets - 1) * self.bucket_ms and window_ms not in self._warned:
+            self._warned.add(window_ms)
+            log.warning(
+                "tg_dedup: window %.0fs is longer than the ring span %.0fs and is capped; "
+                "raise TG_DEDUP_BUCKETS or TG_DEDUP_BUCKET_MS",
+                window_s,
+                self.max_window_s,
+            )
+        with self._lock:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                self._stats["checks"] += 1
+                if self._hit(key, now_ms, window_ms):
+                    self._stats["hits"] += 1
+                    return True
+                self._mark(key, now_ms)
+                self._stats["marks"] += 1
+                return False
+            finally:
+                if self._fd is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        out["shared"] = self.shared
+        out["span_s"] = self.max_window_s
+        return out
+
+
+# process-wide ring behind app.tg_send
+RING = DedupRing()
@@ -0,0 +1,301 @@
+# tg_outbox.py
+# Outbound Telegram dispatcher. Bot API sends are queued and posted by a few worker
+# threads over one pooled keep-alive requests.Session instead of inline on the
+# ticker / webhook thread that produced them. Sends are paced to Telegram's limits:
+#   - a global bucket (~30 messages/s per bot)
+#   - one bucket per chat: 1/s with a small burst in private chats, 20/min in groups
+#     (negative chat ids)
+# A 429 pauses the chat's bucket for parameters.retry_after and re-queues the message
+# (up to `max_retries` times). Messages that are not due yet wait in a heap ordered by
+# due time, so one throttled chat never blocks a worker.
+# submit() returns a Future resolving to the Bot API's JSON ({"ok": False, ...} on
+# transport errors); send() waits for it. snapshot() has queue depth and latencies.
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger(__name__)
+
+_WORKERS = int(os.environ.get("TG_OUTBOX_WORKERS", "4"))
+_MAX_QUEUE = int(os.environ.get("TG_OUTBOX_QUEUE", "1000"))
+_GLOBAL_RATE = float(os.environ.get("TG_GLOBAL_RATE", "30"))  # msgs/s
+_CHAT_RATE = float(os.environ.get("TG_CHAT_RATE", "1"))  # msgs/s, private chats
+_GROUP_PER_MIN = float(os.environ.get("TG_GROUP_PER_MIN", "20"))
+_CHAT_BURST = float(os.environ.get("TG_CHAT_BURST", "3"))
+_MAX_RETRIES = int(os.environ.get("TG_OUTBOX_RETRIES", "3"))
+_API = "https://api.telegram.org/bot{token}/{method}"
+_SAMPLES = 512
+
+
+class TokenBucket:
+    """`rate` tokens/s up to `burst` (monotonic clock)."""
+
+    __slots__ = ("rate", "burst", "tokens", "ts", "paused_until")
+
+    def __init__(self, rate: float, burst: float, now: float | None = None):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.ts = time.monotonic() if now is None else now
+        self.paused_until = 0.0
+
+    def _fill(self, now: float):
+        if now > self.ts:
+            self.tokens = min(self.burst, self.tokens + (now - self.ts) * self.rate)
+            self.ts = now
+
+    def wait(self, now: float) -> float:
+        """Seconds until a token is available (0 when one is)."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._fill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._fill(now)
+        self.tokens -= 1
+
+    def pause(self, until: float):
+        """Nothing before `until`; then one token, refilling at `rate` from there."""
+        self.paused_until = max(self.paused_until, until)
+        self.tokens = 1.0
+        self.ts = max(self.ts, until)
+
+    def idle(self, now: float) -> bool:
+        self._fill(now)
+        return now >= self.paused_until and self.tokens >= self.burst
+
+
+class _Job:
+    __slots__ = ("chat_id", "method", "payload", "token", "future", "enq", "attempts")
+
+    def __init__(self, chat_id, method, payload, token, enq):
+        self.chat_id = chat_id
+        self.method = method
+        self.payload = payload
+        self.token = token
+        self.future: Future = Future()
+        self.enq = enq
+        self.attempts = 0
+
+
+def _chat_key(chat_id):
+    try:
+        return int(chat_id)
+    except (TypeError, ValueError):
+        return str(chat_id)
+
+
+class Outbox:
+    def __init__(
+        self,
+        workers: int = _WORKERS,
+        max_queue: int = _MAX_QUEUE,
+        global_rate: float = _GLOBAL_RATE,
+        chat_rate: float = _CHAT_RATE,
+        group_per_min: float = _GROUP_PER_MIN,
+        chat_burst: float = _CHAT_BURST,
+        max_retries: int = _MAX_RETRIES,
+        post=None,
+        name: str = "tg-outbox",
+    ):
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self.chat_rate = chat_rate
+        self.group_rate = group_per_min / 60.0
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.name = name
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: dict = {}
+        self._heap: list = []  # (due, seq, job)
+        self._seq = itertools.count()
+        self._cv = threading.Condition()
+        self._started = False
+        self._inflight = 0
+        self._session = None
+        self._post = post or self._session_post
+        self._lat = deque(maxlen=_SAMPLES)  # enqueue -> response, ms
+        self._send_ms = deque(maxlen=_SAMPLES)  # HTTP round trip, ms
+        self._stats = {
+            "queued": 0,
+            "sent": 0,
+            "failed": 0,  # Bot API answered ok=false
+            "errors": 0,  # transport errors / non-JSON answers
+            "rate_limited": 0,  # 429s seen
+            "retries": 0,
+            "dropped": 0,  # queue full
+            "cancelled": 0,
+            "throttled": 0,  # deferred by a bucket
+            "max_queue_depth": 0,
+        }
+
+    # -- transport -------------------------------------------------------------
+    def _session_post(self, url: str, payload: dict, timeout: float):
+        if self._session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+            s.mount("https://", adapter)
+            self._session = s
+        r = self._session.post(url, json=payload, timeout=timeout)
+        try:
+            j = r.json()
+        except ValueError:
+            j = None
+        if not isinstance(j, dict):
+            j = {"ok": False, "error_code": r.status_code, "description": r.text[:160]}
+        return j
+
+    # -- buckets ---------------------------------------------------------------
+    def _bucket(self, chat_id, now: float) -> TokenBucket:
+        b = self._chats.get(chat_id)
+        if b is None:
+            if len(self._chats) > 4096:
+                for k in [k for k, v in self._chats.items() if v.idle(now)]:
+                    del self._chats[k]
+            group = isinstance(chat_id, int) and chat_id < 0
+            rate = self.group_rate if group else self.chat_rate
+            b = self._chats[chat_id] = TokenBucket(rate, self.chat_burst, now)
+        return b
+
+    # -- queue -----------------------------------------------------------------
+    def _start(self):
+        with self._cv:
+            if self._started:
+                return
+            self._started = True
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, daemon=True, name=f"{self.name}-{i}").start()
+
+    def submit(self, payload: dict, method: str = "sendMessage", token: str | None = None):
+        """Queue one Bot API call; the Future resolves to Telegram's JSON answer."""
+        token = token or os.environ.get("TELEGRAM_BOT_TOKEN", "")
+        job = _Job(_chat_key(payload.get("chat_id")), method, payload, token, time.monotonic())
+        with self._cv:
+            if len(self._heap) >= self.max_queue:
+                self._stats["dropped"] += 1
+                job.future.set_result({"ok": False, "description": "outbox full"})
+                return job.future
+            heapq.heappush(self._heap, (job.enq, next(self._seq), job))
+            self._stats["queued"] += 1
+            if len(self._heap) > self._stats["max_queue_depth"]:
+                self._stats["max_queue_depth"] = len(self._heap)
+            self._cv.notify()
+        self._start()
+        return job.future
+
+    def send(self, payload: dict, method: str = "sendMessage", token=None, timeout: float = 30):
+        """submit() and wait; a message still queued after `timeout` is cancelled."""
+        fut = self.submit(payload, method, token)
+        try:
+            return fut.result(timeout)
+        except Exception:
+            if fut.cancel():
+                with self._cv:
+                    self._stats["cancelled"] += 1
+            return {"ok": False, "description": "outbox timeout"}
+
+    def _next(self) -> _Job:
+        """Block until a job is due and both its buckets have a token."""
+        with self._cv:
+            while True:
+                now = time.monotonic()
+                if not self._heap:
+                    self._cv.wait()
+                    continue
+                due, _, job = self._heap[0]
+                if due > now:
+                    self._cv.wait(due - now)
+                    continue
+                heapq.heappop(self._heap)
+                if job.future.cancelled():
+                    continue
+                chat = self._bucket(job.chat_id, now)
+                delay = max(self._global.wait(now), chat.wait(now))
+                if delay > 0:
+                    self._stats["throttled"] += 1
+                    heapq.heappush(self._heap, (now + delay, next(self._seq), job))
+                    continue
+                self._global.take(now)
+                chat.take(now)
+                self._inflight += 1
+                return job
+
+    def _worker(self):
+        while True:
+            job = self._next()
+            try:
+                self._deliver(job)
+            except Exception as e:  # never let one message kill the worker
+                log.warning("tg_outbox: %s failed: %s", job.method, e)
+                if not job.future.done():
+                    job.future.set_result({"ok": False, "description": str(e)})
+            finally:
+                with self._cv:
+                    self._inflight -= 1
+
+    def _deliver(self, job: _Job):
+        if job.attempts == 0 and not job.future.set_running_or_notify_cancel():
+            return
+        job.attempts += 1
+        url = _API.format(token=job.token, method=job.method)
+        t0 = time.monotonic()
+        outcome = "sent"
+        try:
+            res = self._post(url, job.payload, 15)
+        except Exception as e:
+            res = {"ok": False, "description": f"{type(e).__name__}: {e}"}
+            outcome = "errors"
+        now = time.monotonic()
+        if res.get("error_code") == 429:
+            retry_after = float((res.get("parameters") or {}).get("retry_after") or 1)
+            with self._cv:
+                self._stats["rate_limited"] += 1
+                self._bucket(job.chat_id, now).pause(now + retry_after)
+                if job.attempts <= self.max_retries:
+                    self._stats["retries"] += 1
+                    heapq.heappush(self._heap, (now + retry_after, next(self._seq), job))
+                    self._cv.notify()
+                    return
+        with self._cv:
+            self._send_ms.append((now - t0) * 1000.0)
+            self._lat.append((now - job.enq) * 1000.0)
+            if outcome == "sent" and not res.get("ok"):
+                outcome = "failed"
+            self._stats[outcome] += 1
+        job.future.set_result(res)
+
+    # -- metrics ---------------------------------------------------------------
+    @staticmethod
+    def _pct(xs, q: float):
+        if not xs:
+            return None
+        xs = sorted(xs)
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+    def snapshot(self) -> dict:
+        with self._cv:
+            out = dict(self._stats)
+            out["queue_depth"] = len(self._heap)
+            out["inflight"] = self._inflight
+            out["chats"] = len(self._chats)
+            now = time.monotonic()
+            out["paused_chats"] = sum(1 for b in self._chats.values() if now < b.paused_until)
+            lat, send_ms = list(self._lat), list(self._send_ms)
+        out["workers"] = self.workers
+        out["latency_p50_ms"] = self._pct(lat, 0.5)
+        out["latency_p95_ms"] = self._pct(lat, 0.95)
+        out["send_avg_ms"] = sum(send_ms) / len(send_ms) if send_ms else None
+        return out
+
+
+# process-wide dispatcher behind tg_send / alerts_send / send_admin_md
+OUTBOX = Outbox()
@@ -0,0 +1,117 @@
+# trade_log.py
+# Append-only dry-run trade log: one JSON object per line (dry_trades_log.jsonl).
+# A per-chat index of line offsets is built by one scan on first use and then extended
+# from the tail as the file grows (appends from other workers included), so /trades
+# seeks straight to a chat's last N rows and /trades_csv streams rows from disk.
+# The legacy dry_trades_log.json (one JSON array rewritten per trade) is imported once.
+import json
+import os
+import threading
+from array import array
+from collections.abc import Iterator
+
+
+class TradeLog:
+    def __init__(self, path: str, legacy_path: str | None = None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._index: dict[str, array] = {}  # str(chat_id) -> line offsets
+        self._offset = 0  # bytes indexed so far
+        self._ino = None
+        self._migrated = False
+
+    def _migrate(self):
+        """Import the legacy JSON array once (only while the JSONL log does not exist)."""
+        self._migrated = True
+        if not self.legacy_path or os.path.exists(self.path):
+            return
+        try:
+            with open(self.legacy_path, encoding="utf-8") as f:
+                rows = json.load(f) or []
+        except (OSError, ValueError):
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for e in rows:
+                if isinstance(e, dict):
+                    f.write(json.dumps(e) + "\n")
+        try:
+            os.link(tmp, self.path)  # no-clobber: another worker may have migrated first
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp)
+
+    def _catch_up(self):
+        if not self._migrated:
+            self._migrate()
+        try:
+            st = os.stat(self.path)
+            size, ino = st.st_size, st.st_ino
+        except OSError:
+            size, ino = 0, None
+        if ino != self._ino or size < self._offset:  # cleared/replaced: rebuild
+            self._index.clear()
+            self._offset = 0
+            self._ino = ino
+        if size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partial append in progress
+                try:
+                    key = str(json.loads(line).get("chat_id"))
+                except (ValueError, AttributeError):
+                    key = None
+                if key is not None:
+                    self._index.setdefault(key, array("q")).append(self._offset)
+                self._offset += len(line)
+
+    def append(self, entry: dict):
+        line = (json.dumps(entry) + "\n").encode()
+        with self._lock:
+            if not self._migrated:
+                self._migrate()
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+
+    def count(self, chat_id) -> int:
+        with self._lock:
+            self._catch_up()
+            return len(self._index.get(str(chat_id), ()))
+
+    def iter_chat(self, chat_id, limit: int | None = None) -> Iterator[dict]:
+        """A chat's rows in log order (only the last `limit` when given), read lazily."""
+        with self._lock:
+            self._catch_up()
+            offs = self._index.get(str(chat_id), array("q"))
+            offs = offs[-limit:] if limit else offs[:]
+        if not offs:
+            return
+        with open(self.path, "rb") as f:
+            for off in offs:
+                f.seek(off)
+                try:
+                    yield json.loads(f.readline())
+                except ValueError:
+                    continue
+
+    def latest(self, chat_id, limit: int = 5) -> list[dict]:
+        return list(self.iter_chat(chat_id, max(1, limit)))
+
+    def clear(self):
+        with self._lock:
+            self._migrated = True
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8"):
+                pass
+            os.replace(tmp, self.path)  # new inode: other workers' indexes rebuild
+            self._index.clear()
+            self._offset = 0
+            self._ino = None
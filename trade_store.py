@@ -1,36 +1,189 @@
 # trade_store.py
+# Trading settings (live flag, caps, pending confirmations) live in trades_state.json.
+# Fills go to an append-only ledger (trades_fills.jsonl, one JSON object per line) and
+# positions are an in-memory index updated incrementally per fill. At startup the index
+# is restored from the last snapshot (trades_positions.snapshot.json: positions + the
+# ledger offset they cover) and the ledger tail after that offset is replayed; a new
+# snapshot is written every _SNAPSHOT_EVERY fills so the replay stays bounded.
+# Appends by other processes are picked up by replaying from our offset when the ledger
+# has grown.
 import json
 import os
+import threading
 import time
 import uuid
 
 _PATH = "trades_state.json"
+_LEDGER_PATH = os.environ.get("TRADES_LEDGER_PATH", "trades_fills.jsonl")
+_SNAPSHOT_PATH = os.environ.get("TRADES_SNAPSHOT_PATH", "trades_positions.snapshot.json")
+_SNAPSHOT_EVERY = int(os.environ.get("TRADES_SNAPSHOT_EVERY", "500"))
+
 _state = {
     "enabled_live": False,  # stays False until you flip it
     "max_sol": 1.0,  # per order safety cap
     "slippage_bps": 100,  # 1% default
-    "positions": {},  # {mint: {"mint":..., "symbol":..., "qty": float, "avg_price": float, "last_update": ts}}
-    "fills": [],  # list of {id, side, mint, symbol, qty, price, sol_cost, ts}
     "pending": {},  # {confirm_id: {"ts":..., "action":{...}}}
 }
+_state_mtime = None
+
+
+def _apply(positions: dict, f: dict):
+    """Fold one fill into the positions index (weighted average price on buys)."""
+    mint, qty, price = f["mint"], float(f["qty"]), float(f["price"])
+    pos = positions.get(
+        mint,
+        {"mint": mint, "symbol": f.get("symbol"), "qty": 0.0, "avg_price": 0.0, "last_update": 0},
+    )
+    if f["side"] == "BUY":
+        new_qty = pos["qty"] + qty
+        pos["avg_price"] = (
+            ((pos["avg_price"] * pos["qty"]) + (price * qty)) / new_qty if new_qty > 0 else 0.0
+        )
+        pos["qty"] = new_qty
+    else:  # SELL
+        pos["qty"] = max(0.0, pos["qty"] - qty)
+        if pos["qty"] == 0.0:
+            pos["avg_price"] = 0.0
+    pos["last_update"] = f.get("ts") or time.time()
+    positions[mint] = pos
+
+
+def _write_json_atomic(path: str, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(data, fh)
+    os.replace(tmp, path)
+
+
+class FillLedger:
+    def __init__(self, path: str, snapshot_path: str, snapshot_every: int = _SNAPSHOT_EVERY):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.snapshot_every = max(1, int(snapshot_every))
+        self._lock = threading.Lock()
+        self._positions: dict[str, dict] | None = None  # None until first use
+        self._offset = 0  # ledger bytes folded into _positions
+        self._count = 0  # fills folded into _positions
+        self._since_snapshot = 0
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path) as fh:
+                snap = json.load(fh)
+            size = os.path.getsize(self.path)
+            if int(snap["offset"]) <= size:
+                return snap["positions"], int(snap["offset"]), int(snap["fills"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return {}, 0, 0
+
+    def _catch_up(self):
+        """Restore on first use, then fold any lines appended since our offset."""
+        if self._positions is None:
+            self._positions, self._offset, self._count = self._load_snapshot()
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size <= self._offset:
+            return
+        with open(self.path, "rb") as fh:
+            fh.seek(self._offset)
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break  # another process is mid-append
+                self._offset += len(line)
+                try:
+                    _apply(self._positions, json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    continue
+                self._count += 1
+                self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self._snapshot()
+
+    def _snapshot(self):
+        _write_json_atomic(
+            self.snapshot_path,
+            {"offset": self._offset, "fills": self._count, "positions": self._positions},
+        )
+        self._since_snapshot = 0
+
+    def append(self, fill: dict):
+        line = (json.dumps(fill) + "\n").encode()
+        with self._lock:
+            self._catch_up()
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+            # fold it (and anything another process appended before it) via the ledger
+            self._catch_up()
+
+    def positions(self) -> dict[str, dict]:
+        with self._lock:
+            self._catch_up()
+            return self._positions
+
+    def count(self) -> int:
+        with self._lock:
+            self._catch_up()
+            return self._count
+
+    def fills(self) -> list[dict]:
+        out = []
+        try:
+            with open(self.path, "rb") as fh:
+                for line in fh:
+                    if line.endswith(b"\n"):
+                        try:
+                            out.append(json.loads(line))
+                        except ValueError:
+                            continue
+        except FileNotFoundError:
+            pass
+        return out
+
+
+_LEDGER = FillLedger(_LEDGER_PATH, _SNAPSHOT_PATH)
+_migrated = False
 
 
 def _load():
-    global _state
-    if os.path.exists(_PATH):
+    """Reload settings when trades_state.json changed; move legacy fills to the ledger once."""
+    global _state_mtime, _migrated
+    try:
+        mtime = os.stat(_PATH).st_mtime_ns
+    except OSError:
+        return
+    if mtime != _state_mtime:
         try:
-            _state.update(json.load(open(_PATH)))
+            with open(_PATH) as fh:
+                data = json.load(fh)
         except Exception:
-            pass
+            return
+        legacy = data.pop("fills", None)
+        data.pop("positions", None)
+        _state.update(data)
+        _state_mtime = mtime
+        if legacy is not None and not _migrated:
+            _migrated = True
+            if not os.path.exists(_LEDGER.path):
+                for f in legacy:
+                    _LEDGER.append(f)
+            _save()  # drop fills/positions from the settings file
 
 
 def _save():
-    json.dump(_state, open(_PATH, "w"))
+    global _state_mtime
+    _write_json_atomic(_PATH, _state)
+    _state_mtime = os.stat(_PATH).st_mtime_ns
 
 
 def get_state() -> dict:
     _load()
-    return _state
+    return {**_state, "positions": _LEDGER.positions()}
 
 
 def set_live(enabled: bool):
@@ -69,7 +222,7 @@ def pop_pending(cid: str):
 
 def positions() -> dict[str, dict]:
     _load()
-    return _state["positions"]
+    return _LEDGER.positions()
 
 
 def get_all_positions() -> dict[str, dict]:
@@ -79,12 +232,12 @@ def get_all_positions() -> dict[str, dict]:
 
 def fills() -> list[dict]:
     _load()
-    return list(_state["fills"])
+    return _LEDGER.fills()
 
 
 def record_fill(side: str, mint: str, symbol: str, qty: float, price: float, sol_cost: float):
     _load()
-    _state["fills"].append(
+    _LEDGER.append(
         {
             "id": uuid.uuid4().hex[:8],
             "side": side,
@@ -96,20 +249,3 @@ def record_fill(side: str, mint: str, symbol: str, qty: float, price: float, sol
             "ts": time.time(),
         }
     )
-    # update position
-    pos = _state["positions"].get(
-        mint, {"mint": mint, "symbol": symbol, "qty": 0.0, "avg_price": 0.0, "last_update": 0}
-    )
-    if side == "BUY":
-        new_qty = pos["qty"] + qty
-        pos["avg_price"] = (
-            ((pos["avg_price"] * pos["qty"]) + (price * qty)) / new_qty if new_qty > 0 else 0.0
-        )
-        pos["qty"] = new_qty
-    else:  # SELL
-        pos["qty"] = max(0.0, pos["qty"] - qty)
-        if pos["qty"] == 0.0:
-            pos["avg_price"] = 0.0
-    pos["last_update"] = time.time()
-    _state["positions"][mint] = pos
-    _save()
@@ -0,0 +1,363 @@
+# watchlist_engine.py
+# Asyncio stat engine behind the /watchlist modes (prices, supply, fdv, caps, volumes, holders).
+#   - one event-loop thread owns a pooled httpx.AsyncClient shared by every caller
+#   - one semaphore per upstream host caps concurrency across all in-flight watchlists
+#   - a single deadline per request (semaphore wait + HTTP) instead of nested watchdogs
+#   - results stream back per mint as they resolve; whatever misses the deadline is "?"
+# Sources match the single-token commands: Birdeye token_overview / multi_price first,
+# DexScreener /tokens (batched) for the fields it carries.
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from price_cache import CACHE
+from provider_health import ROUTER
+
+log = logging.getLogger(__name__)
+
+BIRDEYE_API = "https://public-api.birdeye.so"
+DEX_TOKENS_URL = "https://api.dexscreener.com/latest/dex/tokens/"
+
+_HOST_LIMITS = {
+    "public-api.birdeye.so": int(os.environ.get("WL_BIRDEYE_CONCURRENCY", "8")),
+    "api.dexscreener.com": int(os.environ.get("WL_DEX_CONCURRENCY", "4")),
+}
+_DEFAULT_HOST_LIMIT = 4
+_REQUEST_TIMEOUT_S = float(os.environ.get("WL_REQUEST_TIMEOUT", "5"))
+DEADLINE_S = float(os.environ.get("WATCHLIST_DEADLINE", "8"))
+_CACHE_TTL_S = 60  # same freshness as the old ttl_cache(60) getters
+_BIRDEYE_MULTI_CHUNK = 100
+_DEX_CHUNK = 30
+
+MODES = ("prices", "supply", "fdv", "caps", "volumes", "holders")
+
+_DONE = object()
+
+
+def _num(v):
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return None
+    return f if f == f and f not in (float("inf"), float("-inf")) else None
+
+
+def _first(d: dict, *keys):
+    for k in keys:
+        v = _num(d.get(k))
+        if v is not None:
+            return v
+    return None
+
+
+def _overview_stats(d: dict) -> dict:
+    """Normalise a Birdeye token_overview payload into the fields the modes use."""
+    return {
+        "price": _first(d, "price", "value", "priceUsd"),
+        "circ": _first(d, "circulatingSupply", "circulating_supply", "circulating"),
+        "total": _first(d, "totalSupply", "total_supply", "supply"),
+        "fdv": _first(d, "fdv", "fullyDilutedValuation", "fully_diluted_valuation"),
+        "mc": _first(d, "mc", "marketCap", "market_cap", "marketcap", "realMc"),
+        "holders": _first(d, "holder", "holders", "holders_count", "holderCount"),
+        "v24": _first(d, "v24hUSD", "v24USD", "volume24hUSD", "v24h", "v24"),
+    }
+
+
+def _mode_value(mode: str, st: dict):
+    """The raw number a mode shows, derived the same way stat_for() does."""
+    px = st.get("price")
+    if mode == "prices":
+        return px
+    if mode == "supply":
+        return st.get("circ") or st.get("total")
+    if mode == "holders":
+        return st.get("holders")
+    if mode == "volumes":
+        return st.get("v24")
+    if mode == "fdv":
+        if st.get("fdv"):
+            return st["fdv"]
+        tot = st.get("total") or st.get("circ")
+        return px * tot if px and tot else None
+    if mode == "caps":
+        if px and st.get("circ"):
+            return px * st["circ"]
+        return st.get("mc")
+    return None
+
+
+class WatchlistEngine:
+    def __init__(self, host_limits: dict | None = None):
+        self._host_limits = dict(_HOST_LIMITS, **(host_limits or {}))
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._sems: dict[str, asyncio.Semaphore] = {}
+        self.stats = {"runs": 0, "requests": 0, "errors": 0, "deadline_misses": 0, "cache_hits": 0}
+
+    # -- loop / client -----------------------------------------------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or not self._loop.is_running():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                threading.Thread(target=run, daemon=True, name="watchlist_engine").start()
+                ready.wait(5)
+                self._loop = loop
+                self._client = None
+                self._sems = {}
+            return self._loop
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            total = sum(self._host_limits.values()) + _DEFAULT_HOST_LIMIT
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=total, max_keepalive_connections=total),
+                headers={"Accept": "application/json", "User-Agent": "fetch-bot/1.0"},
+            )
+        return self._client
+
+    def _sem(self, host: str) -> asyncio.Semaphore:
+        sem = self._sems.get(host)
+        if sem is None:
+            sem = self._sems[host] = asyncio.Semaphore(
+                self._host_limits.get(host, _DEFAULT_HOST_LIMIT)
+            )
+        return sem
+
+    # -- one request, one deadline ------------------------------------------
+    async def _get_json(self, provider, endpoint, url, end, params=None, headers=None):
+        loop = asyncio.get_running_loop()
+        if not ROUTER.allow(provider, endpoint):
+            return None
+        sem = self._sem(urlsplit(url).hostname or "")
+        left = end - loop.time()
+        if left <= 0:
+            return None
+        try:
+            await asyncio.wait_for(sem.acquire(), left)
+        except asyncio.TimeoutError:
+            return None
+        t0 = time.time()
+        try:
+            left = end - loop.time()
+            if left <= 0:
+                return None
+            self.stats["requests"] += 1
+            r = await self._http().get(
+                url, params=params, headers=headers, timeout=min(_REQUEST_TIMEOUT_S, left)
+            )
+            ROUTER.record(provider, endpoint, r.status_code == 200, time.time() - t0, r.status_code)
+            if r.status_code != 200:
+                return None
+            return r.json()
+        except Exception as e:
+            self.stats["errors"] += 1
+            ROUTER.record(provider, endpoint, False, time.time() - t0)
+            log.debug("watchlist_engine %s %s failed: %s", provider, endpoint, e)
+            return None
+        finally:
+            sem.release()
+
+    # -- sources --------------------------------------------------------------
+    def _birdeye_headers(self):
+        key = os.getenv("BIRDEYE_API_KEY", "").strip()
+        return {"X-API-KEY": key, "X-Chain": "solana"} if key else None
+
+    async def _birdeye_prices(self, mints, end) -> dict:
+        headers = self._birdeye_headers()
+        if not headers:
+            return {}
+        chunks = [
+            mints[i : i + _BIRDEYE_MULTI_CHUNK] for i in range(0, len(mints), _BIRDEYE_MULTI_CHUNK)
+        ]
+        out = {}
+        for j in await asyncio.gather(
+            *(
+                self._get_json(
+                    "birdeye",
+                    "/defi/multi_price",
+                    f"{BIRDEYE_API}/defi/multi_price",
+                    end,
+                    params={"chain": "solana", "list_address": ",".join(c)},
+                    headers=headers,
+                )
+                for c in chunks
+            )
+        ):
+            data = (j or {}).get("data") or {}
+            for m, node in data.items() if isinstance(data, dict) else ():
+                px = _num((node or {}).get("value")) if isinstance(node, dict) else None
+                if px and px > 0:
+                    out[m] = px
+        return out
+
+    async def _birdeye_overview(self, mint, end) -> dict | None:
+        headers = self._birdeye_headers()
+        if not headers:
+            return None
+        j = await self._get_json(
+            "birdeye",
+            "/defi/token_overview",
+            f"{BIRDEYE_API}/defi/token_overview",
+            end,
+            params={"chain": "solana", "address": mint},
+            headers=headers,
+        )
+        d = (j or {}).get("data")
+        return _overview_stats(d) if isinstance(d, dict) else None
+
+    async def _dex_stats(self, mints, end) -> dict:
+        """Batched DexScreener lookup: price/fdv/mc from the deepest pair, volume summed."""
+        chunks = [mints[i : i + _DEX_CHUNK] for i in range(0, len(mints), _DEX_CHUNK)]
+        out: dict[str, dict] = {}
+        best_liq: dict[str, float] = {}
+        for j in await asyncio.gather(
+            *(self._get_json("dex", "/tokens", DEX_TOKENS_URL + ",".join(c), end) for c in chunks)
+        ):
+            for p in (j or {}).get("pairs") or []:
+                m = ((p or {}).get("baseToken") or {}).get("address")
+                if not m:
+                    continue
+                st = out.setdefault(m, {"v24": 0.0})
+                st["v24"] += _num((p.get("volume") or {}).get("h24")) or 0.0
+                liq = _num((p.get("liquidity") or {}).get("usd")) or 0.0
+                if liq >= best_liq.get(m, -1.0):
+                    best_liq[m] = liq
+                    st.update(
+                        price=_num(p.get("priceUsd")),
+                        fdv=_num(p.get("fdv")),
+                        mc=_num(p.get("marketCap")),
+                    )
+        return out
+
+    # -- a run ------------------------------------------------------------------
+    def _from_cache(self, mode: str, mints: list[str], emit) -> list[str]:
+        """Emit L1 hits; returns the mints still to fetch."""
+        todo = []
+        for m in mints:
+            val = CACHE.peek(("wl", mode, m))
+            if val is not None:
+                self.stats["cache_hits"] += 1
+                emit((m, val))
+            else:
+                todo.append(m)
+        return todo
+
+    async def _run(self, mode: str, mints: list[str], emit, deadline_s: float):
+        # Only L1 is touched on the loop; the shared SQLite tier is read once and
+        # written once per run, both in an executor.
+        loop = asyncio.get_running_loop()
+        end = loop.time() + deadline_s
+        todo = self._from_cache(mode, mints, emit)
+        if todo and CACHE.l2 is not None:
+            keys = [("wl", mode, m) for m in todo]
+            if mode != "prices":
+                keys += [("wl_overview", m) for m in todo]
+            await loop.run_in_executor(None, CACHE.fetch_shared, keys)  # warms L1
+            todo = self._from_cache(mode, todo, emit)
+        if not todo:
+            return
+        shared = {}  # L2 write-back for this run
+
+        def hit(m, val):
+            CACHE.set_local(("wl", mode, m), val, _CACHE_TTL_S)
+            shared[("wl", mode, m)] = val
+            emit((m, val))
+
+        try:
+            await self._fetch(mode, todo, end, hit, shared)
+        finally:
+            if shared and CACHE.l2 is not None:
+                await loop.run_in_executor(None, CACHE.share, shared, _CACHE_TTL_S)
+
+    async def _fetch(self, mode: str, todo: list[str], end, hit, shared: dict):
+        missing = []
+        if mode == "prices":
+            prices = await self._birdeye_prices(todo, end)
+            for m in todo:
+                if m in prices:
+                    hit(m, prices[m])
+                else:
+                    missing.append(m)
+        else:
+
+            async def one(m):
+                st = CACHE.peek(("wl_overview", m))
+                if st is None:
+                    st = await self._birdeye_overview(m, end)
+                    if st and any(v is not None for v in st.values()):
+                        CACHE.set_local(("wl_overview", m), st, _CACHE_TTL_S)
+                        shared[("wl_overview", m)] = st
+                val = _mode_value(mode, st or {})
+                if val is not None:
+                    hit(m, val)
+                else:
+                    missing.append(m)
+
+            await asyncio.gather(*(one(m) for m in todo))
+
+        # DexScreener carries price/fdv/mc/volume, not supply or holders
+        if missing and mode in ("prices", "fdv", "caps", "volumes"):
+            dex = await self._dex_stats(missing, end)
+            for m in missing:
+                val = _mode_value(mode, dex.get(m) or {})
+                if val:
+                    hit(m, val)
+
+    def stream(self, mode: str, mints: list[str], deadline_s: float | None = None):
+        """
+        Yield (mint, raw_value) as each mint resolves; stops at the deadline.
+        Mints that never show up had no value (or ran out of time).
+        """
+        mints = list(dict.fromkeys(m for m in mints or [] if m))
+        if not mints or mode not in MODES:
+            return
+        deadline_s = deadline_s or DEADLINE_S
+        self.stats["runs"] += 1
+        q: queue.Queue = queue.Queue()
+        fut = asyncio.run_coroutine_threadsafe(
+            self._run(mode, mints, q.put_nowait, deadline_s), self._ensure_loop()
+        )
+        fut.add_done_callback(lambda f: q.put_nowait(_DONE))
+        end = time.monotonic() + deadline_s
+        try:
+            while True:
+                left = end - time.monotonic()
+                if left <= 0:
+                    self.stats["deadline_misses"] += 1
+                    return
+                try:
+                    item = q.get(timeout=left)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    if fut.exception() is not None:
+                        log.warning("watchlist_engine run failed: %s", fut.exception())
+                    return
+                yield item
+        finally:
+            if not fut.done():
+                fut.cancel()
+
+    def fetch(self, mode: str, mints: list[str], deadline_s: float | None = None) -> dict:
+        return dict(self.stream(mode, mints, deadline_s))
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, host_limits=dict(self._host_limits))
+
+
+# process-wide engine used by app.build_watchlist_parallel
+ENGINE = WatchlistEngine()